@@ -0,0 +1,127 @@
+"""
+Concurrent get_data throughput: blocking tool (before) vs async tool (after).
+
+Upstream Dune responses are simulated in-process with a fixed latency, so the numbers
+only reflect how many calls one server process can overlap, not network speed.
+
+Usage:
+    python benchmarks/bench_concurrency.py --calls 20 --widgets 5 --latency 0.2
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import structlog
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import main  # noqa: E402
+
+
+def make_handler(widgets, latency):
+    """Build a MockTransport handler answering Dune GraphQL and execution requests"""
+
+    async def handler(request):
+        await asyncio.sleep(latency)
+        body = json.loads(request.content)
+        if "graphql" in str(request.url):
+            if body["operationName"] == "FindDashboard":
+                dashboard = int(body["variables"]["filters"]["slug"]["equals"].split("-")[-1])
+                node = {
+                    "id": dashboard,
+                    "name": f"dashboard-{dashboard}",
+                    "slug": f"dashboard-{dashboard}",
+                    "user": {"name": "bench"},
+                    "visualizationWidgets": [
+                        {"visualization": {
+                            "id": dashboard * 1000 + i,
+                            "type": "table",
+                            "name": f"chart-{i}",
+                            "options": {},
+                            "query_details": {"query_id": dashboard * 1000 + i, "name": "q", "parameters": []},
+                        }}
+                        for i in range(widgets)
+                    ],
+                }
+                return httpx.Response(200, json={"data": {"dashboards": {"edges": [{"node": node}]}}})
+            query_id = body["variables"]["queryId"]
+            return httpx.Response(200, json={"data": {"resultSetForQuery": {"completedExecutionId": f"ex-{query_id}"}}})
+
+        rows = [{"day": f"2024-01-{i % 28 + 1:02d}", "value": i} for i in range(100)]
+        return httpx.Response(200, json={"execution_succeeded": {
+            "columns": ["day", "value"], "columns_metadata": [], "data": rows, "total_row_count": len(rows),
+        }})
+
+    return handler
+
+
+def install_mock_upstream(widgets, latency):
+    """Route every pooled client created by main through the simulated upstream"""
+    transport = httpx.MockTransport(make_handler(widgets, latency))
+
+    def create_http_client(**kwargs):
+        return httpx.AsyncClient(transport=transport, **kwargs)
+
+    main.create_http_client = create_http_client
+
+
+def reset_caches():
+    main._host_limiters.clear()
+    main.result_cache.clear()
+    main.execution_cache.clear()
+    main.metadata_cache.invalidate()
+
+
+async def run_calls(urls, blocking):
+    """Issue all get_data calls concurrently against the FastMCP server, return elapsed seconds"""
+    executor = ThreadPoolExecutor(max_workers=1)
+
+    def blocking_get_data(url: str) -> str:
+        # Emulates the former synchronous tool: the event loop waits for the whole fetch
+        return executor.submit(asyncio.run, main.fetch_url_data(url)).result()
+
+    if blocking:
+        main.mcp.add_tool(blocking_get_data, name="blocking_get_data")
+    tool = "blocking_get_data" if blocking else "get_data"
+
+    started = time.perf_counter()
+    await asyncio.gather(*(main.mcp.call_tool(tool, {"url": url}) for url in urls))
+    elapsed = time.perf_counter() - started
+    executor.shutdown()
+    return elapsed
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=20, help="concurrent get_data calls")
+    parser.add_argument("--widgets", type=int, default=5, help="widgets per dashboard")
+    parser.add_argument("--latency", type=float, default=0.2, help="simulated upstream latency in seconds")
+    parser.add_argument("--host-concurrency", type=int, default=main.MAX_CONCURRENCY_PER_HOST,
+                        help="MAX_CONCURRENCY_PER_HOST for the run")
+    parser.add_argument("--rate-limit", type=float, default=0,
+                        help="RATE_LIMIT_PER_HOST for the run (default 0, unlimited, to measure overlap only)")
+    args = parser.parse_args()
+
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING))
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    main.MAX_CONCURRENCY_PER_HOST = args.host_concurrency
+    main.RATE_LIMIT_PER_HOST = args.rate_limit
+    install_mock_upstream(args.widgets, args.latency)
+    urls = [f"https://dune.com/bench/dashboard-{i + 1}" for i in range(args.calls)]
+
+    print(f"{args.calls} concurrent get_data calls, {args.widgets} widgets each, "
+          f"{args.latency * 1000:.0f}ms upstream latency, {args.host_concurrency} requests per host")
+    for label, blocking in (("blocking tool (before)", True), ("async tool (after)", False)):
+        reset_caches()
+        elapsed = asyncio.run(run_calls(urls, blocking))
+        print(f"{label:<24} {elapsed:8.2f}s  {args.calls / elapsed:8.2f} calls/s")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,84 @@
+"""
+Footprint chart encoding: former pandas round-trip vs direct records/columnar rendering.
+
+Times turning a Footprint chart's cols/rows into the get_data output string.
+
+Usage:
+    python benchmarks/bench_footprint_encoding.py --rows 100000 --repeat 5
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import main  # noqa: E402
+
+
+def make_payload(rows):
+    """Build a Footprint public card response body with the given number of rows"""
+    cols = [
+        {"name": "on_date", "display_name": "On Date", "base_type": "type/Date"},
+        {"name": "chain", "display_name": "Chain", "base_type": "type/Text"},
+        {"name": "volume", "display_name": "Volume", "base_type": "type/Float"},
+        {"name": "tx_count", "display_name": "Tx Count", "base_type": "type/Integer"},
+        {"name": "users", "display_name": "Users", "base_type": "type/Integer"},
+        {"name": "protocol", "display_name": "Protocol", "base_type": "type/Text"},
+    ]
+    data = [
+        [f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}", "ethereum", i * 1.5, i, i % 977, f"protocol-{i % 50}"]
+        for i in range(rows)
+    ]
+    return {"data": {"cols": cols, "rows": data}}
+
+
+def pandas_round_trip(payload):
+    """The former get_footprint_chart_data body: DataFrame -> to_json -> loads -> dumps"""
+    import pandas as pd
+
+    columns = [item.get("display_name") for item in payload.get("data", {}).get("cols", [])]
+    rows = payload.get("data", {}).get("rows", [])
+    df = pd.DataFrame(rows, columns=columns)
+    result = json.loads(df.to_json(orient='records'))
+    return json.dumps({"data": result})
+
+
+def direct(payload, format):
+    """The current path: keep cols/rows, render once at output"""
+    result = {"data": {"cols": payload["data"]["cols"], "rows": payload["data"]["rows"]}}
+    return main.encode_result(main.render_result(result, format))
+
+
+def best_of(fn, repeat):
+    timings = []
+    output = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        output = fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings), len(output)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000, help="rows in the chart")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per variant, best is reported")
+    args = parser.parse_args()
+
+    payload = make_payload(args.rows)
+    variants = [
+        ("pandas round-trip (before)", lambda: pandas_round_trip(payload)),
+        ("records (after)", lambda: direct(payload, "records")),
+        ("columnar (after)", lambda: direct(payload, "columnar")),
+    ]
+
+    print(f"{args.rows} rows, best of {args.repeat}")
+    for label, fn in variants:
+        elapsed, size = best_of(fn, args.repeat)
+        print(f"{label:<28} {elapsed * 1000:9.1f}ms  {size / 1e6:8.2f}MB")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,86 @@
+"""
+Cold start budget for the stdio server.
+
+Imports main in fresh interpreters with `python -X importtime` and fails (exit code 1)
+when the median cumulative import time exceeds the budget, or when a heavy dependency
+that should only load on demand is imported at startup.
+
+Usage:
+    python benchmarks/bench_startup.py --runs 5 --budget-ms 1000
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Heavy dependencies that must only be imported on the code paths that need them
+LAZY_MODULES = ("pandas", "numpy", "bs4", "requests", "pyarrow", "msgpack")
+
+
+def measure_import():
+    """
+    Import main in a fresh interpreter.
+
+    Returns:
+        tuple: (cumulative import time of main in ms, {module: cumulative ms} of its direct imports, imported module names)
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+
+    total = None
+    direct = {}
+    modules = set()
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        name = name.strip()
+        modules.add(name)
+        if name == "main":
+            total = int(cumulative) / 1000
+        elif depth == 1:
+            direct[name] = int(cumulative) / 1000
+    return total, direct, modules
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters to measure")
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("STARTUP_BUDGET_MS", "1000")),
+                        help="max median import time of main (default STARTUP_BUDGET_MS or 1000)")
+    args = parser.parse_args()
+
+    totals = []
+    direct = {}
+    modules = set()
+    for _ in range(args.runs):
+        total, direct, modules = measure_import()
+        totals.append(total)
+
+    median = statistics.median(totals)
+    print(f"import main: median {median:.1f}ms over {args.runs} runs (budget {args.budget_ms:.0f}ms)")
+    print("slowest direct imports:")
+    for name, elapsed in sorted(direct.items(), key=lambda item: -item[1])[:5]:
+        print(f"  {name:<24} {elapsed:8.1f}ms")
+
+    eager = sorted(module for module in LAZY_MODULES if module in modules)
+    failed = False
+    if eager:
+        print(f"FAIL: imported at startup but should be lazy: {', '.join(eager)}")
+        failed = True
+    if median > args.budget_ms:
+        print(f"FAIL: cold start {median:.1f}ms exceeds budget {args.budget_ms:.0f}ms")
+        failed = True
+    if not failed:
+        print("OK")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,171 @@
+"""
+End-to-end get_data benchmark against recorded upstream responses, no live API involved.
+
+Starts the stand-in server (benchmarks/stand_in_server.py, see there for the fixtures and the
+failure injection), then runs every case in a fresh server process pointed at it: --calls
+concurrent get_data calls (at most --concurrency at a time) on distinct dashboards of the case's
+size, so each call misses the caches and goes through the whole fetch path. Reports end-to-end
+latency percentiles, throughput, failed calls, upstream retries and the peak RSS of the process.
+
+Cases whose widgets x rows exceed --max-rows are skipped (50 widgets of 100k rows is 5M rows per call).
+
+Usage:
+    python benchmarks/bench_upstream.py --sources dune,footprint --widgets 1,10,50 --rows 1000,10000,100000
+    python benchmarks/bench_upstream.py --fail-rate 0.05 --fail-modes 429,cloudflare --calls 50
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import stand_in_server  # noqa: E402
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SOURCES = ("dune", "footprint", "footprint-chart")
+
+
+def case_url(source, widgets, rows, n):
+    """URL of the n-th benchmark graph of a case, named so the stand-in scales its fixtures"""
+    if source == "dune":
+        return f"https://dune.com/bench/w{widgets}-r{rows}-{n}"
+    if source == "footprint":
+        return f"https://www.footprint.network/@Bench/w{widgets}-r{rows}-{n}"
+    return f"https://www.footprint.network/chart/Bench-fp-r{rows}-{n}"
+
+
+def percentile(samples, q):
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+async def run_case(args):
+    """Run one case in this process, main being pointed at the stand-in by the environment"""
+    import structlog
+
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING))
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    sys.path.insert(0, ROOT)
+    import main
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+    failures = 0
+
+    async def call(n):
+        nonlocal failures
+        async with semaphore:
+            started = time.perf_counter()
+            output = await main.mcp.call_tool("get_data", {
+                "url": case_url(args.source, args.widget_count, args.row_count, n), "format": args.format,
+            })
+            latencies.append(time.perf_counter() - started)
+            text = output[0].text if output else ""
+            if text.startswith("Error") or text.startswith('{"error"'):
+                failures += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(call(n) for n in range(args.calls)))
+    elapsed = time.perf_counter() - started
+
+    counters = main.metrics.snapshot()["counters"]
+    latencies.sort()
+    return {
+        "source": args.source,
+        "widgets": args.widget_count,
+        "rows": args.row_count,
+        "calls": args.calls,
+        "p50": statistics.median(latencies),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+        "max": latencies[-1],
+        "calls_per_s": args.calls / elapsed,
+        "failed": failures,
+        "retries": sum(value for key, value in counters.items() if key.startswith("upstream_retries_total")),
+        # Linux reports ru_maxrss in KiB
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def run_child(args, env, source, widgets, rows):
+    """Run one case in a fresh interpreter so its peak RSS and caches are its own"""
+    command = [
+        sys.executable, os.path.abspath(__file__), "--child", "--source", source,
+        "--widget-count", str(widgets), "--row-count", str(rows),
+        "--calls", str(args.calls), "--concurrency", str(args.concurrency), "--format", args.format,
+    ]
+    process = subprocess.run(command, cwd=ROOT, env={**os.environ, **env}, capture_output=True, text=True)
+    if process.returncode != 0:
+        raise RuntimeError(f"case {source} {widgets}x{rows} failed:\n{process.stderr[-2000:]}")
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def print_report(results):
+    header = (f"{'source':<16}{'widgets':>8}{'rows':>9}{'calls':>7}{'p50 s':>9}{'p95 s':>9}{'p99 s':>9}"
+              f"{'max s':>9}{'calls/s':>9}{'failed':>8}{'retries':>9}{'peak RSS MB':>13}")
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['source']:<16}{r['widgets']:>8}{r['rows']:>9}{r['calls']:>7}{r['p50']:>9.3f}{r['p95']:>9.3f}"
+              f"{r['p99']:>9.3f}{r['max']:>9.3f}{r['calls_per_s']:>9.2f}{r['failed']:>8}{r['retries']:>9}"
+              f"{r['peak_rss_mb']:>13.1f}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sources", type=lambda value: value.split(","), default=list(SOURCES),
+                        help=f"comma separated among {', '.join(SOURCES)} (footprint-chart runs with 1 widget only)")
+    parser.add_argument("--widgets", type=lambda value: [int(v) for v in value.split(",")], default=[1, 10, 50],
+                        help="comma separated widgets per dashboard")
+    parser.add_argument("--rows", type=lambda value: [int(v) for v in value.split(",")],
+                        default=[1000, 10000, 100000], help="comma separated rows per widget")
+    parser.add_argument("--max-rows", type=int, default=1_000_000, help="skip cases above this many rows per call")
+    parser.add_argument("--calls", type=int, default=20, help="get_data calls per case")
+    parser.add_argument("--concurrency", type=int, default=10, help="get_data calls in flight at once")
+    parser.add_argument("--format", default="records", help="get_data output format")
+    parser.add_argument("--transport", choices=("httpx", "curl"), default="httpx", help="DUNE_TRANSPORT")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON lines")
+    stand_in_server.add_arguments(parser)
+    # A case run in a child process
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--source", help=argparse.SUPPRESS)
+    parser.add_argument("--widget-count", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--row-count", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(run_case(args))))
+        return
+
+    random.seed(args.seed)
+    _, env = stand_in_server.start_stand_in(args)
+    env["DUNE_TRANSPORT"] = args.transport
+
+    print(f"Stand-in upstream: {args.latency * 1000:.0f}ms +/- {args.jitter:.0%} latency, "
+          f"{args.fail_rate:.1%} failures ({','.join(args.fail_modes)}); "
+          f"{args.calls} calls per case, {args.concurrency} concurrent, transport {args.transport}")
+    results = []
+    for source in args.sources:
+        for widgets in ([1] if source == "footprint-chart" else args.widgets):
+            for rows in args.rows:
+                if widgets * rows > args.max_rows:
+                    print(f"skipping {source} {widgets} widgets x {rows} rows (--max-rows {args.max_rows})")
+                    continue
+                result = run_child(args, env, source, widgets, rows)
+                results.append(result)
+                if args.json:
+                    print(json.dumps(result))
+                sys.stdout.flush()
+    if not args.json:
+        print_report(results)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,296 @@
+"""
+Local stand-in for the Dune and Footprint APIs, replaying the recorded responses in benchmarks/fixtures.
+
+Each upstream host gets its own port (so the server's per-host limits apply as in production) and
+answers every route it knows:
+
+    Dune       POST /graphql (FindDashboard, GetLatestResultSetIds), POST /execution
+    Footprint  POST /dashboard/basic, POST /dataApi/dashcard/data, GET /public/card/{uuid}/query
+
+Fixtures are replayed as recorded, except for benchmark names which scale them: a Dune dashboard slug
+or Footprint dashboard name "w{widgets}-r{rows}-{n}" gets that many copies of the recorded widget,
+each with that many rows derived from the recorded row (dates counting back one day per row, numbers
+varied), and a Footprint chart "Bench-fp-r{rows}-{n}" that many rows.
+
+Latency and failures are injected per request: --fail-modes picks among 429 (with Retry-After when
+--retry-after is set), 503, cloudflare (403 challenge page) and reset (connection closed without an answer).
+
+Usage:
+    python benchmarks/stand_in_server.py --latency 0.05 --jitter 0.5 --fail-rate 0.02 --fail-modes 429,503
+    # prints the environment pointing main at it, e.g. DUNE_API_URL=http://127.0.0.1:40123
+"""
+import argparse
+import datetime
+import functools
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+FAIL_MODES = ("429", "503", "cloudflare", "reset")
+CLOUDFLARE_PAGE = (b"<!DOCTYPE html><html><head><title>Just a moment...</title></head>"
+                   b"<body>Checking your browser before accessing. Performance &amp; security by Cloudflare</body></html>")
+
+DASHBOARD_NAME = re.compile(r"^w(\d+)-r(\d+)-(\d+)$")
+CHART_UUID = re.compile(r"^r(\d+)-(\d+)$")
+ROWS_PLACEHOLDER = "__ROWS__"
+# Benchmark query ids pack (dashboard, widget) above the row count: (n * 1000 + i) * ROWS_BASE + rows
+ROWS_BASE = 1_000_000
+
+
+@functools.lru_cache(maxsize=None)
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, f"{name}.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def scale_row(row, i):
+    """Row i of a generated table: dates of the recorded row moved i days back, numbers varied"""
+    factor = 0.5 + (i * 7919 % 1000) / 1000
+
+    def scale(value):
+        if isinstance(value, bool):
+            return value
+        if isinstance(value, int):
+            return int(value * factor)
+        if isinstance(value, float):
+            return round(value * factor, 3)
+        if isinstance(value, str) and re.match(r"^\d{4}-\d{2}-\d{2}", value):
+            day = datetime.date.fromisoformat(value[:10]) - datetime.timedelta(days=i)
+            return day.isoformat() + value[10:]
+        return value
+
+    if isinstance(row, dict):
+        return {key: scale(value) for key, value in row.items()}
+    return [scale(value) for value in row]
+
+
+@functools.lru_cache(maxsize=16)
+def rows_json(fixture, rows):
+    """JSON of a generated row list, built once per fixture and size since big ones take a while"""
+    template = find_rows(load_fixture(fixture))[0]
+    return json.dumps([scale_row(template, i) for i in range(rows)])
+
+
+def find_rows(fixture):
+    """The recorded row list of a table fixture"""
+    if "execution_succeeded" in fixture:
+        return fixture["execution_succeeded"]["data"]
+    if "results" in fixture:
+        return fixture["results"][0]["data"]["rows"]
+    return fixture["data"]["rows"]
+
+
+def render(envelope, fixture, rows):
+    """Encode a response envelope, splicing the generated rows in place of every ROWS_PLACEHOLDER"""
+    body = json.dumps(envelope)
+    if rows is not None:
+        body = body.replace(json.dumps(ROWS_PLACEHOLDER), rows_json(fixture, rows))
+    return body.encode()
+
+
+def dune_find_dashboard(variables):
+    fixture = load_fixture("dune_find_dashboard")
+    match = DASHBOARD_NAME.match(variables["filters"]["slug"]["equals"])
+    if not match:
+        return fixture
+    widgets, rows, n = map(int, match.groups())
+    node = fixture["data"]["dashboards"]["edges"][0]["node"]
+    template = node["visualizationWidgets"][0]
+    copies = []
+    for i in range(widgets):
+        query_id = (n * 1000 + i) * ROWS_BASE + rows
+        visualization = {**template["visualization"], "id": n * 1000 + i, "name": f"chart-{i}"}
+        visualization["query_details"] = {**visualization["query_details"], "query_id": query_id}
+        copies.append({**template, "id": n * 1000 + i, "visualization": visualization})
+    node = {**node, "id": n, "slug": match.group(0), "visualizationWidgets": copies}
+    return {"data": {"dashboards": {"edges": [{"node": node}]}}}
+
+
+def dune_result_set_ids(variables):
+    fixture = load_fixture("dune_result_set_ids")
+    result_set = {**fixture["data"]["resultSetForQuery"], "completedExecutionId": f"01BENCH{variables['queryId']}"}
+    return {"data": {"resultSetForQuery": result_set}}
+
+
+def dune_execution(body):
+    fixture = load_fixture("dune_execution")
+    rows = int(body.get("query_id", 0)) % ROWS_BASE
+    if not rows:
+        return render(fixture, None, None)
+    execution = {**fixture["execution_succeeded"], "execution_id": body.get("execution_id"),
+                 "data": ROWS_PLACEHOLDER, "total_row_count": rows}
+    return render({"execution_succeeded": execution}, "dune_execution", rows)
+
+
+def footprint_dashboard_basic(body):
+    fixture = load_fixture("footprint_dashboard_basic")
+    name = body.get("dashboardName", "")
+    if not DASHBOARD_NAME.match(name):
+        return fixture
+    return {**fixture, "data": {**fixture["data"], "uuid": f"bench-{name}", "name": name}}
+
+
+def footprint_dashcard_data(body):
+    fixture = load_fixture("footprint_dashcard_data")
+    match = DASHBOARD_NAME.match(body.get("publicUuid", "").removeprefix("bench-"))
+    if not match:
+        return render(fixture, None, None)
+    widgets, rows, n = map(int, match.groups())
+    template = fixture["results"][0]
+    cards = [
+        {**template, "cardId": n * 1000 + i, "dashcardId": n * 1000 + i, "name": f"chart-{i}",
+         "data": {**template["data"], "rows": ROWS_PLACEHOLDER}, "row_count": rows}
+        for i in range(widgets)
+    ]
+    return render({**fixture, "results": cards}, "footprint_dashcard_data", rows)
+
+
+def footprint_card_query(uuid):
+    fixture = load_fixture("footprint_card_query")
+    match = CHART_UUID.match(uuid)
+    if not match:
+        return render(fixture, None, None)
+    rows = int(match.group(1))
+    envelope = {**fixture, "data": {**fixture["data"], "rows": ROWS_PLACEHOLDER}, "row_count": rows}
+    return render(envelope, "footprint_card_query", rows)
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config = None  # argparse namespace, set by make_server
+
+    def do_GET(self):
+        self.answer()
+
+    def do_POST(self):
+        self.answer()
+
+    def answer(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        config = self.config
+
+        delay = config.latency * (1 + random.uniform(-config.jitter, config.jitter))
+        if delay > 0:
+            time.sleep(delay)
+
+        if config.fail_rate and random.random() < config.fail_rate:
+            mode = random.choice(config.fail_modes)
+            if mode == "reset":
+                self.close_connection = True
+                return
+            if mode == "cloudflare":
+                self.send(403, CLOUDFLARE_PAGE, "text/html", {"cf-mitigated": "challenge"})
+            else:
+                headers = {"Retry-After": str(config.retry_after)} if mode == "429" and config.retry_after else {}
+                self.send(int(mode), b'{"error": "injected failure"}', headers=headers)
+            return
+
+        try:
+            body = self.route(json.loads(raw) if raw else {})
+        except (KeyError, ValueError, TypeError) as e:
+            self.send(400, json.dumps({"error": f"bad request: {e}"}).encode())
+            return
+        if body is None:
+            self.send(404, b'{"error": "not found"}')
+            return
+        self.send(200, body if isinstance(body, bytes) else json.dumps(body).encode())
+
+    def route(self, body):
+        path = self.path.split("?")[0]
+        if path.endswith("/graphql"):
+            if body.get("operationName") == "FindDashboard":
+                return dune_find_dashboard(body["variables"])
+            if body.get("operationName") == "GetLatestResultSetIds":
+                return dune_result_set_ids(body["variables"])
+            return None
+        if path.endswith("/execution"):
+            return dune_execution(body)
+        if path.endswith("/dashboard/basic"):
+            return footprint_dashboard_basic(body)
+        if path.endswith("/dataApi/dashcard/data"):
+            return footprint_dashcard_data(body)
+        match = re.search(r"/public/card/([^/]+)/query$", path)
+        if match:
+            return footprint_card_query(match.group(1))
+        return None
+
+    def send(self, status, body, content_type="application/json", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(config, port=0):
+    handler = type("ConfiguredStandInHandler", (StandInHandler,), {"config": config})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_stand_in(config):
+    """
+    Start one stand-in server per upstream host in daemon threads.
+
+    Args:
+        config: Parsed arguments (latency, jitter, fail_rate, fail_modes, retry_after)
+
+    Returns:
+        tuple: (servers, environment variables pointing main at them)
+    """
+    servers = {name: make_server(config) for name in ("dune", "footprint", "footprint_vip")}
+    for server in servers.values():
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = {name: f"http://127.0.0.1:{server.server_address[1]}" for name, server in servers.items()}
+    env = {
+        "DUNE_API_URL": base["dune"],
+        "FOOTPRINT_API_URL": base["footprint"],
+        "FOOTPRINT_VIP_API_URL": base["footprint_vip"],
+    }
+    return servers, env
+
+
+def add_arguments(parser):
+    parser.add_argument("--latency", type=float, default=0.05, help="mean upstream latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.5, help="latency varies uniformly by +/- this fraction")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of requests answered with a failure")
+    parser.add_argument("--fail-modes", type=lambda value: value.split(","), default=["429", "503"],
+                        help=f"comma separated failures to inject among {', '.join(FAIL_MODES)}")
+    parser.add_argument("--retry-after", type=int, default=0, help="Retry-After seconds sent with injected 429s")
+    parser.add_argument("--seed", type=int, default=0, help="random seed of the latency and failure injection")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(parser)
+    args = parser.parse_args()
+    unknown = set(args.fail_modes) - set(FAIL_MODES)
+    if unknown:
+        parser.error(f"unknown failure modes: {', '.join(sorted(unknown))}")
+    random.seed(args.seed)
+
+    _, env = start_stand_in(args)
+    for name, value in env.items():
+        print(f"{name}={value}")
+    sys.stdout.flush()
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -3,29 +3,39 @@ from typing import Optional
 
 from mcp.server.fastmcp import FastMCP
 import httpx
-import subprocess
 import os
 import threading
 from dotenv import load_dotenv
-import pandas as pd
 import random
 
-import requests
-from bs4 import BeautifulSoup
 import structlog
 import time
 import json
+import io
+import operator
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
-from urllib.parse import urlparse
+import weakref
+import contextvars
+from collections import OrderedDict, deque
+from email.utils import parsedate_to_datetime
+import hashlib
+import re
+import itertools
+import tempfile
+import uuid
+from contextlib import contextmanager
+from urllib.parse import urlparse, urlunparse, urlencode, parse_qsl, quote
 
 # Load environment variables
 load_dotenv()
 
-# Base URL and API endpoints
-BASE_URL = "https://www.footprint.network/api/v1"
-DATA_API_URL = "https://vip.footprint.network/api/v1/dataApi/dashcard/data"
-CHART_API_URL = "https://vip.footprint.network/api/v1/public/card"
+# Base URL and API endpoints, overridable to replay recorded responses from a stand-in (benchmarks/bench_upstream.py)
+FOOTPRINT_API_URL = os.getenv("FOOTPRINT_API_URL", "https://www.footprint.network/api/v1")
+FOOTPRINT_VIP_API_URL = os.getenv("FOOTPRINT_VIP_API_URL", "https://vip.footprint.network/api/v1")
+DUNE_API_URL = os.getenv("DUNE_API_URL", "https://core-api.dune.com/public")
+BASE_URL = FOOTPRINT_API_URL
+DATA_API_URL = f"{FOOTPRINT_VIP_API_URL}/dataApi/dashcard/data"
+CHART_API_URL = f"{FOOTPRINT_VIP_API_URL}/public/card"
 
 logger = structlog.get_logger(__name__)
 
@@ -36,8 +46,8 @@ mcp = FastMCP(
     dependencies=["httpx", "pandas", "python-dotenv"],
 )
 
-GRAPHQL_API = 'https://core-api.dune.com/public/graphql'
-EXECUTION_API = 'https://core-api.dune.com/public/execution'
+GRAPHQL_API = f'{DUNE_API_URL}/graphql'
+EXECUTION_API = f'{DUNE_API_URL}/execution'
 
 # Direct cookie string from the example
 DUNE_COOKIES = 'AMP_MKTG_e76ce253e6=JTdCJTIycmVmZXJyZXIlMjIlM0ElMjJodHRwcyUzQSUyRiUyRnd3dy5nb29nbGUuY29tJTJGJTIyJTJDJTIycmVmZXJyaW5nX2RvbWFpbiUyMiUzQSUyMnd3dy5nb29nbGUuY29tJTIyJTdE; _ga=GA1.1.1640660718.1747030585; cf_clearance=sMwBpEr3lhXc7M9xrNSMmE7kCPHqobnJh.PJezDPafs-1747030587-1.2.1.1-YFKOda.i7A834ldSVk.QLT67tPP_biogN9jeZbQHOzNL_TF7Hsn8yKhzDXsfg1zTJmaSLB1hRbH9AFwpO5IAS_txvciAi8gLPm6WIvjSM82PMjU_uNY95tOIqAKX7ePB3PGZ29eSTx.OJ6sIWh3tLqGfeAhD.J6mZorrSIeB0lZCE2NpTZ20w8Zgdd0is.VM3yQhQIFOFOMWc2BRTNW4nsVvuyoE2eOe_Rp6IcoH9PS6UNCXYdhZGxuW5XwbfhH.NywCNliLdw2cw5WiVLho6NY0uDrDJRrqMsownM3X3ZJYExvbxLdxf7y8.bcJK9_7njeRq62AIkPnyJUrs3JO13ciwuOOqZzBan4evmYxaH0; AMP_e76ce253e6=JTdCJTIyZGV2aWNlSWQlMjIlM0ElMjIzYmQzNjA5Yy05Y2E3LTRjMmItYWY0Mi0wZjRmNDdjMDkzMmYlMjIlMkMlMjJzZXNzaW9uSWQlMjIlM0ExNzQ3MDMwNTg1MzMxJTJDJTIyb3B0T3V0JTIyJTNBZmFsc2UlMkMlMjJsYXN0RXZlbnRUaW1lJTIyJTNBMTc0NzAzMDU5MTE0MCUyQyUyMmxhc3RFdmVudElkJTIyJTNBMyU3RA==; __hstc=178244666.fffa39c8772dae9627b24c2b43611b27.1747030592582.1747030592582.1747030592582.1; hubspotutk=fffa39c8772dae9627b24c2b43611b27; __hssrc=1; __stripe_mid=075ed6b0-13a3-4ffc-a0c3-868fd5ec6ab12938d7; __stripe_sid=55a22581-621f-4658-b6ab-45a29a41771f3af967; _ga_H1G057R0KN=GS2.1.s1747030585$o1$g1$t1747030621$j0$l0$h0; __hssc=178244666.2.1747030592582'
@@ -161,6 +171,46 @@ fragment FindDashboard on Dashboard {
     __typename
 }"""
 
+# Only the fields get_dune_dashboard_data reads, the upstream skips page view aggregation, stars, profiles...
+FIND_DASHBOARD_DATA_QUERY = """query FindDashboard($filters: DashboardFilterInput!) {
+    dashboards(filters: $filters, pagination: {first: 1}) {
+        edges {
+            node {
+                id
+                name
+                slug
+                user {
+                    name
+                }
+                visualizationWidgets {
+                    visualization {
+                        id
+                        type
+                        name
+                        options
+                        query_details: query {
+                            query_id: id
+                            name
+                            parameters
+                        }
+                    }
+                }
+                paramWidgets {
+                    key
+                    query_id: queryId
+                }
+            }
+        }
+    }
+}"""
+
+# FindDashboard selections: "data" (what get_data needs) or "full" (everything the dune.com dashboard page loads)
+FIND_DASHBOARD_QUERIES = {"data": FIND_DASHBOARD_DATA_QUERY, "full": FIND_DASHBOARD_QUERY}
+DUNE_DASHBOARD_PROFILE = os.getenv("DUNE_DASHBOARD_PROFILE", "data").lower()
+if DUNE_DASHBOARD_PROFILE not in FIND_DASHBOARD_QUERIES:
+    logger.error(f"Unknown DUNE_DASHBOARD_PROFILE {DUNE_DASHBOARD_PROFILE}, using data")
+    DUNE_DASHBOARD_PROFILE = "data"
+
 GET_EXECUTION_QUERY = """query GetLatestResultSetIds($canRefresh: Boolean!, $queryId: Int!, $parameters: [ExecutionParameterInput!]) {
     resultSetForQuery(
         canRefresh: $canRefresh
@@ -184,10 +234,16 @@ class FreeProxyPool:
         self.test_url = "https://httpbin.org/ip"  # 用来测试代理
         self.initialized = False
         self.initialization_thread = None
-        self.max_workers = 20  # 最大并行验证代理的线程数
+        self.verify_concurrency = 500  # 最大并发验证代理数
+        self.check_timeout = 2
 
     def fetch_free_proxy_list(self):
         """从free-proxy-list.net获取免费代理"""
+        # Imported here so the server doesn't pay for bs4/requests at startup
+        import requests
+        from bs4 import BeautifulSoup
+
+        found = set()
         try:
             response = requests.get('https://free-proxy-list.net/', timeout=10)
             soup = BeautifulSoup(response.text, 'html.parser')
@@ -204,15 +260,18 @@ class FreeProxyPool:
                 else:
                     proxy = f"http://{ip}:{port}"
 
-                with self.lock:
-                    self.proxies.add(proxy)
+                found.add(proxy)
 
-            logger.info(f"[Proxy Pool] Added {len(self.proxies)} proxies from free-proxy-list")
+            logger.info(f"[Proxy Pool] Found {len(found)} proxies from free-proxy-list")
         except Exception as e:
             logger.error(f"[Proxy Pool] Error fetching from free-proxy-list: {e}")
+        return found
 
     def fetch_geonode_proxies(self):
         """从Geonode获取免费代理"""
+        import requests
+
+        found = set()
         try:
             url = "https://proxylist.geonode.com/api/proxy-list?limit=500&page=1&sort_by=lastChecked&sort_type=desc"
             response = requests.get(url, timeout=10)
@@ -223,16 +282,18 @@ class FreeProxyPool:
                 port = proxy.get('port')
                 protocol = proxy.get('protocols')[0].lower() if proxy.get('protocols') else 'http'
 
-                proxy_str = f"{protocol}://{ip}:{port}"
-                with self.lock:
-                    self.proxies.add(proxy_str)
+                found.add(f"{protocol}://{ip}:{port}")
 
-            logger.info(f"[Proxy Pool] Added proxies from Geonode, total: {len(self.proxies)}")
+            logger.info(f"[Proxy Pool] Found {len(found)} proxies from Geonode")
         except Exception as e:
             logger.error(f"[Proxy Pool] Error fetching from Geonode: {e}")
+        return found
 
     def fetch_proxyscrape_proxies(self):
         """从ProxyScrape获取免费代理"""
+        import requests
+
+        found = set()
         try:
             url = "https://api.proxyscrape.com/v2/?request=getproxies&protocol=http&timeout=10000&country=all&ssl=all&anonymity=all"
             response = requests.get(url, timeout=10)
@@ -240,38 +301,63 @@ class FreeProxyPool:
                 proxy_list = response.text.strip().split("\r\n")
                 for proxy in proxy_list:
                     if proxy:
-                        with self.lock:
-                            self.proxies.add(f"http://{proxy}")
-                logger.info(f"[Proxy Pool] Added proxies from ProxyScrape, total: {len(self.proxies)}")
+                        found.add(f"http://{proxy}")
+                logger.info(f"[Proxy Pool] Found {len(found)} proxies from ProxyScrape")
         except Exception as e:
             logger.error(f"[Proxy Pool] Error fetching from ProxyScrape: {e}")
-
-    def check_proxy(self, proxy):
+        return found
+
+    def fetch_candidates(self):
+        """获取所有来源的候选代理"""
+        candidates = set()
+        # candidates |= self.fetch_free_proxy_list()
+        # candidates |= self.fetch_geonode_proxies()
+        candidates |= self.fetch_proxyscrape_proxies()
+        return candidates
+
+    def on_verified(self, proxy, ok, latency):
+        """Hook called with the outcome of every proxy check"""
+        if ok:
+            logger.info(f"[Proxy Pool] Working proxy found: {proxy}")
+
+    async def check_proxy(self, proxy, semaphore, ssl_context):
         """检查代理是否可用"""
-        try:
-            proxies = {
-                'http': proxy,
-                'https': proxy,
-            }
-            response = requests.get(self.test_url, proxies=proxies, timeout=2)
-
-            if response.status_code == 200:
-                with self.lock:
-                    self.working_proxies.add(proxy)
-                    logger.info(f"[Proxy Pool] Working proxy found: {proxy}")
-                return True
-        except:
-            pass
-        return False
-
-    def verify_proxies(self):
-        """验证所有代理的可用性"""
-        logger.info(f"[Proxy Pool] Verifying {len(self.proxies)} proxies...")
-
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            executor.map(self.check_proxy, list(self.proxies))
-
-        logger.info(f"[Proxy Pool] Verification complete. Working proxies: {len(self.working_proxies)}")
+        async with semaphore:
+            started = time.monotonic()
+            try:
+                async with httpx.AsyncClient(proxy=proxy, timeout=self.check_timeout, verify=ssl_context) as client:
+                    response = await client.get(self.test_url)
+                ok = response.status_code == 200
+            except Exception:
+                ok = False
+            latency = time.monotonic() - started
+
+        self.on_verified(proxy, ok, latency)
+        return ok
+
+    async def verify_async(self, proxies):
+        """Check proxies concurrently (up to verify_concurrency at a time)"""
+        semaphore = asyncio.Semaphore(self.verify_concurrency)
+        # One client per proxy, but building an SSL context per client costs tens of milliseconds
+        ssl_context = httpx.create_ssl_context()
+        results = await asyncio.gather(*(self.check_proxy(proxy, semaphore, ssl_context) for proxy in proxies))
+        return {proxy for proxy, ok in zip(proxies, results) if ok}
+
+    def verify_proxies(self, proxies):
+        """
+        验证代理的可用性
+
+        Args:
+            proxies: Proxies to check
+
+        Returns:
+            set: The proxies that work
+        """
+        proxies = list(proxies)
+        logger.info(f"[Proxy Pool] Verifying {len(proxies)} proxies...")
+        working = asyncio.run(self.verify_async(proxies))
+        logger.info(f"[Proxy Pool] Verification complete. Working proxies: {len(working)}/{len(proxies)}")
+        return working
 
     def get_proxy(self):
         """获取一个随机可用代理"""
@@ -286,20 +372,37 @@ class FreeProxyPool:
             return random.choice(list(self.working_proxies))
 
     def refresh(self):
-        """刷新代理池"""
+        """
+        刷新代理池 (double-buffered)
+
+        The new pool is built off to the side while the current one keeps serving,
+        then swapped in atomically. Known-good proxies are re-verified first and
+        swapped in on their own, so the dead ones go away without waiting for the
+        long tail of new candidates.
+        """
+        candidates = self.fetch_candidates()
+
         with self.lock:
-            self.proxies.clear()
-            self.working_proxies.clear()
+            known_good = set(self.working_proxies)
 
-        # self.fetch_free_proxy_list()
-        # self.fetch_geonode_proxies()
-        self.fetch_proxyscrape_proxies()
+        confirmed = self.verify_proxies(known_good)
+        self._swap(candidates | known_good, confirmed)
 
-        self.verify_proxies()
+        fresh = self.verify_proxies(candidates - known_good)
+        self._swap(candidates | confirmed, confirmed | fresh)
 
         with self.lock:
             self.initialized = True
 
+    def _swap(self, proxies, working):
+        with self.lock:
+            self.proxies = proxies
+            # Never drop to zero capacity because of one bad verification round
+            if not working and self.working_proxies:
+                logger.warning("[Proxy Pool] Verification found no working proxies, keeping the current ones")
+                return
+            self.working_proxies = working
+
     def initialize_in_background(self):
         """在后台线程中初始化代理池"""
 
@@ -333,402 +436,1895 @@ class FreeProxyPool:
                 time.sleep(300)  # 出错后等待5分钟再尝试
 
 
-# # 初始化代理池
-# proxy_pool = FreeProxyPool()
+class ProxyHealth:
+    """Health statistics of a single proxy"""
 
-# # 异步启动代理池初始化
-# logger.info("[Proxy Pool] Starting proxy pool in background...")
-# proxy_pool.initialize_in_background()
+    def __init__(self):
+        self.latency_ewma = None  # seconds
+        self.successes = 0
+        self.failures = 0
+        self.cloudflare_blocks = 0
+        self.consecutive_failures = 0
+        self.cooldown = 0  # current circuit breaker cooldown, doubled on every re-open
+        self.open_until = 0.0
+        self.last_verified = 0.0
 
-def run_curl_command(url, data, is_json=True, use_proxy=False):
-    """
-    Run a curl command to make an HTTP request.
 
-    Args:
-        url: The URL to send the request to
-        data: The data to send (either JSON or raw data)
-        is_json: Whether the data is JSON (if True, adds Content-Type header)
-        use_proxy: Whether to use a proxy (if False, uses direct connection)
+class ProxyManager(FreeProxyPool):
+    """
+    Health-scored proxy rotation on top of FreeProxyPool.
 
-    Returns:
-        dict: Response data parsed as JSON or None if failed
+    Tracks latency (EWMA), success rate and Cloudflare blocks for every proxy, picks
+    proxies weighted by that score, and opens a circuit breaker on proxies that keep
+    failing. Working proxies are re-verified in small batches between full refreshes.
     """
-    max_retries = 2
 
-    for retry in range(max_retries):
-        try:
-            # 创建基本curl命令
-            cmd = [
-                'curl', url,
-                '-H', 'accept: */*',
-                '-H', 'accept-language: zh-CN,zh;q=0.9',
-                '-b', DUNE_COOKIES,
-                '-H', 'origin: https://dune.com',
-                '-H', 'priority: u=1, i',
-                '-H', 'referer: https://dune.com/',
-                '-H', 'sec-ch-ua: "Google Chrome";v="135", "Not-A.Brand";v="8", "Chromium";v="135"',
-                '-H', 'sec-ch-ua-mobile: ?0',
-                '-H', 'sec-ch-ua-platform: "macOS"',
-                '-H', 'sec-fetch-dest: empty',
-                '-H', 'sec-fetch-mode: cors',
-                '-H', 'sec-fetch-site: same-site',
-                '-H',
-                'user-agent: Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/135.0.0.0 Safari/537.36',
-            ]
+    def __init__(self, ewma_alpha=0.3, failure_threshold=3, base_cooldown=60, max_cooldown=1800, reverify_batch=50):
+        super().__init__()
+        self.health = {}
+        self.ewma_alpha = ewma_alpha
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self.reverify_batch = reverify_batch
+
+    def _health(self, proxy):
+        health = self.health.get(proxy)
+        if health is None:
+            health = self.health[proxy] = ProxyHealth()
+        return health
+
+    @staticmethod
+    def score(health):
+        """Selection weight: smoothed success rate, penalized by latency and Cloudflare blocks"""
+        success_rate = (health.successes + 1) / (health.successes + health.failures + 2)
+        latency = health.latency_ewma if health.latency_ewma is not None else 1.0
+        return success_rate / (1 + health.cloudflare_blocks) / max(latency, 0.05)
 
-            # 如果使用代理，添加代理参数
-            if use_proxy and os.getenv('IP_PROXY') and os.getenv('IP_PROXY_USER'):
-                cmd.extend(['--proxy', os.getenv("IP_PROXY"), '--proxy-user', os.getenv('IP_PROXY_USER')])
-                # proxy = proxy_pool.get_proxy()
-                # if proxy:
-                #     # 提取代理地址和端口
-                #     if proxy.startswith('http://'):
-                #         proxy_parts = proxy[7:].split(':')
-                #     elif proxy.startswith('https://'):
-                #         proxy_parts = proxy[8:].split(':')
-                #     else:
-                #         # 跳过此次重试，获取新代理
-                #         logger.info(f"Invalid proxy format: {proxy}, retrying... ({retry+1}/{max_retries})")
-                #         continue
-                #
-                #     if len(proxy_parts) != 2:
-                #         logger.info(f"Invalid proxy format: {proxy}, retrying... ({retry+1}/{max_retries})")
-                #         continue
-
-                # proxy_host = proxy_parts[0]
-                # proxy_port = proxy_parts[1]
-                # cmd.extend(['-x', f"{proxy_host}:{proxy_port}"])
-                # logger.info(f"Using proxy: {proxy_host}:{proxy_port}")
-                # else:
-                #     # 如果代理池未初始化完成或没有可用代理，直接使用无代理连接
-                #     logger.info(f"No proxy available, trying direct connection... ({retry+1}/{max_retries})")
-                #     use_proxy = False
-
-            # 添加Content-Type
-            if is_json:
-                cmd.extend(['-H', 'content-type: application/json'])
-
-            # 添加数据
-            if isinstance(data, dict) or isinstance(data, list):
-                data_str = json.dumps(data)
-                cmd.extend(['--data-raw', data_str])
+    def get_proxy(self):
+        """
+        Pick a working proxy, weighted by health score, skipping proxies whose circuit is open.
+
+        Returns:
+            str: Proxy URL or None if no proxy is available
+        """
+        now = time.time()
+        with self.lock:
+            candidates = [proxy for proxy in self.working_proxies if self._health(proxy).open_until <= now]
+            if not candidates:
+                return None
+            weights = [self.score(self.health[proxy]) for proxy in candidates]
+        return random.choices(candidates, weights=weights)[0]
+
+    def record_success(self, proxy, latency):
+        """Record a successful request through a proxy and close its circuit"""
+        with self.lock:
+            health = self._health(proxy)
+            health.successes += 1
+            health.consecutive_failures = 0
+            health.cooldown = 0
+            health.open_until = 0.0
+            if health.latency_ewma is None:
+                health.latency_ewma = latency
             else:
-                cmd.extend(['--data-raw', str(data)])
+                health.latency_ewma = self.ewma_alpha * latency + (1 - self.ewma_alpha) * health.latency_ewma
 
-            # 输出更简洁的命令日志
-            logger.info(f"Running curl to {url} (retry {retry + 1}/{max_retries})")
+    def record_failure(self, proxy, cloudflare=False):
+        """Record a failed request through a proxy, opening its circuit when it keeps failing"""
+        with self.lock:
+            health = self._health(proxy)
+            health.failures += 1
+            health.consecutive_failures += 1
+            if cloudflare:
+                health.cloudflare_blocks += 1
+
+            # A Cloudflare challenge means the exit is flagged, no point in retrying it right away
+            if cloudflare or health.consecutive_failures >= self.failure_threshold:
+                health.cooldown = min(self.max_cooldown, health.cooldown * 2 or self.base_cooldown)
+                health.open_until = time.time() + health.cooldown
+                logger.info(f"[Proxy Pool] Circuit open for {proxy} ({health.cooldown}s)")
+
+    def on_verified(self, proxy, ok, latency):
+        """Feed every verification result into the proxy's health"""
+        super().on_verified(proxy, ok, latency)
+        if ok:
+            self.record_success(proxy, latency)
+        else:
+            self.record_failure(proxy)
+        with self.lock:
+            self._health(proxy).last_verified = time.time()
 
-            # 执行curl
-            result = subprocess.run(cmd, capture_output=True, text=True)
+    def reverify(self, batch_size=None):
+        """Re-check the least recently verified working proxies, dropping the ones that fail"""
+        with self.lock:
+            batch = sorted(self.working_proxies, key=lambda proxy: self._health(proxy).last_verified)
+            batch = batch[:batch_size or self.reverify_batch]
+        if not batch:
+            return
 
+        working = self.verify_proxies(batch)
+        with self.lock:
+            self.working_proxies -= set(batch) - working
+        logger.info(f"[Proxy Pool] Re-verified {len(batch)} proxies. Working proxies: {len(self.working_proxies)}")
 
-            if result.returncode != 0:
-                logger.info(f"Curl command failed with return code {result.returncode}: {result.stderr}")
-                if use_proxy:
-                    logger.info("Retrying with a different proxy...")
-                continue
+    def refresh(self):
+        """刷新代理池, then forget the health of proxies that are neither listed nor working"""
+        super().refresh()
+        with self.lock:
+            for proxy in list(self.health):
+                if proxy not in self.proxies and proxy not in self.working_proxies:
+                    del self.health[proxy]
 
+    def maintain_pool(self, interval=1800, reverify_interval=300):
+        """定期维护代理池: re-verify a batch of working proxies often, fetch new candidates less often"""
+        last_refresh = time.time()
+        while True:
             try:
-                json_response = json.loads(result.stdout)
-                logger.info("Curl Result", result=json_response)
-                return json_response
-            except json.JSONDecodeError:
-                logger.error(f"Invalid JSON response: {result.stdout[:100]}...")
-                if "Cloudflare" in result.stdout or "cloudflare" in result.stdout.lower():
-                    logger.error("Cloudflare detected, trying with a different proxy...")
-                continue
+                time.sleep(reverify_interval)
+                self.reverify()
+                if time.time() - last_refresh >= interval:
+                    logger.info("[Proxy Pool] Refreshing proxy pool...")
+                    self.refresh()
+                    last_refresh = time.time()
+            except Exception as e:
+                logger.info(f"[Proxy Pool] Error during proxy pool maintenance: {e}")
+                time.sleep(300)  # 出错后等待5分钟再尝试
 
-        except Exception as e:
-            logger.error(f"Error during curl execution (retry {retry + 1}/{max_retries}): {e}")
+    def stats(self, top=10):
+        """Pool size, open circuits and the best scored proxies"""
+        now = time.time()
+        with self.lock:
+            ranked = sorted(self.working_proxies, key=lambda proxy: -self.score(self._health(proxy)))
+            return {
+                "candidates": len(self.proxies),
+                "working": len(self.working_proxies),
+                "open_circuits": sum(1 for health in self.health.values() if health.open_until > now),
+                "top": [
+                    {
+                        "proxy": proxy,
+                        "latency_ewma": self.health[proxy].latency_ewma,
+                        "successes": self.health[proxy].successes,
+                        "failures": self.health[proxy].failures,
+                        "cloudflare_blocks": self.health[proxy].cloudflare_blocks,
+                    }
+                    for proxy in ranked[:top]
+                ],
+            }
 
-    # 如果所有重试都失败了，尝试直接连接（如果之前使用了代理）
-    if use_proxy:
-        logger.infot("All proxy attempts failed, trying direct connection...")
-        return run_curl_command(url, data, is_json, use_proxy=False)
 
-    logger.info("All retries failed")
-    return None
+# How Dune requests use proxies: "none", "static" (IP_PROXY/IP_PROXY_USER) or "pool" (health-scored free proxies)
+DUNE_PROXY_MODE = os.getenv("DUNE_PROXY_MODE", "none").lower()
+
+# Populated and maintained in the background once the server starts, see start_background_services
+proxy_manager = ProxyManager() if DUNE_PROXY_MODE == "pool" else None
+
+# Transport used for Dune requests: "httpx" (pooled in-process client) or "curl" (subprocess fallback)
+DUNE_TRANSPORT = os.getenv("DUNE_TRANSPORT", "httpx").lower()
+
+# Headers sent with every Dune request, shared by the httpx client and the curl fallback
+DUNE_HEADERS = {
+    'accept': '*/*',
+    'accept-language': 'zh-CN,zh;q=0.9',
+    'origin': 'https://dune.com',
+    'priority': 'u=1, i',
+    'referer': 'https://dune.com/',
+    'sec-ch-ua': '"Google Chrome";v="135", "Not-A.Brand";v="8", "Chromium";v="135"',
+    'sec-ch-ua-mobile': '?0',
+    'sec-ch-ua-platform': '"macOS"',
+    'sec-fetch-dest': 'empty',
+    'sec-fetch-mode': 'cors',
+    'sec-fetch-site': 'same-site',
+    'user-agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/135.0.0.0 Safari/537.36',
+}
 
+# The static part of the curl argv, built once instead of on every request
+CURL_BASE_ARGS = ['-b', DUNE_COOKIES]
+for _name, _value in DUNE_HEADERS.items():
+    CURL_BASE_ARGS.extend(['-H', f'{_name}: {_value}'])
 
-def parse_dune_url(url):
+# Max number of in-flight requests per upstream host, keeps widget fan-out below Cloudflare's radar
+MAX_CONCURRENCY_PER_HOST = int(os.getenv("MAX_CONCURRENCY_PER_HOST", "4"))
+# Max requests per second per upstream host (token bucket, 0 disables). Both limits adapt (AIMD): cut by 30% on
+# 429, 5xx or a Cloudflare challenge, then grown back additively while requests succeed
+RATE_LIMIT_PER_HOST = float(os.getenv("RATE_LIMIT_PER_HOST", "20"))
+RATE_LIMIT_MIN = 0.5
+
+# Timeouts of a single upstream request (seconds), both capped by the deadline of the get_data call
+CONNECT_TIMEOUT = float(os.getenv("CONNECT_TIMEOUT", "10"))
+READ_TIMEOUT = float(os.getenv("READ_TIMEOUT", "120"))
+# Deadline of a get_data call when the caller doesn't pass one (seconds, 0 disables)
+DEFAULT_DEADLINE = float(os.getenv("DEFAULT_DEADLINE", "0"))
+
+# Absolute time.monotonic() deadline of the current get_data call, inherited by its sub-tasks
+request_deadline = contextvars.ContextVar("request_deadline", default=None)
+
+
+def time_left():
     """
-    Parse a Dune dashboard URL to extract handle and slug.
+    Seconds left before the deadline of the current call.
+
+    Returns:
+        float: Seconds left (negative once passed), or None without a deadline
+    """
+    deadline = request_deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
 
-    Args:
-        url: The Dune dashboard URL
+
+def request_timeout():
+    """
+    Timeouts for the next upstream request: CONNECT_TIMEOUT/READ_TIMEOUT, capped by the time left.
 
     Returns:
-        tuple: (handle, slug) or (None, None) if invalid
+        httpx.Timeout: The timeouts
     """
-    parsed_url = urlparse(url)
-    if 'dune.com' not in parsed_url.netloc:
-        return None, None
+    connect, read = CONNECT_TIMEOUT, READ_TIMEOUT
+    left = time_left()
+    if left is not None:
+        left = max(left, 0.001)
+        connect, read = min(connect, left), min(read, left)
+    return httpx.Timeout(read, connect=connect)
 
-    path_parts = parsed_url.path.strip('/').split('/')
-    if len(path_parts) != 2:
-        return None, None
 
-    return path_parts[0], path_parts[1]
+@contextmanager
+def deadline_scope(seconds):
+    """
+    Set the deadline of the calls made inside the block.
+
+    Args:
+        seconds: Seconds from now, None or 0 for no deadline
+    """
+    token = request_deadline.set(time.monotonic() + seconds) if seconds else None
+    try:
+        yield
+    finally:
+        if token is not None:
+            request_deadline.reset(token)
 
 
-def fetch_dashboard_info(handle, slug):
+async def with_deadline(coro, timed_out=None, grace=0.0):
     """
-    Fetch dashboard information from Dune API.
+    Await coro, giving up when the deadline of the current call passes.
 
     Args:
-        handle: The user/team handle
-        slug: The dashboard slug
+        coro: The coroutine
+        timed_out: Value returned when the deadline passes
+        grace: Extra seconds allowed past the deadline (lets inner calls time out first)
 
     Returns:
-        dict: Dashboard data or None if failed
+        The result of coro, or timed_out
     """
-    dashboard_query = {
-        "operationName": "FindDashboard",
-        "variables": {
-            "filters": {
-                "slug": {"equals": slug},
-                "handle": {"equals": handle}
-            }
-        },
-        "query": FIND_DASHBOARD_QUERY
-    }
-
-    response = run_curl_command(GRAPHQL_API, dashboard_query)
+    left = time_left()
+    if left is None:
+        return await coro
+    try:
+        return await asyncio.wait_for(coro, max(left, 0) + grace)
+    except TimeoutError:
+        return timed_out
 
+# Pooled clients, per event loop since asyncio objects can't cross loops
+_loop_resources = weakref.WeakKeyDictionary()
 
-    if not response:
-        return None
 
-    # Check if dashboard exists
-    if not response.get('data', {}).get('dashboards', {}).get('edges'):
-        return None
+def get_loop_resources():
+    """
+    Get the pooled clients, single-flight groups and execution tracker bound to the running event loop.
 
-    return response['data']['dashboards']['edges'][0]['node']
+    Returns:
+        dict: {"clients": {...}, "flights": {...}}, plus "executions" once a tracker is used
+    """
+    loop = asyncio.get_running_loop()
+    resources = _loop_resources.get(loop)
+    if resources is None:
+        resources = {"clients": {}, "flights": {}}
+        _loop_resources[loop] = resources
+    return resources
 
 
-def get_execution_id(query_id, parameters):
+def parse_cookie_string(cookie_string):
     """
-    Get execution ID for a query.
+    Parse a raw Cookie header value into a dict.
 
     Args:
-        query_id: The query ID
-        parameters: Query parameters
+        cookie_string: Cookie header value, e.g. "a=1; b=2"
 
     Returns:
-        str: Execution ID or None if failed
+        dict: Cookie name to value
     """
-    execution_query = {
-        "operationName": "GetLatestResultSetIds",
-        "variables": {
-            "queryId": int(query_id),
-            "parameters": parameters,
-            "canRefresh": True
-        },
-        "query": GET_EXECUTION_QUERY
-    }
+    cookies = {}
+    for item in cookie_string.split(';'):
+        name, sep, value = item.strip().partition('=')
+        if sep:
+            cookies[name] = value
+    return cookies
 
-    response = run_curl_command(GRAPHQL_API, execution_query)
 
-    if not response:
+def get_static_proxy():
+    """
+    Get the statically configured proxy (IP_PROXY/IP_PROXY_USER) as an httpx proxy URL.
+
+    Returns:
+        str: Proxy URL with credentials, or None if no proxy is configured
+    """
+    proxy = os.getenv('IP_PROXY')
+    proxy_user = os.getenv('IP_PROXY_USER')
+    if not proxy or not proxy_user:
         return None
 
-    return response.get('data', {}).get('resultSetForQuery', {}).get('completedExecutionId')
+    # curl accepts bare host:port, httpx needs a scheme
+    if '://' not in proxy:
+        proxy = f"http://{proxy}"
+    scheme, _, host = proxy.partition('://')
+    user, _, password = proxy_user.partition(':')
+    return f"{scheme}://{quote(user, safe='')}:{quote(password, safe='')}@{host}"
 
 
-def fetch_chart_data(execution_id, query_id, parameters, columns: Optional[list] = None):
+def select_proxy():
     """
-    Fetch chart data using execution ID.
-
-    Args:
-        execution_id: The execution ID
-        query_id: The query ID
-        parameters: Query parameters
-        columns: Output columns to fetch
+    Pick the proxy for the next Dune request according to DUNE_PROXY_MODE.
 
     Returns:
-        dict: Chart data or None if failed
+        str: Proxy URL, or None for a direct connection
     """
-    chart_data_query = {
-        "execution_id": execution_id,
-        "query_id": int(query_id),
-        "parameters": parameters,
-        "sampling": {"count": 8000}
-    }
-    if columns:
-        chart_data_query['output_columns'] = columns
+    if DUNE_PROXY_MODE == "static":
+        return get_static_proxy()
+    if DUNE_PROXY_MODE == "pool" and proxy_manager:
+        return proxy_manager.get_proxy()
+    return None
 
-    response = run_curl_command(EXECUTION_API, chart_data_query)
 
-    return response
+def report_proxy_result(proxy, ok, latency=None, cloudflare=False):
+    """Count the outcome of a Dune request per proxy kind, and feed it back into a pooled proxy's health score"""
+    outcome = "ok" if ok else "cloudflare" if cloudflare else "failed"
+    metrics.inc("dune_requests_total", proxy=DUNE_PROXY_MODE if proxy else "direct", outcome=outcome)
+    if not proxy or not proxy_manager or DUNE_PROXY_MODE != "pool":
+        return
+    if ok:
+        proxy_manager.record_success(proxy, latency)
+    else:
+        proxy_manager.record_failure(proxy, cloudflare=cloudflare)
 
 
-def process_visualization(visualization):
+def create_http_client(**kwargs):
     """
-    Process a visualization to extract query details and options.
+    Create a pooled async httpx client, multiplexing over HTTP/2 when the h2 package is installed.
 
     Args:
-        visualization: The visualization data
+        **kwargs: Extra httpx.AsyncClient arguments (headers, cookies, proxy...)
 
     Returns:
-        tuple: (query_id, parameters, options, columns, viz_info) or None if invalid
+        httpx.AsyncClient: The client
     """
-    if not visualization:
-        return None
-
-    query_details = visualization.get('query_details', {})
-    if not query_details:
-        return None
-
-    query_id = query_details.get('query_id')
-    parameters = query_details.get('parameters', [])
-    name = query_details.get('name', [])
-
-    if not query_id:
-        return None
-
-    # Extract visualization info
-    viz_info = {
-        "visualization_id": visualization.get('id'),
-        "visualization_type": visualization.get('type'),
-        "visualization_name": visualization.get('name')
-    }
-
-    # Process options
-    options = visualization.get('options', {})
-    if isinstance(options, str):
-        try:
-            options = json.loads(options)
-        except:
-            options = {}
+    try:
+        import h2  # noqa: F401
+        http2 = True
+    except ImportError:
+        logger.info("h2 is not installed, falling back to HTTP/1.1")
+        http2 = False
 
-    # Extract columns from options
-    columns = []
-    column_mapping = options.get('columnMapping', {})
-    if column_mapping:
-        columns = list(column_mapping.keys())
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=60),
+        timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+        **kwargs,
+    )
 
-    return query_id, name, parameters, options, columns, viz_info
 
-def get_dune_chart_data(url: str) -> str:
-    parsed_url = urlparse(url)
-    query_id = parsed_url.path.split('/')[2]
-    parameters = []
-    logger.info(f"Getting execution ID for query {query_id}...")
-    execution_id = get_execution_id(query_id, parameters)
-    if not execution_id:
-        return json.dumps({"error": "No execution found"})
+def get_http_client(proxy=None):
+    """
+    Get the shared, long-lived Dune client for a proxy (or the direct connection).
 
-    # Step 5: Fetch chart data
-    logger.info(f"Fetching chart data for execution {execution_id}...")
-    chart_data = fetch_chart_data(execution_id, query_id, parameters)
-    if not chart_data:
-        return json.dumps({"error": "No chart data found"})
-    return json.dumps(chart_data)
+    Clients keep connections alive, so repeated Dune requests reuse one TLS session
+    instead of forking curl.
 
+    Args:
+        proxy: Proxy URL, or None for a direct connection
 
+    Returns:
+        httpx.AsyncClient: The pooled client
+    """
+    clients = get_loop_resources()["clients"]
+    client = clients.get(("dune", proxy))
+    if client is None:
+        client = create_http_client(headers=DUNE_HEADERS, cookies=parse_cookie_string(DUNE_COOKIES), proxy=proxy)
+        clients[("dune", proxy)] = client
+    return client
 
 
-def get_dune_dashboard_data(url: str) -> str:
+def get_footprint_client():
     """
-    Retrieve chart data from a Dune dashboard URL.
-
-    Args:
-        url: The URL of the Dune dashboard, e.g., https://dune.com/cryptokoryo/crypto-buy-signal
+    Get the shared, long-lived Footprint client.
 
     Returns:
-        JSON string containing the chart data
+        httpx.AsyncClient: The pooled client
     """
-    try:
-        # Step 1: Parse URL to get handle and slug
-        handle, slug = parse_dune_url(url)
-        if not handle or not slug:
-            return json.dumps({"error": "Invalid Dune dashboard URL format"})
+    clients = get_loop_resources()["clients"]
+    client = clients.get(("footprint", None))
+    if client is None:
+        client = create_http_client()
+        clients[("footprint", None)] = client
+    return client
 
-        # Step 2: Fetch dashboard info
-        logger.info(f"Fetching dashboard info for {handle}/{slug}...")
-        dashboard_node = fetch_dashboard_info(handle, slug)
-        if not dashboard_node:
-            return json.dumps({"error": "Dashboard not found or access denied by Cloudflare."})
 
-        # Get visualization widgets
-        visualization_widgets = dashboard_node.get('visualizationWidgets', [])
-        if not visualization_widgets:
-            return json.dumps({"error": "No visualizations found in dashboard"})
+async def close_http_clients():
+    """Close the pooled httpx clients of the running event loop"""
+    clients = get_loop_resources()["clients"]
+    for client in clients.values():
+        await client.aclose()
+    clients.clear()
 
-        # Step 3: Process each visualization widget
-        charts_data = []
 
-        for widget in visualization_widgets:
-            visualization = widget.get('visualization', {})
-            processed_data = process_visualization(visualization)
+class HostLimiter:
+    """
+    Token bucket and adaptive concurrency limit of one upstream host, shared by every fetch
+    path and every event loop (the watchlist runs its own), hence the thread lock.
 
-            if not processed_data:
-                continue
+    Overload (429, 5xx, Cloudflare challenge) multiplies both the concurrency limit and the rate
+    by decrease, at most once per cooldown since the requests in flight tend to fail together.
+    Each success adds 1/limit to the limit and max_rate/10/rate to the rate, i.e. about +1 per
+    round trip and +10% of max_rate per second, so the limits settle just under what the host sustains.
+    """
 
-            query_id, name,parameters, options, columns, viz_info = processed_data
+    def __init__(self, max_concurrency, max_rate, cooldown=1.0, decrease=0.7):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_rate = max_rate
+        self.cooldown = cooldown
+        self.decrease = decrease
+        self.limit = float(self.max_concurrency)
+        self.rate = float(max_rate)
+        self.tokens = float(max_rate)
+        self.refilled_at = time.monotonic()
+        self.paused_until = 0.0
+        self.decreased_at = 0.0
+        self.in_flight = 0
+        self.waiters = deque()  # (loop, future) of requests waiting for a free slot
+        self.lock = threading.Lock()
 
-            # Step 4: Get execution ID for the query
-            logger.info(f"Getting execution ID for query {query_id}...")
-            execution_id = get_execution_id(query_id, parameters)
-            if not execution_id:
+    async def acquire(self):
+        """Wait until a request may start: a slot is free, a token is available and the host isn't paused"""
+        while True:
+            with self.lock:
+                delay = self._delay(time.monotonic())
+                if delay == 0:
+                    self.in_flight += 1
+                    if self.max_rate:
+                        self.tokens -= 1
+                    return
+                if delay is None:
+                    waiter = (asyncio.get_running_loop(), asyncio.get_running_loop().create_future())
+                    self.waiters.append(waiter)
+            if delay is not None:
+                await asyncio.sleep(delay)
                 continue
+            try:
+                await waiter[1]
+            except asyncio.CancelledError:
+                with self.lock:
+                    if waiter in self.waiters:
+                        self.waiters.remove(waiter)
+                    else:
+                        # Woken just before the cancellation, pass the wakeup on
+                        self._wake()
+                raise
+
+    def release(self, outcome=None, retry_after=None):
+        """
+        Free the slot of a finished request and adapt the limits.
+
+        Args:
+            outcome: "ok", "overload" (429, 5xx, Cloudflare challenge), or None to keep the limits as they are
+            retry_after: Seconds the host asked us to wait, no request to it starts before then
+        """
+        with self.lock:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if outcome == "ok":
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+                if self.max_rate:
+                    self.rate = min(self.max_rate, self.rate + self.max_rate / 10 / self.rate)
+            elif outcome == "overload" and now - self.decreased_at >= self.cooldown:
+                self.decreased_at = now
+                self.limit = max(1.0, self.limit * self.decrease)
+                if self.max_rate:
+                    self.rate = max(RATE_LIMIT_MIN, self.rate * self.decrease)
+                    self.tokens = min(self.tokens, self.rate)
+            if retry_after:
+                self.paused_until = max(self.paused_until, now + min(retry_after, RETRY_MAX_DELAY))
+            self._wake()
+
+    def stats(self):
+        """Current limits and load"""
+        with self.lock:
+            return {
+                "concurrency_limit": round(self.limit, 2),
+                "in_flight": self.in_flight,
+                "waiting": len(self.waiters),
+                "rate_limit": round(self.rate, 2) if self.max_rate else None,
+                "paused_for": round(max(0.0, self.paused_until - time.monotonic()), 2),
+            }
 
-            # Step 5: Fetch chart data
-            logger.info(f"Fetching chart data for execution {execution_id}...")
-            chart_data = fetch_chart_data(execution_id, query_id, parameters, columns)
-            if not chart_data:
-                continue
+    def _delay(self, now):
+        """0 if a request may start now, seconds to wait for a token or the end of a pause, None to wait for a slot"""
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.in_flight >= int(self.limit):
+            return None
+        if self.max_rate:
+            # The bucket holds one second worth of tokens at the current rate
+            self.tokens = min(self.rate, self.tokens + (now - self.refilled_at) * self.rate)
+            self.refilled_at = now
+            if self.tokens < 1:
+                return (1 - self.tokens) / self.rate
+        return 0
+
+    def _wake(self):
+        """Wake as many waiting requests as there are free slots"""
+        free = int(self.limit) - self.in_flight
+        while free > 0 and self.waiters:
+            loop, future = self.waiters.popleft()
+            try:
+                loop.call_soon_threadsafe(resolve_waiter, future)
+            except RuntimeError:
+                continue  # Its event loop is closed
+            free -= 1
 
-            # Step 6: Extract and format chart result
-            chart_result = {
-                **viz_info,
-                "query_id": query_id,
-                "options": options
-            }
 
-            if chart_data.get('execution_succeeded'):
-                succeeded_data = chart_data['execution_succeeded']
-                chart_result['columns'] = succeeded_data.get('columns', [])
-                chart_result['columns_metadata'] = succeeded_data.get('columns_metadata', [])
-                chart_result['data'] = succeeded_data.get('data', [])
-                chart_result['total_row_count'] = succeeded_data.get('total_row_count', 0)
+def resolve_waiter(future):
+    if not future.done():
+        future.set_result(None)
 
-            charts_data.append(chart_result)
 
-        # Step 7: Return dashboard data with all charts
-        result = {
-            "dashboard_name": dashboard_node.get('name'),
-            "dashboard_slug": dashboard_node.get('slug'),
-            "dashboard_id": dashboard_node.get('id'),
-            "user": dashboard_node.get('user', {}).get('name'),
-            "charts": charts_data
-        }
+_host_limiters = {}
+_host_limiters_lock = threading.Lock()
 
-        return json.dumps(result)
 
-    except Exception as e:
-        return json.dumps({"error": f"Failed to process dashboard: {str(e)}"})
+def get_host_limiter(host):
+    """
+    Get the limiter of an upstream host, created on first use.
 
-# @mcp.tool()
-def get_footprint_chart_data(chart_url: str) -> str:
-    """Get raw data from a Footprint Network chart and return as JSON string
-    
     Args:
-        chart_url: URL of the Footprint Network chart (e.g., https://www.footprint.network/@Higi/Sui-Bridge?type=chart)
+        host: The host (netloc) of the request URL
 
     Returns:
-        JSON string containing all chart data from the chart
+        HostLimiter: Limiter shared by all requests to that host
     """
-    try:
-        # Parse chart URL to extract username, dashboard name, and chart name
-        parts = chart_url.split("?")[0].split("/")
-        chart_uuid = parts[-1].split("fp-")[-1]
+    with _host_limiters_lock:
+        limiter = _host_limiters.get(host)
+        if limiter is None:
+            limiter = _host_limiters[host] = HostLimiter(MAX_CONCURRENCY_PER_HOST, RATE_LIMIT_PER_HOST)
+        return limiter
+
+
+# Retry policy shared by the Dune and Footprint fetch paths
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "3"))
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "0.5"))
+# Longest backoff between attempts, a Retry-After longer than this fails the request instead of waiting
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "10"))
+# Retries (and hedges) may add at most this fraction of extra requests on top of first attempts
+RETRY_BUDGET_RATIO = float(os.getenv("RETRY_BUDGET_RATIO", "0.2"))
+# Send a second, hedged request (through another proxy) when the first runs past the host's p95 latency
+HEDGE_REQUESTS = os.getenv("HEDGE_REQUESTS", "false").lower() == "true"
+HEDGE_MIN_SAMPLES = 20
+# Failures telling that the host is overloaded or pushing back, which shrink its limiter
+OVERLOAD_REASONS = ("rate_limited", "server_error", "cloudflare")
+
+
+class RetryableError(httpx.HTTPError):
+    """
+    A failed attempt that is worth retrying.
 
-        url=f"{CHART_API_URL}/{chart_uuid}/query"
+    Args:
+        reason: "timeout", "network", "server_error", "rate_limited", "cloudflare" or "invalid_json"
+        message: Human readable description
+        retry_after: Seconds the upstream asked us to wait, if any
+    """
 
-        parameters = {}
-        if "?" in chart_url:
-            params_str = chart_url.split("?")[1].split("#")[0]
+    def __init__(self, reason, message, retry_after=None):
+        super().__init__(f"{reason}: {message}")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class RetryBudget:
+    """
+    Token bucket limiting retries to a fraction of first attempts, so retries
+    can't multiply the load on an upstream that is already failing.
+    """
+
+    def __init__(self, ratio, max_tokens=10):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self.lock = threading.Lock()
+
+    def deposit(self):
+        """Credit a first attempt"""
+        with self.lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self):
+        """Take a token for a retry, returns False when the budget is spent"""
+        with self.lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class LatencyTracker:
+    """Rolling window of successful request latencies per host"""
+
+    def __init__(self, window=200):
+        self.window = window
+        self.samples = {}
+        self.lock = threading.Lock()
+
+    def record(self, host, latency):
+        with self.lock:
+            samples = self.samples.get(host)
+            if samples is None:
+                samples = self.samples[host] = deque(maxlen=self.window)
+            samples.append(latency)
+
+    def percentile(self, host, q=0.95, min_samples=HEDGE_MIN_SAMPLES):
+        """
+        Latency percentile of a host.
+
+        Returns:
+            float: The percentile in seconds, or None with fewer than min_samples samples
+        """
+        with self.lock:
+            samples = sorted(self.samples.get(host, ()))
+        if len(samples) < min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+retry_budget = RetryBudget(RETRY_BUDGET_RATIO)
+latency_tracker = LatencyTracker()
+
+# Serve the metrics in Prometheus text format at http://METRICS_HOST:METRICS_PORT/metrics, 0 disables
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PREFIX = "graph_mcp_"
+# Characters of each upstream response body written to the log, 0 logs only its size
+LOG_BODY_CHARS = int(os.getenv("LOG_BODY_CHARS", "200"))
+
+
+class Metrics:
+    """Counters and timing summaries (count, sum and recent samples for quantiles) keyed by name and labels"""
+
+    def __init__(self, window=1000):
+        self.window = window
+        self.counters = {}  # (name, labels) -> value
+        self.timings = {}  # (name, labels) -> [count, sum, recent samples]
+        self.lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            timing = self.timings.get(key)
+            if timing is None:
+                timing = self.timings[key] = [0, 0.0, deque(maxlen=self.window)]
+            timing[0] += 1
+            timing[1] += seconds
+            timing[2].append(seconds)
+
+    @contextmanager
+    def span(self, stage, **labels):
+        """Time the enclosed block as one stage of a request (stage_seconds{stage=...})"""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe("stage_seconds", time.monotonic() - started, stage=stage, **labels)
+
+    def snapshot(self):
+        """
+        Get the current values.
+
+        Returns:
+            dict: {"counters": {name{labels}: value}, "timings": {name{labels}: {count, sum, p50, p95, max}}}
+        """
+        with self.lock:
+            counters = dict(self.counters)
+            timings = {key: (count, total, sorted(samples)) for key, (count, total, samples) in self.timings.items()}
+        return {
+            "counters": {format_metric(name, labels): value for (name, labels), value in sorted(counters.items())},
+            "timings": {
+                format_metric(name, labels): {
+                    "count": count,
+                    "sum": round(total, 6),
+                    **{f"p{int(q * 100)}": round(quantile(samples, q), 6) for q in (0.5, 0.95)},
+                    "max": round(samples[-1], 6) if samples else None,
+                }
+                for (name, labels), (count, total, samples) in sorted(timings.items())
+            },
+        }
+
+    def prometheus(self):
+        """Render the counters and timing summaries in Prometheus text format"""
+        with self.lock:
+            counters = sorted(self.counters.items())
+            timings = sorted((key, (count, total, sorted(samples))) for key, (count, total, samples) in self.timings.items())
+
+        lines = []
+        for name, group in itertools.groupby(counters, key=lambda item: item[0][0]):
+            lines.append(f"# TYPE {METRICS_PREFIX}{name} counter")
+            lines.extend(f"{METRICS_PREFIX}{format_metric(name, labels)} {value}" for (_, labels), value in group)
+        for name, group in itertools.groupby(timings, key=lambda item: item[0][0]):
+            lines.append(f"# TYPE {METRICS_PREFIX}{name} summary")
+            for (_, labels), (count, total, samples) in group:
+                for q in (0.5, 0.95):
+                    lines.append(f"{METRICS_PREFIX}{format_metric(name, labels + (('quantile', str(q)),))} "
+                                 f"{quantile(samples, q)}")
+                lines.append(f"{METRICS_PREFIX}{format_metric(name + '_sum', labels)} {total}")
+                lines.append(f"{METRICS_PREFIX}{format_metric(name + '_count', labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def format_metric(name, labels):
+    """Format a metric name and its (key, value) label pairs as name{key="value",...}"""
+    if not labels:
+        return name
+    pairs = ",".join(f"{key}={json.dumps(str(value))}" for key, value in labels)
+    return f"{name}{{{pairs}}}"
+
+
+def quantile(samples, q):
+    """Quantile of sorted samples, 0.0 when there are none"""
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+def log_body(event, url, body):
+    """Log the size and the first LOG_BODY_CHARS characters of an upstream response body (bytes)"""
+    if LOG_BODY_CHARS <= 0:
+        logger.info(event, url=url, bytes=len(body))
+    else:
+        logger.info(event, url=url, bytes=len(body), body=body[:LOG_BODY_CHARS].decode(errors="replace"))
+
+
+metrics = Metrics()
+
+
+def parse_retry_after(value):
+    """
+    Parse a Retry-After header (delay in seconds or HTTP date).
+
+    Returns:
+        float: Seconds to wait, or None if missing or invalid
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_cloudflare_challenge(status_code, headers, text):
+    """Whether a response is a Cloudflare challenge/block page rather than an API answer"""
+    if headers.get("cf-mitigated") == "challenge":
+        return True
+    return status_code in (403, 429, 503) and "cloudflare" in text[:2000].lower()
+
+
+def check_response(response):
+    """
+    Raise RetryableError for responses worth retrying: Cloudflare challenges, 429 and 5xx.
+
+    Args:
+        response: httpx.Response
+    """
+    status = response.status_code
+    # Decoding the body is only worth it for the statuses a challenge page comes with
+    text = response.text if status in (403, 429, 503) else ""
+    if is_cloudflare_challenge(status, response.headers, text):
+        raise RetryableError("cloudflare", f"challenge from {response.url.host} ({status})")
+    if status == 429:
+        raise RetryableError("rate_limited", f"{response.url.host} returned 429",
+                             parse_retry_after(response.headers.get("retry-after")))
+    if status >= 500:
+        raise RetryableError("server_error", f"{response.url.host} returned {status}",
+                             parse_retry_after(response.headers.get("retry-after")))
+
+
+def backoff_delay(attempt, retry_after=None):
+    """Exponential backoff with full jitter, or the upstream's Retry-After when it asked for one"""
+    if retry_after is not None:
+        return retry_after
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+
+
+async def send_timed(send, host):
+    """
+    Run one attempt within the host's limiter, recording its latency for the host's p95 when it succeeds.
+    The time spent waiting for the limiter counts against the deadline but not as latency.
+    """
+    limiter = get_host_limiter(host)
+
+    async def attempt():
+        await limiter.acquire()
+        started = time.monotonic()
+        try:
+            result = await send()
+        except RetryableError as e:
+            limiter.release("overload" if e.reason in OVERLOAD_REASONS else None, e.retry_after)
+            raise
+        except BaseException:
+            limiter.release()
+            raise
+        limiter.release("ok")
+        return result, time.monotonic() - started
+
+    left = time_left()
+    if left is None:
+        result, latency = await attempt()
+    else:
+        # Read timeouts are per chunk, this bounds the attempt as a whole
+        try:
+            result, latency = await asyncio.wait_for(attempt(), max(left, 0))
+        except TimeoutError:
+            raise RetryableError("timeout", "deadline exceeded")
+    latency_tracker.record(host, latency)
+    metrics.observe("upstream_request_seconds", latency, host=host)
+    return result
+
+
+async def send_hedged(send, host):
+    """
+    Run one attempt, and a second one in parallel if the first is slower than the host's p95.
+    The first success wins and the other attempt is cancelled.
+    """
+    threshold = latency_tracker.percentile(host)
+    first = asyncio.ensure_future(send_timed(send, host))
+    if threshold is None:
+        return await first
+
+    done, _ = await asyncio.wait({first}, timeout=threshold)
+    if done or not retry_budget.withdraw():
+        return await first
+
+    logger.info(f"Hedging request to {host} after {threshold:.2f}s")
+    metrics.inc("upstream_hedges_total", host=host)
+    pending = {first, asyncio.ensure_future(send_timed(send, host))}
+    error = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def call_with_retries(send, url, max_attempts=None, hedge=False):
+    """
+    Call send() until it succeeds, retrying RetryableErrors with backoff within the retry budget.
+
+    Args:
+        send: Coroutine function making one attempt, raises RetryableError on retryable failures
+        url: The request URL (its host keys latency stats)
+        max_attempts: Attempts before giving up, defaults to RETRY_MAX_ATTEMPTS
+        hedge: Whether to hedge slow attempts with a parallel one
+
+    Returns:
+        The result of the first successful attempt
+
+    Raises:
+        RetryableError: The last failure once attempts, budget or patience run out
+    """
+    max_attempts = max_attempts or RETRY_MAX_ATTEMPTS
+    host = urlparse(url).netloc
+    retry_budget.deposit()
+
+    for attempt in range(max_attempts):
+        try:
+            if hedge:
+                result = await send_hedged(send, host)
+            else:
+                result = await send_timed(send, host)
+            metrics.inc("upstream_requests_total", host=host, outcome="ok")
+            return result
+        except RetryableError as e:
+            logger.error(f"Attempt {attempt + 1}/{max_attempts} to {host} failed: {e}")
+            metrics.inc("upstream_errors_total", host=host, reason=e.reason)
+            if attempt + 1 >= max_attempts:
+                metrics.inc("upstream_requests_total", host=host, outcome="failed")
+                raise
+            if e.retry_after is not None and e.retry_after > RETRY_MAX_DELAY:
+                logger.error(f"{host} asked to retry after {e.retry_after:.0f}s, giving up")
+                metrics.inc("upstream_requests_total", host=host, outcome="failed")
+                raise
+            delay = backoff_delay(attempt, e.retry_after)
+            left = time_left()
+            if left is not None and left <= delay:
+                logger.error(f"No time left to retry {host} before the deadline")
+                metrics.inc("upstream_requests_total", host=host, outcome="failed")
+                raise
+            if not retry_budget.withdraw():
+                logger.error("Retry budget exhausted, not retrying")
+                metrics.inc("upstream_requests_total", host=host, outcome="failed")
+                raise
+            metrics.inc("upstream_retries_total", host=host)
+            await asyncio.sleep(delay)
+
+
+async def run_dune_request(url, data, is_json=True, use_proxy=None):
+    """
+    Send a request to a Dune API using the configured transport (DUNE_TRANSPORT).
+
+    Args:
+        url: The URL to send the request to
+        data: The data to send (either JSON or raw data)
+        is_json: Whether the data is JSON (if True, adds Content-Type header)
+        use_proxy: Whether to use a proxy, defaults to DUNE_PROXY_MODE != "none"
+
+    Returns:
+        dict: Response data parsed as JSON or None if failed
+    """
+    if use_proxy is None:
+        use_proxy = DUNE_PROXY_MODE != "none"
+
+    if DUNE_TRANSPORT == "curl":
+        return await run_curl_command(url, data, is_json, use_proxy)
+    return await run_httpx_request(url, data, is_json, use_proxy)
+
+
+async def run_httpx_request(url, data, is_json=True, use_proxy=False):
+    """
+    Send a request to a Dune API through the pooled httpx client.
+
+    Args:
+        url: The URL to send the request to
+        data: The data to send (either JSON or raw data)
+        is_json: Whether the data is JSON (if True, adds Content-Type header)
+        use_proxy: Whether to use a proxy (if False, uses direct connection)
+
+    Returns:
+        dict: Response data parsed as JSON or None if failed
+    """
+    tried_proxy = False
+
+    if isinstance(data, dict) or isinstance(data, list):
+        content = json.dumps(data)
+    else:
+        content = str(data)
+    headers = {'content-type': 'application/json'} if is_json else None
+
+    async def send():
+        nonlocal tried_proxy
+        # Pick a proxy on every attempt so a retry (or hedge) goes out through a different exit
+        proxy = select_proxy() if use_proxy else None
+        tried_proxy = tried_proxy or proxy is not None
+        client = get_http_client(proxy)
+        started = time.monotonic()
+        try:
+            logger.info(f"Requesting {url}" + (f" via {proxy}" if proxy else ""))
+            try:
+                response = await client.post(url, content=content, headers=headers, timeout=request_timeout())
+            except httpx.TimeoutException as e:
+                raise RetryableError("timeout", str(e) or type(e).__name__) from e
+            except httpx.TransportError as e:
+                raise RetryableError("network", str(e) or type(e).__name__) from e
+
+            metrics.inc("upstream_bytes_total", len(response.content), host=urlparse(url).netloc)
+            check_response(response)
+            try:
+                json_response = response.json()
+            except json.JSONDecodeError:
+                raise RetryableError("invalid_json", response.text[:100])
+        except RetryableError as e:
+            report_proxy_result(proxy, False, cloudflare=e.reason == "cloudflare")
+            raise
+
+        report_proxy_result(proxy, True, time.monotonic() - started)
+        log_body("Request Result", url, response.content)
+        return json_response
+
+    try:
+        return await call_with_retries(send, url, hedge=HEDGE_REQUESTS)
+    except RetryableError:
+        pass
+
+    if tried_proxy:
+        logger.info("All proxy attempts failed, trying direct connection...")
+        return await run_httpx_request(url, data, is_json, use_proxy=False)
+
+    logger.info("All retries failed")
+    return None
+
+
+async def run_curl_command(url, data, is_json=True, use_proxy=False):
+    """
+    Run a curl command to make an HTTP request (fallback transport, DUNE_TRANSPORT=curl).
+
+    Args:
+        url: The URL to send the request to
+        data: The data to send (either JSON or raw data)
+        is_json: Whether the data is JSON (if True, adds Content-Type header)
+        use_proxy: Whether to use a proxy (if False, uses direct connection)
+
+    Returns:
+        dict: Response data parsed as JSON or None if failed
+    """
+    tried_proxy = False
+
+    async def send():
+        nonlocal tried_proxy
+        # 创建基本curl命令, the status code is appended on its own line after the body
+        timeout = request_timeout()
+        cmd = ['curl', url, *CURL_BASE_ARGS, '-sS', '--connect-timeout', f'{timeout.connect:.3f}',
+               '--max-time', f'{timeout.read:.3f}', '-w', '\n%{http_code}']
+
+        # 如果使用代理，添加代理参数
+        proxy = None
+        if use_proxy:
+            if DUNE_PROXY_MODE == "pool" and proxy_manager:
+                proxy = proxy_manager.get_proxy()
+                if proxy:
+                    tried_proxy = True
+                    cmd.extend(['-x', proxy])
+                    logger.info(f"Using proxy: {proxy}")
+                else:
+                    logger.info("No proxy available, trying direct connection...")
+            elif os.getenv('IP_PROXY') and os.getenv('IP_PROXY_USER'):
+                tried_proxy = True
+                cmd.extend(['--proxy', os.getenv("IP_PROXY"), '--proxy-user', os.getenv('IP_PROXY_USER')])
+
+        # 添加Content-Type
+        if is_json:
+            cmd.extend(['-H', 'content-type: application/json'])
+
+        # 添加数据
+        if isinstance(data, dict) or isinstance(data, list):
+            data_str = json.dumps(data)
+            cmd.extend(['--data-raw', data_str])
+        else:
+            cmd.extend(['--data-raw', str(data)])
+
+        # 输出更简洁的命令日志
+        logger.info(f"Running curl to {url}")
+
+        # 执行curl
+        started = time.monotonic()
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+            )
+            stdout, stderr = await process.communicate()
+            metrics.inc("upstream_bytes_total", len(stdout), host=urlparse(url).netloc)
+
+            if process.returncode == 28:
+                raise RetryableError("timeout", "curl timed out")
+            if process.returncode != 0:
+                raise RetryableError("network", f"curl exited with {process.returncode}: {stderr.decode(errors='replace').strip()}")
+
+            body, _, status = stdout.decode(errors='replace').rpartition('\n')
+            status = int(status) if status.isdigit() else 0
+            if is_cloudflare_challenge(status, {}, body):
+                raise RetryableError("cloudflare", f"challenge ({status})")
+            if status == 429:
+                raise RetryableError("rate_limited", "429")
+            if status >= 500:
+                raise RetryableError("server_error", str(status))
+            try:
+                json_response = json.loads(body)
+            except json.JSONDecodeError:
+                raise RetryableError("invalid_json", body[:100])
+        except RetryableError as e:
+            report_proxy_result(proxy, False, cloudflare=e.reason == "cloudflare")
+            raise
+
+        report_proxy_result(proxy, True, time.monotonic() - started)
+        log_body("Curl Result", url, stdout)
+        return json_response
+
+    try:
+        return await call_with_retries(send, url, hedge=HEDGE_REQUESTS)
+    except RetryableError:
+        pass
+
+    # 如果所有重试都失败了，尝试直接连接（如果之前使用了代理）
+    if tried_proxy:
+        logger.info("All proxy attempts failed, trying direct connection...")
+        return await run_curl_command(url, data, is_json, use_proxy=False)
+
+    logger.info("All retries failed")
+    return None
+
+
+async def send_footprint_request(method, url, **kwargs):
+    """
+    Send a request to a Footprint API through the pooled client, with retries.
+
+    Args:
+        method: HTTP method
+        url: The URL to send the request to
+        **kwargs: Passed on to httpx.AsyncClient.request (timeouts come from request_timeout)
+
+    Returns:
+        httpx.Response: The response (non-retryable statuses are returned as they are)
+    """
+    client = get_footprint_client()
+
+    async def send():
+        try:
+            response = await client.request(method, url, timeout=request_timeout(), **kwargs)
+        except httpx.TimeoutException as e:
+            raise RetryableError("timeout", str(e) or type(e).__name__) from e
+        except httpx.TransportError as e:
+            raise RetryableError("network", str(e) or type(e).__name__) from e
+        metrics.inc("upstream_bytes_total", len(response.content), host=urlparse(url).netloc)
+        check_response(response)
+        return response
+
+    return await call_with_retries(send, url)
+
+
+def parse_dune_url(url):
+    """
+    Parse a Dune dashboard URL to extract handle and slug.
+
+    Args:
+        url: The Dune dashboard URL
+
+    Returns:
+        tuple: (handle, slug) or (None, None) if invalid
+    """
+    parsed_url = urlparse(url)
+    if 'dune.com' not in parsed_url.netloc:
+        return None, None
+
+    path_parts = parsed_url.path.strip('/').split('/')
+    if len(path_parts) != 2:
+        return None, None
+
+    return path_parts[0], path_parts[1]
+
+
+async def fetch_dashboard_info(handle, slug):
+    """
+    Fetch dashboard information from Dune API, served from the metadata cache when possible.
+
+    Args:
+        handle: The user/team handle
+        slug: The dashboard slug
+
+    Returns:
+        dict: Dashboard data or None if failed
+    """
+    key = f"dune:{handle}/{slug}"
+    # A parameter sweep asks for the same dashboard many times at once, one lookup serves them all
+    return await metadata_cache.get_or_fetch(key, lambda: get_flight("metadata").do(key, _fetch_dashboard_info, handle, slug))
+
+
+async def _fetch_dashboard_info(handle, slug, profile=None):
+    profile = profile or DUNE_DASHBOARD_PROFILE
+    dashboard_query = {
+        "operationName": "FindDashboard",
+        "variables": {
+            "filters": {
+                "slug": {"equals": slug},
+                "handle": {"equals": handle}
+            }
+        },
+        "query": FIND_DASHBOARD_QUERIES[profile]
+    }
+
+    with metrics.span("dashboard_lookup", source="dune", profile=profile):
+        response = await run_dune_request(GRAPHQL_API, dashboard_query)
+
+    if not response:
+        return None
+
+    # An upstream schema change could reject the trimmed selection, the full one is what dune.com itself sends
+    if response.get('errors') and not response.get('data') and profile != "full":
+        logger.error(f"FindDashboard ({profile}) rejected, retrying with the full profile: {response['errors']}")
+        return await _fetch_dashboard_info(handle, slug, "full")
+
+    # Check if dashboard exists
+    if not response.get('data', {}).get('dashboards', {}).get('edges'):
+        return None
+
+    return response['data']['dashboards']['edges'][0]['node']
+
+
+async def get_execution_ids(query_id, parameters, can_refresh=True):
+    """
+    Get the latest completed, pending and failed execution IDs of a query.
+
+    Args:
+        query_id: The query ID
+        parameters: Query parameters
+        can_refresh: Whether Dune may start a new run if the last result is outdated
+
+    Returns:
+        dict: {"completedExecutionId", "pendingExecutionId", "failedExecutionId"} or None if failed
+    """
+    execution_query = {
+        "operationName": "GetLatestResultSetIds",
+        "variables": {
+            "queryId": int(query_id),
+            "parameters": parameters,
+            "canRefresh": can_refresh
+        },
+        "query": GET_EXECUTION_QUERY
+    }
+
+    with metrics.span("execution_id", source="dune"):
+        response = await run_dune_request(GRAPHQL_API, execution_query)
+
+    if not response:
+        return None
+
+    return (response.get('data') or {}).get('resultSetForQuery') or None
+
+
+async def fetch_chart_data(execution_id, query_id, parameters, columns: Optional[list] = None):
+    """
+    Fetch chart data using execution ID.
+
+    Args:
+        execution_id: The execution ID
+        query_id: The query ID
+        parameters: Query parameters
+        columns: Output columns to fetch
+
+    Returns:
+        dict: Chart data or None if failed
+    """
+    chart_data_query = {
+        "execution_id": execution_id,
+        "query_id": int(query_id),
+        "parameters": parameters,
+        "sampling": {"count": 8000}
+    }
+    if columns:
+        chart_data_query['output_columns'] = columns
+
+    with metrics.span("chart_fetch", source="dune"):
+        response = await run_dune_request(EXECUTION_API, chart_data_query)
+
+    return response
+
+
+# Polling of pending executions: the interval starts at the min, grows by EXECUTION_POLL_BACKOFF per round
+EXECUTION_POLL_MIN_INTERVAL = float(os.getenv("EXECUTION_POLL_MIN_INTERVAL", "1"))
+EXECUTION_POLL_MAX_INTERVAL = float(os.getenv("EXECUTION_POLL_MAX_INTERVAL", "10"))
+EXECUTION_POLL_BACKOFF = 1.5
+# Give up on an execution still pending after this many seconds
+EXECUTION_POLL_TIMEOUT = float(os.getenv("EXECUTION_POLL_TIMEOUT", "300"))
+
+
+class ExecutionTracker:
+    """
+    Waits for pending Dune executions.
+
+    All pending executions are polled by a single loop, one GetLatestResultSetIds request
+    per distinct query per round, so a dashboard with many refreshing widgets doesn't run
+    one poll loop per widget. The interval starts short and backs off while nothing new
+    is pending.
+    """
+
+    def __init__(self):
+        self.pending = {}  # execution_id -> {"query_id", "parameters", "future", "started", "prefetch"}
+        self.interval = EXECUTION_POLL_MIN_INTERVAL
+        self.task = None
+        self.prefetching = set()  # downloads of completed prefetch executions
+
+    def wait(self, execution_id, query_id, parameters, prefetch=False):
+        """
+        Track a pending execution.
+
+        Args:
+            execution_id: The pending execution ID
+            query_id: The query ID
+            parameters: Query parameters
+            prefetch: Whether to download the result into the execution cache once it completes
+
+        Returns:
+            Awaitable of (state, execution_id): ("completed", id), ("failed", id) or ("timeout", None)
+        """
+        entry = self.pending.get(execution_id)
+        if entry is None:
+            loop = asyncio.get_running_loop()
+            entry = self.pending[execution_id] = {
+                "query_id": query_id,
+                "parameters": parameters,
+                "future": loop.create_future(),
+                "started": time.monotonic(),
+                "prefetch": False,
+            }
+            # New work, poll again soon
+            self.interval = EXECUTION_POLL_MIN_INTERVAL
+            if self.task is None or self.task.done():
+                # Polling outlives the deadline of the call that started it
+                context = contextvars.copy_context()
+                context.run(request_deadline.set, None)
+                self.task = loop.create_task(self.run(), context=context)
+        entry["prefetch"] = entry["prefetch"] or prefetch
+        return asyncio.shield(entry["future"])
+
+    async def run(self):
+        while self.pending:
+            await asyncio.sleep(self.interval)
+            self.interval = min(EXECUTION_POLL_MAX_INTERVAL, self.interval * EXECUTION_POLL_BACKOFF)
+
+            # One poll per distinct query answers every pending execution of that query
+            polls = {}
+            for execution_id, entry in self.pending.items():
+                polls.setdefault(query_key(entry["query_id"], entry["parameters"]), (entry["query_id"], entry["parameters"]))
+            logger.info(f"[Executions] Polling {len(polls)} queries for {len(self.pending)} pending executions")
+            statuses = await asyncio.gather(
+                *(get_execution_ids(query_id, parameters, can_refresh=False) for query_id, parameters in polls.values()),
+                return_exceptions=True,
+            )
+            statuses = dict(zip(polls, statuses))
+
+            for execution_id, entry in list(self.pending.items()):
+                status = statuses.get(query_key(entry["query_id"], entry["parameters"]))
+                if isinstance(status, dict):
+                    outcome = self.resolve(execution_id, status)
+                else:
+                    outcome = None
+                if outcome is None and time.monotonic() - entry["started"] > EXECUTION_POLL_TIMEOUT:
+                    logger.error(f"[Executions] Execution {execution_id} still pending after {EXECUTION_POLL_TIMEOUT:.0f}s")
+                    outcome = ("timeout", None)
+                if outcome is None:
+                    continue
+
+                del self.pending[execution_id]
+                entry["future"].set_result(outcome)
+                state, finished_id = outcome
+                logger.info(f"[Executions] Execution {execution_id}: {state}")
+                if state == "completed" and entry["prefetch"]:
+                    # Keep a reference to the task until it finishes so it isn't garbage collected
+                    task = asyncio.create_task(self.prefetch(finished_id, entry["query_id"], entry["parameters"]))
+                    self.prefetching.add(task)
+                    task.add_done_callback(self.prefetching.discard)
+
+    @staticmethod
+    async def prefetch(execution_id, query_id, parameters):
+        """Download a completed execution into the execution cache"""
+        try:
+            await load_execution(execution_id, query_id, parameters)
+        except Exception as e:
+            logger.error(f"[Executions] Error prefetching execution {execution_id}: {e}")
+
+    @staticmethod
+    def resolve(execution_id, status):
+        """Outcome of a pending execution given the latest IDs of its query, None while it's still running"""
+        if status.get("pendingExecutionId") == execution_id:
+            return None
+        if status.get("completedExecutionId") == execution_id:
+            return "completed", execution_id
+        if status.get("failedExecutionId") == execution_id:
+            return "failed", execution_id
+        # Superseded by another run, settle for the latest completed one
+        if status.get("completedExecutionId"):
+            return "completed", status["completedExecutionId"]
+        return None
+
+
+def get_execution_tracker():
+    """
+    Get the execution tracker of the running event loop.
+
+    Returns:
+        ExecutionTracker: The tracker
+    """
+    resources = get_loop_resources()
+    tracker = resources.get("executions")
+    if tracker is None:
+        tracker = resources["executions"] = ExecutionTracker()
+    return tracker
+
+
+def process_visualization(visualization):
+    """
+    Process a visualization to extract query details and options.
+
+    Args:
+        visualization: The visualization data
+
+    Returns:
+        tuple: (query_id, parameters, options, columns, viz_info) or None if invalid
+    """
+    if not visualization:
+        return None
+
+    query_details = visualization.get('query_details', {})
+    if not query_details:
+        return None
+
+    query_id = query_details.get('query_id')
+    parameters = query_details.get('parameters', [])
+    name = query_details.get('name', [])
+
+    if not query_id:
+        return None
+
+    # Extract visualization info
+    viz_info = {
+        "visualization_id": visualization.get('id'),
+        "visualization_type": visualization.get('type'),
+        "visualization_name": visualization.get('name')
+    }
+
+    # Process options
+    options = visualization.get('options', {})
+    if isinstance(options, str):
+        try:
+            options = json.loads(options)
+        except:
+            options = {}
+
+    # Extract columns from options
+    columns = []
+    column_mapping = options.get('columnMapping', {})
+    if column_mapping:
+        columns = list(column_mapping.keys())
+
+    return query_id, name, parameters, options, columns, viz_info
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into a single in-flight task"""
+
+    def __init__(self):
+        self.calls = {}
+
+    async def do(self, key, fn, *args, **kwargs):
+        """
+        Run fn unless a call with the same key is already in flight, in which case await its result.
+
+        Args:
+            key: Key identifying identical work
+            fn: The coroutine function to run
+            *args: Positional arguments for fn
+            **kwargs: Keyword arguments for fn
+
+        Returns:
+            The result of fn, shared by every caller that joined the flight
+        """
+        task = self.calls.get(key)
+        if task is None:
+            # Shared work isn't bound to the deadline of whoever started it, each caller stops waiting on its own
+            context = contextvars.copy_context()
+            context.run(request_deadline.set, None)
+            task = asyncio.get_running_loop().create_task(fn(*args, **kwargs), context=context)
+            self.calls[key] = task
+            task.add_done_callback(lambda done: self.calls.pop(key, None) if self.calls.get(key) is done else None)
+
+        # Shielded so that one cancelled caller doesn't cancel the fetch for everyone else
+        return await asyncio.shield(task)
+
+
+def get_flight(name):
+    """
+    Get a single-flight group of the running event loop.
+
+    Its tasks can only be awaited from the loop that created them, so the watchlist's loop
+    and the server's each coalesce their own calls.
+
+    Args:
+        name: "queries" or "metadata"
+
+    Returns:
+        SingleFlight: The group
+    """
+    flights = get_loop_resources()["flights"]
+    flight = flights.get(name)
+    if flight is None:
+        flight = flights[name] = SingleFlight()
+    return flight
+
+
+def query_key(query_id, parameters):
+    """
+    Build a key identifying a Dune query run: the query ID plus its canonicalized parameters.
+
+    Args:
+        query_id: The query ID
+        parameters: Query parameters
+
+    Returns:
+        str: The key
+    """
+    params = sorted((parameters or []), key=lambda p: json.dumps(p, sort_keys=True))
+    return f"{int(query_id)}:{json.dumps(params, sort_keys=True, separators=(',', ':'))}"
+
+
+def parameter_value(value):
+    """Dune parameter values are strings, or lists of strings for multi-select enums"""
+    if isinstance(value, list):
+        return [parameter_value(item) for item in value]
+    return value if isinstance(value, str) else str(value)
+
+
+def infer_parameter_type(value):
+    """Guess the Dune type of a parameter value given without one"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return "number"
+    if isinstance(value, list):
+        return "enum"
+    if isinstance(value, str) and re.match(r"^\d{4}-\d{2}-\d{2}([ T]\d{2}:\d{2}(:\d{2})?)?$", value):
+        return "datetime"
+    return "text"
+
+
+def override_parameters(parameters, overrides):
+    """
+    Apply parameter overrides to the parameters of a Dune query.
+
+    Args:
+        parameters: The query's parameters, [{"key", "type", "value", ...}]
+        overrides: {key: value}, a value may also be {"type": ..., "value": ...}
+
+    Returns:
+        list: New parameters, overridden ones keep their type (unless given) and other fields
+    """
+    if not overrides:
+        return parameters
+    result = []
+    for parameter in parameters or []:
+        override = overrides.get(parameter.get("key"))
+        if isinstance(override, dict):
+            parameter = {**parameter, **override, "value": parameter_value(override.get("value"))}
+        elif override is not None:
+            parameter = {**parameter, "value": parameter_value(override)}
+        result.append(parameter)
+    return result
+
+
+def build_parameters(overrides):
+    """
+    Build the parameters of a Dune query run from overrides alone, when the query's own aren't known.
+
+    Args:
+        overrides: {key: value}, a value may also be {"type": ..., "value": ...}
+
+    Returns:
+        list: [{"key", "type", "value"}], types inferred from the values unless given
+    """
+    parameters = []
+    for key, value in sorted((overrides or {}).items()):
+        if isinstance(value, dict):
+            value_type, value = value.get("type"), value.get("value")
+        else:
+            value_type = None
+        parameters.append({"key": key, "type": value_type or infer_parameter_type(value), "value": parameter_value(value)})
+    return parameters
+
+
+def parameters_key(overrides):
+    """Canonical string of parameter overrides, for cache keys"""
+    return json.dumps(overrides, sort_keys=True, separators=(',', ':'), default=str)
+
+
+async def fetch_query_result(query_id, parameters, columns=None):
+    """
+    Fetch the latest result of a query, sharing one in-flight fetch between identical callers.
+
+    Args:
+        query_id: The query ID
+        parameters: Query parameters
+        columns: Output columns to push down to the execution API, None for all columns
+
+    Returns:
+        tuple: (execution_id, chart_data), either may be None if not found; chart_data is only
+            {"pending_execution_id"} when the run was still pending after EXECUTION_POLL_TIMEOUT
+    """
+    key = query_key(query_id, parameters)
+    if columns:
+        key = f"{key}|{','.join(sorted(columns))}"
+    return await get_flight("queries").do(key, _fetch_query_result, query_id, parameters, columns)
+
+
+async def _fetch_query_result(query_id, parameters, columns=None):
+    logger.info(f"Getting execution ID for query {query_id}...")
+    ids = await get_execution_ids(query_id, parameters)
+    if not ids:
+        return None, None
+
+    execution_id = ids.get('completedExecutionId')
+    pending_id = ids.get('pendingExecutionId')
+    if pending_id and execution_id:
+        # Stale-while-revalidate: serve the last completed run, the new one is downloaded when it finishes
+        get_execution_tracker().wait(pending_id, query_id, parameters, prefetch=True)
+        execution_id, chart_data = await load_execution(execution_id, query_id, parameters, columns)
+        if chart_data:
+            chart_data = {**chart_data, 'pending_execution_id': pending_id}
+        return execution_id, chart_data
+
+    if pending_id:
+        logger.info(f"Waiting for pending execution {pending_id} of query {query_id}...")
+        state, execution_id = await get_execution_tracker().wait(pending_id, query_id, parameters)
+        if state == "timeout":
+            # Still running after EXECUTION_POLL_TIMEOUT, let the caller report it
+            return None, {'pending_execution_id': pending_id}
+    elif not execution_id:
+        # Only a failed run: its result carries the error
+        execution_id = ids.get('failedExecutionId')
+    if not execution_id:
+        return None, None
+
+    return await load_execution(execution_id, query_id, parameters, columns)
+
+
+async def load_execution(execution_id, query_id, parameters, columns=None):
+    """
+    Get the result of an execution, from the execution cache when possible.
+
+    Args:
+        execution_id: The execution ID
+        query_id: The query ID
+        parameters: Query parameters
+        columns: Output columns to fetch, None for all columns
+
+    Returns:
+        tuple: (execution_id, chart_data), chart_data may be None if the download failed
+    """
+    # A completed execution's result set never changes, so an unchanged execution ID skips the download
+    chart_data = execution_cache.get(execution_id)
+    if chart_data is not None:
+        logger.info(f"[Cache] Execution {execution_id} unchanged, reusing cached result")
+        if columns:
+            chart_data = {**chart_data, 'execution_succeeded': project_columns(chart_data['execution_succeeded'], columns)}
+        return execution_id, chart_data
+
+    cache_key = f"{execution_id}|{','.join(sorted(columns))}" if columns else execution_id
+    if columns:
+        chart_data = execution_cache.get(cache_key)
+        if chart_data is not None:
+            return execution_id, chart_data
+
+    logger.info(f"Fetching chart data for execution {execution_id}...")
+    chart_data = await fetch_chart_data(execution_id, query_id, parameters, columns)
+    if chart_data and chart_data.get('execution_succeeded'):
+        execution_cache.set(cache_key, chart_data)
+    return execution_id, chart_data
+
+
+def project_columns(result, columns):
+    """
+    Project a Dune result set onto a subset of its columns.
+
+    Args:
+        result: The execution_succeeded payload
+        columns: Columns to keep (e.g. a widget's columnMapping keys), empty to keep all
+
+    Returns:
+        dict: The projected result set, or the original one if no projection applies
+    """
+    wanted = set(columns or [])
+    all_columns = result.get('columns', [])
+    selected = [column for column in all_columns if column in wanted]
+    if not selected or len(selected) == len(all_columns):
+        return result
+
+    return {
+        **result,
+        'columns': selected,
+        'columns_metadata': [m for m in result.get('columns_metadata', []) if m.get('name') in wanted],
+        'data': [{column: row.get(column) for column in selected} for row in result.get('data', [])],
+    }
+
+
+def build_chart_result(query_id, options, columns, viz_info, chart_data, execution_id=None):
+    """
+    Build the chart entry of a dashboard widget from its query result.
+
+    Args:
+        query_id: The query ID
+        options: Visualization options
+        columns: Columns used by the visualization
+        viz_info: Visualization id/type/name
+        chart_data: Execution result of the query
+        execution_id: The execution the result comes from
+
+    Returns:
+        dict: Chart result
+    """
+    chart_result = {
+        **viz_info,
+        "query_id": query_id,
+        "execution_id": execution_id,
+        "options": options
+    }
+
+    if chart_data.get('execution_succeeded'):
+        succeeded_data = project_columns(chart_data['execution_succeeded'], columns)
+        chart_result['columns'] = succeeded_data.get('columns', [])
+        chart_result['columns_metadata'] = succeeded_data.get('columns_metadata', [])
+        chart_result['data'] = succeeded_data.get('data', [])
+        chart_result['total_row_count'] = succeeded_data.get('total_row_count', 0)
+    elif chart_data.get('execution_failed'):
+        chart_result['error'] = chart_data['execution_failed']
+    if chart_data.get('pending_execution_id'):
+        chart_result['pending_execution_id'] = chart_data['pending_execution_id']
+
+    return chart_result
+
+
+async def get_dune_chart_data(url: str, columns: Optional[list] = None, parameters: Optional[dict] = None) -> dict:
+    parsed_url = urlparse(url)
+    query_id = parsed_url.path.split('/')[2]
+    parameters = build_parameters(parameters)
+    fetched = await with_deadline(fetch_query_result(query_id, parameters, columns))
+    if fetched is None:
+        return {"error": "Deadline exceeded before the query result could be fetched"}
+    execution_id, chart_data = fetched
+    if not execution_id and chart_data:
+        return {"error": f"Execution still pending after {EXECUTION_POLL_TIMEOUT:.0f}s",
+                "pending_execution_id": chart_data['pending_execution_id']}
+    if not execution_id:
+        return {"error": "No execution found"}
+
+    if not chart_data:
+        return {"error": "No chart data found"}
+    if chart_data.get('execution_succeeded'):
+        chart_data = {**chart_data, 'execution_succeeded': {**chart_data['execution_succeeded'], 'execution_id': execution_id}}
+    return chart_data
+
+
+
+
+def list_dashboard_parameters(param_widgets, processed_widgets):
+    """
+    Describe the parameters a dashboard exposes, with the values its charts were fetched with.
+
+    Args:
+        param_widgets: The dashboard's paramWidgets, [{"key", "query_id"}]
+        processed_widgets: Widgets as returned by process_visualization, parameters overridden
+
+    Returns:
+        list: [{"key", "type", "value"}], one per key
+    """
+    query_parameters = {}
+    for query_id, _, params, *_ in processed_widgets:
+        for parameter in params or []:
+            query_parameters.setdefault((str(query_id), parameter.get('key')), parameter)
+
+    described = {}
+    for param_widget in param_widgets:
+        key = param_widget.get('key')
+        parameter = query_parameters.get((str(param_widget.get('query_id')), key))
+        if key in described or parameter is None:
+            continue
+        described[key] = {"key": key, "type": parameter.get('type'), "value": parameter.get('value')}
+    return list(described.values())
+
+
+async def get_dune_dashboard_data(url: str, parameters: Optional[dict] = None) -> dict:
+    """
+    Retrieve chart data from a Dune dashboard URL.
+
+    Args:
+        url: The URL of the Dune dashboard, e.g., https://dune.com/cryptokoryo/crypto-buy-signal
+        parameters: Overrides of the dashboard parameters, {key: value}
+
+    Returns:
+        dict: The dashboard with its chart data and parameters, or {"error": ...}
+    """
+    try:
+        # Step 1: Parse URL to get handle and slug
+        handle, slug = parse_dune_url(url)
+        if not handle or not slug:
+            return {"error": "Invalid Dune dashboard URL format"}
+
+        # Step 2: Fetch dashboard info
+        logger.info(f"Fetching dashboard info for {handle}/{slug}...")
+        dashboard_node = await fetch_dashboard_info(handle, slug)
+        if not dashboard_node:
+            return {"error": "Dashboard not found or access denied by Cloudflare."}
+
+        # Get visualization widgets
+        visualization_widgets = dashboard_node.get('visualizationWidgets', [])
+        if not visualization_widgets:
+            return {"error": "No visualizations found in dashboard"}
+
+        # Step 3: Process each visualization widget
+        processed_widgets = []
+        for widget in visualization_widgets:
+            processed_data = process_visualization(widget.get('visualization', {}))
+            if processed_data:
+                processed_widgets.append(processed_data)
+
+        # Overrides apply to every query having a parameter of that key, as a dashboard parameter widget does
+        param_widgets = dashboard_node.get('paramWidgets') or []
+        if parameters:
+            known = {p.get('key') for widget in processed_widgets for p in widget[2] or []}
+            known |= {param_widget.get('key') for param_widget in param_widgets}
+            unknown = sorted(set(parameters) - known)
+            if unknown:
+                available = ", ".join(sorted(key for key in known if key)) or "none"
+                return {"error": f"Unknown dashboard parameters: {', '.join(unknown)} (available: {available})"}
+            processed_widgets = [
+                (query_id, name, override_parameters(params, parameters), options, columns, viz_info)
+                for query_id, name, params, options, columns, viz_info in processed_widgets
+            ]
+
+        # Step 4: Fetch each distinct (query_id, parameters) once, concurrently (bounded per host)
+        queries = {}
+        for query_id, name, parameters, options, columns, viz_info in processed_widgets:
+            queries.setdefault(query_key(query_id, parameters), (query_id, parameters))
+
+        # Queries still running at the deadline (or pending past EXECUTION_POLL_TIMEOUT) are left out and reported in timed_out
+        fetched = await asyncio.gather(*(with_deadline(fetch_query_result(*query)) for query in queries.values()))
+        results = dict(zip(queries, fetched))
+
+        # Step 5: Project each widget's columns from the shared results, keeping dashboard order
+        charts_data = []
+        timed_out = []
+        for query_id, name, parameters, options, columns, viz_info in processed_widgets:
+            fetched_query = results[query_key(query_id, parameters)]
+            if fetched_query is None:
+                timed_out.append({**viz_info, "query_id": query_id})
+                continue
+            execution_id, chart_data = fetched_query
+            if not execution_id and chart_data:
+                timed_out.append({**viz_info, "query_id": query_id, "pending_execution_id": chart_data['pending_execution_id']})
+                continue
+            if not chart_data:
+                continue
+            charts_data.append(build_chart_result(query_id, options, columns, viz_info, chart_data, execution_id))
+
+        # Step 6: Return dashboard data with all charts
+        result = {
+            "dashboard_name": dashboard_node.get('name'),
+            "dashboard_slug": dashboard_node.get('slug'),
+            "dashboard_id": dashboard_node.get('id'),
+            "user": (dashboard_node.get('user') or {}).get('name'),
+            "charts": charts_data
+        }
+        dashboard_parameters = list_dashboard_parameters(param_widgets, processed_widgets)
+        if dashboard_parameters:
+            result["parameters"] = dashboard_parameters
+        if timed_out:
+            result["timed_out"] = timed_out
+
+        return result
+
+    except Exception as e:
+        return {"error": f"Failed to process dashboard: {str(e)}"}
+
+# @mcp.tool()
+async def get_footprint_chart_data(chart_url: str) -> dict | str:
+    """Get raw data from a Footprint Network chart
+    
+    Args:
+        chart_url: URL of the Footprint Network chart (e.g., https://www.footprint.network/@Higi/Sui-Bridge?type=chart)
+
+    Returns:
+        dict containing the chart's cols and rows, or an error string
+    """
+    try:
+        # Parse chart URL to extract username, dashboard name, and chart name
+        parts = chart_url.split("?")[0].split("/")
+        chart_uuid = parts[-1].split("fp-")[-1]
+
+        url=f"{CHART_API_URL}/{chart_uuid}/query"
+
+        parameters = {}
+        if "?" in chart_url:
+            params_str = chart_url.split("?")[1].split("#")[0]
             for param in params_str.split("&"):
                 if "=" in param:
                     key, value = param.split("=")
@@ -737,148 +2333,2506 @@ def get_footprint_chart_data(chart_url: str) -> str:
         if parameters:
             url = url + "?" + "&".join([f"{k}={v}" for k, v in parameters.items()])
 
-        with httpx.Client() as client:
-            response = client.get(url, timeout=60)
-            response.raise_for_status()
-            data = response.json()
+        with metrics.span("chart_fetch", source="footprint"):
+            response = await send_footprint_request("GET", url)
+        response.raise_for_status()
+        data = response.json()
+
+        # Keep columns and rows as they come, records are only built when rendering the output
+        return {"data": {
+            "cols": data.get("data", {}).get("cols", []),
+            "rows": data.get("data", {}).get("rows", []),
+        }}
+
+    except httpx.HTTPError as e:
+        return f"Error: HTTP error fetching chart data: {str(e)}"
+    except Exception as e:
+        return f"Error: Failed to get chart data: {str(e)}"
+        
+
+    
+
+# @mcp.tool()
+async def get_footprint_dashboard_data(dashboard_url: str) -> dict | str:
+    """Get raw data from a Footprint Network dashboard
+    
+    Args:
+        dashboard_url: URL of the Footprint Network dashboard (e.g., https://www.footprint.network/@Higi/Sui-Bridge)
+
+    Returns:
+        dict containing all chart data from the dashboard, or an error string
+    """
+    try:
+        # Parse dashboard URL to extract username and dashboard name
+        ## drop the #type=dashboard
+        dashboard_url = dashboard_url.split("#type")[0]
+        parts = dashboard_url.split("@")[1].split("?")[0].split("/")
+        username = parts[0]
+        dashboard_name = parts[1]
+        
+        # Extract parameters if any
+        parameters = {}
+        if "?" in dashboard_url:
+            params_str = dashboard_url.split("?")[1].split("#")[0]
+            for param in params_str.split("&"):
+                if "=" in param:
+                    key, value = param.split("=")
+                    parameters[key] = value
+        
+
+        
+        # Get dashboard UUID
+        uuid = await get_dashboard_uuid(username, dashboard_name)
+        if uuid.startswith("Error:"):
+            return uuid
+        
+        # Get chart data
+        charts_data = await get_charts_data(uuid, parameters)
+        if isinstance(charts_data, str):
+            return charts_data
+
+        return {"charts": charts_data}
+    except Exception as e:
+        return f"Error processing dashboard data: {str(e)}"
+
+async def get_dashboard_uuid(username, dashboard_name):
+    """Get dashboard UUID from Footprint Network API, served from the metadata cache when possible"""
+    return await metadata_cache.get_or_fetch(
+        f"footprint:{username}/{dashboard_name}",
+        lambda: _fetch_dashboard_uuid(username, dashboard_name),
+        valid=lambda uuid: bool(uuid) and not uuid.startswith("Error:"),
+    )
+
+async def _fetch_dashboard_uuid(username, dashboard_name):
+    url = f"{BASE_URL}/dashboard/basic"
+    
+    headers = {
+        "accept": "application/json, text/plain, */*",
+        "client_request_time": str(int(time.time() * 1000)),
+        "content-type": "application/json",
+        "origin": "https://www.footprint.network",
+        "referer": f"https://www.footprint.network/@{username}/{dashboard_name}",
+        "user-agent": "MCP-Footprint-Client"
+    }
+    
+    payload = {
+        "dashboardName": dashboard_name,
+        "userName": username
+    }
+
+    try:
+        with metrics.span("dashboard_lookup", source="footprint"):
+            response = await send_footprint_request("POST", url, headers=headers, json=payload)
+        response.raise_for_status()
+        data = response.json()
+        return data["data"]["uuid"]
+    except httpx.HTTPError as e:
+        return f"Error: HTTP error fetching dashboard UUID: {str(e)}"
+    except Exception as e:
+        return f"Error: Failed to get dashboard UUID: {str(e)}"
+
+async def get_charts_data(dashboard_uuid, parameters=None):
+    """Get chart data from Footprint Network API using dashboard UUID"""
+    headers = {
+        "Content-Type": "application/json"
+    }
+    
+    payload = {
+        "publicUuid": dashboard_uuid,
+        "dashboardId": "",
+        "paramters": parameters or {}
+    }
+    
+    try:
+        with metrics.span("chart_fetch", source="footprint"):
+            response = await send_footprint_request("POST", DATA_API_URL, headers=headers, json=payload)
+        response.raise_for_status()
+        data = response.json()
+        return data.get("results", [])
+    except httpx.HTTPError as e:
+        return f"Error: HTTP error fetching chart data: {str(e)}"
+    except Exception as e:
+        return f"Error: Failed to get chart data: {str(e)}"
+
+
+# Result cache for get_data: TTL per source (seconds, 0 disables), total size bound and optional disk tier
+CACHE_TTLS = {
+    "dune": int(os.getenv("CACHE_TTL_DUNE", "300")),
+    "footprint": int(os.getenv("CACHE_TTL_FOOTPRINT", "300")),
+}
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+CACHE_DIR = os.getenv("CACHE_DIR")
+# Rows per chart returned by get_data when paginating without an explicit page_size
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "1000"))
+# Formats written to files under EXPORT_DIR instead of being returned inline (optional deps: pyarrow, msgpack)
+EXPORT_FORMATS = ("arrow", "parquet", "msgpack")
+# Output shapes accepted by get_data's format parameter
+OUTPUT_FORMATS = ("records", "columnar", "resource") + EXPORT_FORMATS
+EXPORT_DIR = os.getenv("EXPORT_DIR") or os.path.join(tempfile.gettempdir(), "graph-mcp-exports")
+# Bounds of EXPORT_DIR: oldest files are removed past the total size, or the age in seconds (0 disables)
+EXPORT_MAX_BYTES = int(os.getenv("EXPORT_MAX_BYTES", str(1024 * 1024 * 1024)))
+EXPORT_MAX_AGE = int(os.getenv("EXPORT_MAX_AGE", str(24 * 3600)))
+# Charts persisted by get_data(format="resource"), served as chart:// MCP resources
+CHART_STORE_DIR = os.getenv("CHART_STORE_DIR") or os.path.join(tempfile.gettempdir(), "graph-mcp-charts")
+# Total size of CHART_STORE_DIR, least recently written charts are removed past it
+CHART_STORE_MAX_BYTES = int(os.getenv("CHART_STORE_MAX_BYTES", str(1024 * 1024 * 1024)))
+# Max URLs in one get_data_batch call
+BATCH_MAX_URLS = int(os.getenv("BATCH_MAX_URLS", "50"))
+# Max parameter sets in one get_data sweep
+SWEEP_MAX_SETS = int(os.getenv("SWEEP_MAX_SETS", "20"))
+EXECUTION_CACHE_TTL = int(os.getenv("EXECUTION_CACHE_TTL", str(24 * 3600)))
+EXECUTION_CACHE_MAX_BYTES = int(os.getenv("EXECUTION_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# Dashboard metadata (structure, UUIDs) is served fresh for METADATA_FRESH_TTL, then stale while revalidating
+METADATA_FRESH_TTL = int(os.getenv("METADATA_FRESH_TTL", "3600"))
+METADATA_MAX_AGE = int(os.getenv("METADATA_MAX_AGE", str(24 * 3600)))
+
+
+def estimate_json_size(value, sample=64):
+    """
+    Estimate the JSON size of a value without serializing it, sampling long lists.
+
+    Args:
+        value: A JSON-serializable value
+        sample: Number of items measured in lists longer than this
+
+    Returns:
+        int: Approximate size in bytes
+    """
+    if isinstance(value, str):
+        return len(value) + 2
+    if isinstance(value, dict):
+        return 2 + sum(len(str(key)) + 4 + estimate_json_size(item, sample) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        if len(value) > sample:
+            step = len(value) / sample
+            measured = sum(estimate_json_size(value[int(i * step)], sample) + 2 for i in range(sample))
+            return 2 + measured * len(value) // sample
+        return 2 + sum(estimate_json_size(item, sample) + 2 for item in value)
+    return len(str(value))
+
+
+class ResultCache:
+    """In-memory TTL + LRU cache bounded by the total size of its values, with an optional on-disk tier"""
+
+    def __init__(self, max_bytes, default_ttl=300, cache_dir=None):
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.cache_dir = cache_dir
+        self.entries = OrderedDict()  # key -> (expires_at, size, value), least recently used first
+        self.total_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def sizeof(value):
+        """Approximate size of a cached value in bytes"""
+        if isinstance(value, (str, bytes)):
+            return len(value)
+        return estimate_json_size(value)
+
+    def get(self, key):
+        """
+        Get a cached value.
+
+        Args:
+            key: The cache key
+
+        Returns:
+            The cached value, or None if missing or expired
+        """
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[0] > now:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            if entry:
+                self._remove(key)
+
+        value, expires_at = self._read_disk(key, now)
+        with self.lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._store(key, value, expires_at)
+        return value
+
+    def set(self, key, value, ttl=None):
+        """
+        Cache a value.
+
+        Args:
+            key: The cache key
+            value: A JSON-serializable value
+            ttl: Time to live in seconds, defaults to the cache's default TTL
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+
+        expires_at = time.time() + ttl
+        with self.lock:
+            self._store(key, value, expires_at)
+        self._write_disk(key, value, expires_at)
+
+    def invalidate(self, key):
+        """Drop a key from memory and disk"""
+        with self.lock:
+            self._remove(key)
+        if self.cache_dir:
+            try:
+                os.remove(self._disk_path(key))
+            except FileNotFoundError:
+                pass
+
+    def invalidate_prefix(self, prefix):
+        """
+        Drop a key and every key extending it ("{prefix}|..."), from memory and disk.
+
+        Args:
+            prefix: The base key, e.g. a normalized URL
+
+        Returns:
+            int: Number of entries dropped
+        """
+        def matches(key):
+            return key == prefix or key.startswith(f"{prefix}|")
+
+        with self.lock:
+            keys = [key for key in self.entries if matches(key)]
+            for key in keys:
+                self._remove(key)
+        dropped = set(keys)
+        if self.cache_dir:
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(self.cache_dir, name)
+                key = self._read_disk_key(path)
+                if key is not None and matches(key):
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        continue
+                    dropped.add(key)
+        return len(dropped)
+
+    def clear(self):
+        """Drop every key from memory and disk"""
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+        if self.cache_dir:
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(".json"):
+                    try:
+                        os.remove(os.path.join(self.cache_dir, name))
+                    except OSError:
+                        pass
+
+    def stats(self):
+        """Hit/miss counters and current usage"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def _store(self, key, value, expires_at):
+        self._remove(key)
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return
+        self.entries[key] = (expires_at, size, value)
+        self.total_bytes += size
+        while self.total_bytes > self.max_bytes:
+            _, (_, evicted_size, _) = self.entries.popitem(last=False)
+            self.total_bytes -= evicted_size
+            self.evictions += 1
+
+    def _remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry:
+            self.total_bytes -= entry[1]
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, hashlib.sha256(key.encode()).hexdigest() + ".json")
+
+    def _read_disk(self, key, now):
+        if not self.cache_dir:
+            return None, None
+        path = self._disk_path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None, None
+        if entry.get("key") != key or entry.get("expires_at", 0) <= now:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None, None
+        return entry["value"], entry["expires_at"]
+
+    @staticmethod
+    def _read_disk_key(path):
+        """Key of a disk entry, decoded from the head of the file since _write_disk writes it first"""
+        try:
+            with open(path, encoding="utf-8") as f:
+                head = f.read(64 * 1024)
+        except OSError:
+            return None
+        if not head.startswith('{"key": '):
+            return None
+        try:
+            key, _ = json.JSONDecoder().raw_decode(head, len('{"key": '))
+        except ValueError:
+            return None
+        return key if isinstance(key, str) else None
+
+    def _write_disk(self, key, value, expires_at):
+        if not self.cache_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"key": key, "expires_at": expires_at, "value": value}, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error(f"[Cache] Error writing {path}: {e}")
+
+
+result_cache = ResultCache(CACHE_MAX_BYTES, cache_dir=CACHE_DIR)
+# Dune result sets keyed by completed execution ID, immutable so they can live much longer
+execution_cache = ResultCache(
+    EXECUTION_CACHE_MAX_BYTES,
+    default_ttl=EXECUTION_CACHE_TTL,
+    cache_dir=os.path.join(CACHE_DIR, "executions") if CACHE_DIR else None,
+)
+
+
+class MetadataCache:
+    """Long-lived cache for dashboard structure, served stale and revalidated in the background"""
+
+    def __init__(self, fresh_ttl, max_age, max_entries=1024):
+        self.fresh_ttl = fresh_ttl
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # key -> (fetched_at, value), least recently used first
+        self.refreshing = {}  # key -> revalidation task
+        self.lock = threading.Lock()
+
+    async def get_or_fetch(self, key, fetch, valid=lambda value: value is not None):
+        """
+        Get a cached value, fetching it if missing or too old.
+
+        Entries younger than fresh_ttl are returned as is. Entries younger than max_age are
+        returned immediately while a background task revalidates them.
+
+        Args:
+            key: The cache key
+            fetch: Coroutine function fetching the value from upstream
+            valid: Predicate telling whether a fetched value may be cached
+
+        Returns:
+            The cached or fetched value
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry:
+                self.entries.move_to_end(key)
+
+        if entry:
+            age = time.time() - entry[0]
+            if age < self.fresh_ttl:
+                metrics.inc("metadata_cache_lookups_total", outcome="fresh")
+                return entry[1]
+            if age < self.max_age:
+                metrics.inc("metadata_cache_lookups_total", outcome="stale")
+                self._revalidate_in_background(key, fetch, valid)
+                return entry[1]
+
+        metrics.inc("metadata_cache_lookups_total", outcome="miss")
+        value = await fetch()
+        if valid(value):
+            self.set(key, value)
+        return value
+
+    def set(self, key, value):
+        """Store a freshly fetched value"""
+        with self.lock:
+            self.entries[key] = (time.time(), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, key=None):
+        """Drop one key, or everything if key is None"""
+        with self.lock:
+            if key is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(key, None)
+
+    def _revalidate_in_background(self, key, fetch, valid):
+        if key in self.refreshing:
+            return
+
+        async def revalidate():
+            try:
+                value = await fetch()
+                if valid(value):
+                    self.set(key, value)
+            except Exception as e:
+                logger.error(f"[Metadata Cache] Error revalidating {key}: {e}")
+            finally:
+                self.refreshing.pop(key, None)
+
+        # Keep a reference to the task until it finishes so it isn't garbage collected
+        self.refreshing[key] = asyncio.create_task(revalidate())
+
+
+metadata_cache = MetadataCache(METADATA_FRESH_TTL, METADATA_MAX_AGE)
+
+
+def get_metadata_key(url):
+    """
+    Get the metadata cache key of a dashboard URL.
+
+    Args:
+        url: URL of the graph
+
+    Returns:
+        str: The key, or None if the URL is not a dashboard
+    """
+    source = get_url_source(url)
+    if source == "dune" and "queries" not in url:
+        handle, slug = parse_dune_url(url)
+        if handle and slug:
+            return f"dune:{handle}/{slug}"
+    elif source == "footprint" and "/chart" not in url and "@" in url:
+        parts = url.split("#type")[0].split("@")[1].split("?")[0].split("/")
+        if len(parts) >= 2:
+            return f"footprint:{parts[0]}/{parts[1]}"
+    return None
+
+
+def get_url_source(url):
+    """
+    Get the data source of a graph URL.
+
+    Args:
+        url: URL of the graph
+
+    Returns:
+        str: "footprint", "dune" or None if not supported
+    """
+    if "footprint.network" in url:
+        return "footprint"
+    if "dune.com" in url:
+        return "dune"
+    return None
+
+
+def normalize_url(url):
+    """
+    Normalize a graph URL for use as a cache key.
+
+    Lowercases scheme and host, drops trailing slashes and "#type=..." fragments,
+    and sorts query parameters.
+
+    Args:
+        url: URL of the graph
+
+    Returns:
+        str: The normalized URL
+    """
+    parsed = urlparse(url.strip())
+    query = urlencode(sorted(parse_qsl(parsed.query, keep_blank_values=True)))
+    fragment = "" if parsed.fragment.startswith("type") else parsed.fragment
+    return urlunparse((
+        parsed.scheme.lower(),
+        parsed.netloc.lower(),
+        parsed.path.rstrip("/"),
+        parsed.params,
+        query,
+        fragment,
+    ))
+
+
+def is_error_result(result):
+    """Whether a get_data result is an error (an error string or {"error": ...}), which must not be cached"""
+    return isinstance(result, str) or "error" in result
+
+
+def is_partial_result(result):
+    """
+    Check whether a result is incomplete (charts timed out) or stale (executions still refreshing).
+
+    Args:
+        result: A get_data result
+
+    Returns:
+        bool: True if some of the data is missing or outdated
+    """
+    if result.get("timed_out") or result.get("pending_execution_id"):
+        return True
+    return any(isinstance(chart, dict) and chart.get("pending_execution_id") for chart in result.get("charts") or [])
+
+
+def map_tables(result, fn):
+    """
+    Apply fn to every table of a get_data result without mutating the (possibly cached) result.
+
+    Tables are Dune dashboard charts (charts[].data), Dune query results
+    (execution_succeeded.data), Footprint charts (data) and Footprint dashboard
+    cards (charts[].data.rows).
+
+    Args:
+        result: A get_data result
+        fn: Function taking a table dict and the key of its row list, returning the new table dict
+
+    Returns:
+        dict: The new result
+    """
+    def map_chart(chart):
+        data = chart.get("data")
+        if isinstance(data, list):
+            return fn(chart, "data")
+        if isinstance(data, dict) and isinstance(data.get("rows"), list):
+            return {**chart, "data": fn(data, "rows")}
+        return chart
+
+    if isinstance(result.get("charts"), list):
+        return {**result, "charts": [map_chart(chart) if isinstance(chart, dict) else chart for chart in result["charts"]]}
+    if isinstance(result.get("execution_succeeded"), dict):
+        return {**result, "execution_succeeded": fn(result["execution_succeeded"], "data")}
+    return map_chart(result)
+
+
+# Keys identifying a chart of a dashboard: Dune visualization_id, Footprint card id
+CHART_ID_KEYS = ("visualization_id", "cardId", "card_id", "id")
+
+
+def get_chart_key(chart, position):
+    """Stable identity of a dashboard chart, its position only when it carries no id"""
+    for key in CHART_ID_KEYS:
+        if chart.get(key) is not None:
+            return f"{key}={chart[key]}"
+    return f"#{position}"
+
+
+def select_chart(result, chart_id):
+    """
+    Keep a single chart of a dashboard result.
+
+    Args:
+        result: A get_data result
+        chart_id: Dune visualization_id or Footprint card id
+
+    Returns:
+        dict: The result restricted to the matching chart
+    """
+    charts = result.get("charts")
+    if not isinstance(charts, list):
+        return result
+
+    selected = [
+        chart for chart in charts
+        if isinstance(chart, dict) and any(str(chart.get(key)) == str(chart_id) for key in CHART_ID_KEYS if key in chart)
+    ]
+    return {**result, "charts": selected}
+
+
+def paginate_result(result, page, page_size):
+    """
+    Slice every table of a get_data result to one page of rows.
+
+    Args:
+        result: A get_data result
+        page: 1-based page number
+        page_size: Rows per page
+
+    Returns:
+        dict: The result with each table's rows sliced and a "pagination" entry next to them
+    """
+    start = (page - 1) * page_size
+
+    def paginate(table, key):
+        rows = table.get(key) or []
+        return {
+            **table,
+            key: rows[start:start + page_size],
+            "pagination": {
+                "page": page,
+                "page_size": page_size,
+                "total_rows": len(rows),
+                "has_more": start + page_size < len(rows),
+            },
+        }
+
+    return map_tables(result, paginate)
+
+
+def to_records(columns, rows):
+    """
+    Zip column names onto row lists.
+
+    Args:
+        columns: Column names
+        rows: Row lists
+
+    Returns:
+        list: One dict per row
+    """
+    return [dict(zip(columns, row)) for row in rows]
+
+
+def render_result(result, format="records"):
+    """
+    Shape a get_data result for output.
+
+    "records" keeps each source's usual shape, turning Footprint chart cols/rows into
+    {"data": [{column: value}, ...]}. "columnar" renders every table as
+    {"columns": [...], "rows": [[...]]}, which doesn't repeat column names on every row.
+
+    Args:
+        result: A get_data result
+        format: One of OUTPUT_FORMATS
+
+    Returns:
+        dict: The result to encode
+    """
+    data = result.get("data")
+    if isinstance(data, dict) and "cols" in data and "charts" not in result:
+        # Footprint chart
+        names = [col.get("display_name") for col in data["cols"]]
+        extra = {key: value for key, value in data.items() if key not in ("cols", "rows")}
+        if format == "columnar":
+            return {"columns": names, "rows": data["rows"], **extra}
+        return {"data": to_records(names, data["rows"]), **extra}
+
+    if format != "columnar":
+        return result
+
+    def columnar(table, key):
+        rows = table.get(key) or []
+        if rows and not isinstance(rows[0], dict):
+            return table
+        names = table.get("columns") or (list(rows[0].keys()) if rows else [])
+        rendered = {name: value for name, value in table.items() if name != key}
+        rendered["columns"] = names
+        rendered["rows"] = [[row.get(name) for name in names] for row in rows]
+        return rendered
+
+    return map_tables(result, columnar)
+
+
+def encode_result(result):
+    """
+    Serialize a get_data result to JSON, chart by chart.
+
+    Encoding each chart separately into one buffer avoids holding a second
+    full-size list of encoder chunks for the whole dashboard.
+
+    Args:
+        result: A get_data result
+
+    Returns:
+        str: JSON string
+    """
+    if isinstance(result, str):
+        return result
+    with metrics.span("serialization"):
+        return _encode_result(result)
+
+
+def _encode_result(result):
+    charts = result.get("charts")
+    if not isinstance(charts, list):
+        return json.dumps(result)
+
+    buffer = io.StringIO()
+    head = json.dumps({key: value for key, value in result.items() if key != "charts"})
+    buffer.write(head[:-1])
+    buffer.write(', "charts": [' if len(head) > 2 else '"charts": [')
+    for i, chart in enumerate(charts):
+        if i:
+            buffer.write(", ")
+        buffer.write(json.dumps(chart))
+    buffer.write("]}")
+    return buffer.getvalue()
+
+
+def get_table_arrays(table, rows_key):
+    """
+    Get the column names and per-column value lists of a table, read straight from its rows.
+
+    Args:
+        table: The table dict
+        rows_key: Key of its row list
+
+    Returns:
+        tuple: (column names, list of value lists in the same order)
+    """
+    rows = table.get(rows_key) or []
+    if "cols" in table and not (rows and isinstance(rows[0], dict)):
+        names = [col.get("display_name") or col.get("name") for col in table["cols"]]
+        return names, [[row[i] if i < len(row) else None for row in rows] for i in range(len(names))]
+
+    names, getter = get_table_columns(table, rows_key)
+    return names, [list(map(getter(name), rows)) for name in names]
+
+
+def to_arrow_table(names, columns):
+    """
+    Build a pyarrow Table from column value lists.
+
+    Columns mixing types Arrow can't unify are stored as text (JSON for nested values).
+
+    Args:
+        names: Column names
+        columns: Value lists, one per column
+
+    Returns:
+        pyarrow.Table: The table
+    """
+    import pyarrow as pa
+
+    arrays = []
+    for values in columns:
+        try:
+            arrays.append(pa.array(values))
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            arrays.append(pa.array([
+                None if value is None else json.dumps(value) if isinstance(value, (dict, list)) else str(value)
+                for value in values
+            ]))
+    return pa.Table.from_arrays(arrays, names=names)
+
+
+def new_export_path(extension):
+    """Unique file path under EXPORT_DIR"""
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    return os.path.join(EXPORT_DIR, f"{uuid.uuid4().hex}.{extension}")
+
+
+def prune_files(directory, max_bytes, max_age=0, keep=()):
+    """
+    Remove the oldest files of a directory tree (by mtime) until it fits its bounds.
+
+    Args:
+        directory: Root of the tree
+        max_bytes: Max total size of the files
+        max_age: Max age of a file in seconds, 0 for no limit
+        keep: Paths never removed, e.g. the files just written
+
+    Returns:
+        list: Paths of the removed files
+    """
+    files = []
+    for dirpath, _, names in os.walk(directory):
+        for name in names:
+            # Files still being written by another thread
+            if name.endswith(".tmp"):
+                continue
+            path = os.path.join(dirpath, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+
+    files.sort()
+    total = sum(size for _, size, _ in files)
+    oldest = time.time() - max_age if max_age else None
+    keep = set(keep)
+    removed = []
+    for mtime, size, path in files:
+        if total <= max_bytes and (oldest is None or mtime >= oldest):
+            break
+        if path in keep:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.error(f"[Files] Error removing {path}: {e}")
+            continue
+        total -= size
+        removed.append(path)
+    return removed
+
+
+def describe_export(path, format, **extra):
+    """Reference to an exported file, returned in place of the data"""
+    return {"format": format, "path": path, "uri": f"file://{quote(path)}", "bytes": os.path.getsize(path), **extra}
+
+
+def export_result(result, format):
+    """
+    Write a get_data result to files under EXPORT_DIR.
+
+    "arrow" (Arrow IPC file) and "parquet" write one file per table and replace its rows
+    with a reference to the file. "msgpack" writes the whole columnar result to one file.
+
+    Args:
+        result: A get_data result
+        format: One of EXPORT_FORMATS
+
+    Returns:
+        dict: The result with file references instead of rows
+
+    Raises:
+        ImportError: The optional dependency of the format is not installed
+    """
+    written = []
+    try:
+        return _export_result(result, format, written)
+    finally:
+        removed = prune_files(EXPORT_DIR, EXPORT_MAX_BYTES, EXPORT_MAX_AGE, keep=written)
+        if removed:
+            logger.info(f"[Export] Removed {len(removed)} old export files")
+
+
+def _export_result(result, format, written):
+    if format == "msgpack":
+        import msgpack
+
+        path = new_export_path("msgpack")
+        written.append(path)
+        with open(path, "wb") as f:
+            f.write(msgpack.packb(render_result(result, "columnar")))
+        return {"file": describe_export(path, format)}
+
+    import pyarrow as pa
+
+    def export(table, rows_key):
+        names, columns = get_table_arrays(table, rows_key)
+        arrow_table = to_arrow_table(names, columns)
+        if format == "parquet":
+            import pyarrow.parquet as pq
+
+            path = new_export_path("parquet")
+            written.append(path)
+            pq.write_table(arrow_table, path)
+        else:
+            path = new_export_path("arrow")
+            written.append(path)
+            with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, arrow_table.schema) as writer:
+                writer.write_table(arrow_table)
+
+        exported = {key: value for key, value in table.items() if key not in (rows_key, "cols")}
+        exported["columns"] = names
+        exported["file"] = describe_export(path, format, rows=arrow_table.num_rows)
+        return exported
+
+    return map_tables(result, export)
+
+
+class ChartStore:
+    """
+    Local store of chart tables, one Arrow IPC file per chart, memory-mapped for reads.
+
+    Dune tables are keyed by execution ID (immutable, written once), Footprint tables by
+    card UUID (rewritten on every store). Reads slice the mapped file, so repeat reads
+    neither download nor parse anything. The oldest files are removed past max_bytes.
+    """
+
+    def __init__(self, root, max_bytes, max_open=64):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_open = max_open
+        self.open_tables = OrderedDict()  # (path, mtime_ns) -> pyarrow.Table, least recently used first
+        self.lock = threading.Lock()
+
+    def path(self, source, chart_id):
+        if source not in CACHE_TTLS or not chart_id or not all(c.isalnum() or c in "-_" for c in chart_id):
+            raise ValueError(f"Unknown chart {source}/{chart_id}")
+        return os.path.join(self.root, source, f"{chart_id}.arrow")
+
+    def exists(self, source, chart_id):
+        return os.path.exists(self.path(source, chart_id))
+
+    def put(self, source, chart_id, names, columns, metadata):
+        """
+        Write a chart table.
+
+        Args:
+            source: "dune" or "footprint"
+            chart_id: Store ID of the chart
+            names: Column names
+            columns: Value lists, one per column
+            metadata: JSON-serializable chart metadata kept with the table
+
+        Returns:
+            str: Path of the file
+        """
+        import pyarrow as pa
+
+        path = self.path(source, chart_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        table = to_arrow_table(names, columns).replace_schema_metadata({"chart": json.dumps(metadata, default=str)})
+        # Readers may still map the previous file, so the new one is swapped in
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp_path, path)
+
+        removed = set(prune_files(self.root, self.max_bytes, keep=[path]))
+        if removed:
+            logger.info(f"[Chart Store] Removed {len(removed)} old charts")
+            with self.lock:
+                for key in [key for key in self.open_tables if key[0] in removed]:
+                    del self.open_tables[key]
+        return path
+
+    def open(self, source, chart_id):
+        """
+        Get a stored chart table, memory-mapped.
+
+        Returns:
+            pyarrow.Table: The table
+
+        Raises:
+            ValueError: No such chart
+        """
+        import pyarrow as pa
+
+        path = self.path(source, chart_id)
+        try:
+            key = (path, os.stat(path).st_mtime_ns)
+        except FileNotFoundError:
+            raise ValueError(f"Unknown chart {source}/{chart_id}")
+
+        with self.lock:
+            table = self.open_tables.get(key)
+            if table is not None:
+                self.open_tables.move_to_end(key)
+                return table
+
+        table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+        with self.lock:
+            self.open_tables[key] = table
+            while len(self.open_tables) > self.max_open:
+                self.open_tables.popitem(last=False)
+        return table
+
+    def read(self, source, chart_id, offset=0, limit=None):
+        """
+        Read a slice of a stored chart.
+
+        Args:
+            source: "dune" or "footprint"
+            chart_id: Store ID of the chart
+            offset: First row
+            limit: Max rows, defaults to DEFAULT_PAGE_SIZE
+
+        Returns:
+            dict: Chart metadata, columns, total row count and the rows of the slice
+        """
+        table = self.open(source, chart_id)
+        limit = DEFAULT_PAGE_SIZE if limit is None else limit
+        sliced = table.slice(offset, limit)
+        metadata = json.loads((table.schema.metadata or {}).get(b"chart", b"{}"))
+        return {
+            **metadata,
+            "uri": f"chart://{source}/{chart_id}",
+            "columns": table.column_names,
+            "total_rows": table.num_rows,
+            "offset": offset,
+            "limit": limit,
+            "rows": [list(row) for row in zip(*(column.to_pylist() for column in sliced.columns))],
+        }
+
+
+chart_store = ChartStore(CHART_STORE_DIR, CHART_STORE_MAX_BYTES)
+
+
+def store_result(url, result, signature=""):
+    """
+    Persist every table of a get_data result to the chart store.
+
+    Args:
+        url: URL of the graph
+        result: The get_data result
+        signature: Query options the tables were shaped with, part of their store ID
+
+    Returns:
+        dict: The result with chart:// resource handles instead of rows
+
+    Raises:
+        ImportError: pyarrow is not installed
+    """
+    import pyarrow  # noqa: F401
+
+    source = get_url_source(url)
+    url_id = hashlib.sha256(normalize_url(url).encode()).hexdigest()[:16]
+    # Footprint chart URLs end with the card UUID
+    card_uuid = url.split("?")[0].split("#")[0].rstrip("/").split("/")[-1].split("fp-")[-1] if "/chart" in url else None
+    positions = itertools.count()
+
+    def store(table, rows_key):
+        position = next(positions)
+        if table.get("execution_id"):
+            base, immutable, scope = str(table["execution_id"]), True, None
+        elif card_uuid:
+            # The card's data depends on the URL's query string (e.g. ?chain=eth), not only on the UUID
+            base, immutable, scope = card_uuid, False, normalize_url(url)
+        else:
+            base, immutable, scope = f"{url_id}-{position}", False, None
+
+        if rows_key == "rows" and "cols" in table:
+            table_columns = [col.get("display_name") or col.get("name") for col in table["cols"]]
+        else:
+            table_columns = table.get("columns") or []
+        # A delta cut is part of the shape: its effective watermark, whether passed or stored
+        cut = (table.get("delta") or {}).get("since")
+        shape = hashlib.sha256(json.dumps([table_columns, signature, cut, scope], default=str).encode()).hexdigest()[:8]
+        chart_id = "".join(c if c.isalnum() or c in "-_" else "_" for c in f"{base}-{shape}")
+
+        if not (immutable and chart_store.exists(source, chart_id)):
+            names, columns = get_table_arrays(table, rows_key)
+            metadata = {key: value for key, value in table.items() if key not in (rows_key, "cols", "columns")}
+            chart_store.put(source, chart_id, names, columns, metadata)
+        stored = chart_store.open(source, chart_id)
+
+        handle = {key: value for key, value in table.items() if key not in (rows_key, "cols")}
+        handle["columns"] = stored.column_names
+        handle["resource"] = f"chart://{source}/{chart_id}"
+        handle["row_count"] = stored.num_rows
+        return handle
+
+    return map_tables(result, store)
+
+
+# Comparison operators accepted in get_data filters
+FILTER_OPERATORS = {
+    "=": operator.eq,
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "in": lambda value, expected: value in expected,
+    "contains": lambda value, expected: str(expected).lower() in str(value).lower(),
+}
+
+
+def parse_order_by(order_by):
+    """
+    Parse an order_by expression.
+
+    Args:
+        order_by: Comma separated columns, a leading "-" sorts descending (e.g. "-day,chain")
+
+    Returns:
+        list: (column, descending) tuples
+    """
+    order = []
+    for part in (order_by or "").split(","):
+        part = part.strip()
+        if part.startswith("-"):
+            order.append((part[1:].strip(), True))
+        elif part:
+            order.append((part, False))
+    return order
+
+
+def compile_filter(spec):
+    """
+    Compile a filter spec into a predicate on a single value.
+
+    Args:
+        spec: {"column": ..., "op": one of FILTER_OPERATORS (default "="), "value": ...}
+
+    Returns:
+        tuple: (column, predicate)
+    """
+    column = spec.get("column")
+    op = spec.get("op", "=")
+    expected = spec.get("value")
+    if not column:
+        raise ValueError(f"Filter without column: {spec}")
+    if op not in FILTER_OPERATORS:
+        raise ValueError(f"Unsupported filter operator: {op}")
+    compare = FILTER_OPERATORS[op]
+    numeric = isinstance(expected, (int, float)) and not isinstance(expected, bool)
+    # Numeric values compared with a number sent as a string, e.g. {"op": ">", "value": "100"}
+    expected_number = None
+    if isinstance(expected, str) and op not in ("in", "contains"):
+        try:
+            expected_number = float(expected)
+        except ValueError:
+            pass
+
+    def predicate(value):
+        if value is None:
+            return op == "!=" and expected is not None
+        if numeric and isinstance(value, str):
+            try:
+                value = float(value)
+            except ValueError:
+                return False
+        elif expected_number is not None and isinstance(value, (int, float)) and not isinstance(value, bool):
+            return compare(value, expected_number)
+        try:
+            return compare(value, expected)
+        except TypeError:
+            return False
+
+    return column, predicate
+
+
+def get_table_columns(table, rows_key):
+    """
+    Get the column names of a table and a factory of per-column value getters.
+
+    Dict rows (Dune, Footprint charts) are read by key, list rows (Footprint
+    dashboard cards) by the position of the column in "cols".
+
+    Args:
+        table: The table dict
+        rows_key: Key of its row list
+
+    Returns:
+        tuple: (column names, getter factory taking a column name)
+    """
+    rows = table.get(rows_key) or []
+    if "cols" in table and not (rows and isinstance(rows[0], dict)):
+        index = {}
+        for i, col in enumerate(table["cols"]):
+            for name in (col.get("name"), col.get("display_name")):
+                if name is not None:
+                    index.setdefault(name, i)
+
+        def getter(name):
+            i = index[name]
+            return lambda row: row[i] if i < len(row) else None
+
+        return list(index), getter
+
+    names = table.get("columns") or (list(rows[0].keys()) if rows and isinstance(rows[0], dict) else [])
+
+    def getter(name):
+        return lambda row: row.get(name)
+
+    return names, getter
+
+
+def sort_rows(rows, getter, descending):
+    """Sort rows on one column, keeping rows without a value last"""
+    present = [row for row in rows if getter(row) is not None]
+    missing = [row for row in rows if getter(row) is None]
+    try:
+        present.sort(key=getter, reverse=descending)
+    except TypeError:
+        present.sort(key=lambda row: str(getter(row)), reverse=descending)
+    return present + missing
+
+
+def query_table(table, rows_key, columns=None, filters=None, order=None, limit=None):
+    """
+    Filter, sort, limit and project the rows of one table.
+
+    Filters, sort keys and columns naming a column the table doesn't have are ignored
+    for that table, so one query can be applied to every chart of a dashboard.
+
+    Args:
+        table: The table dict
+        rows_key: Key of its row list
+        columns: Columns to keep
+        filters: Compiled filters, (column, predicate) tuples
+        order: (column, descending) tuples
+        limit: Max number of rows
+
+    Returns:
+        dict: The new table
+    """
+    rows = table.get(rows_key) or []
+    known, getter = get_table_columns(table, rows_key)
+    known = set(known)
+
+    checks = [(getter(column), predicate) for column, predicate in (filters or []) if column in known]
+    if checks:
+        rows = [row for row in rows if all(predicate(get(row)) for get, predicate in checks)]
+
+    # Sorting by the last key first keeps the earlier keys dominant (sorts are stable)
+    for column, descending in reversed(order or []):
+        if column in known:
+            rows = sort_rows(rows, getter(column), descending)
+
+    if limit is not None:
+        rows = rows[:limit]
+
+    table = {**table, rows_key: rows}
+    selected = [column for column in (columns or []) if column in known]
+    if selected:
+        table = project_table(table, rows_key, selected)
+    return table
+
+
+def project_table(table, rows_key, selected):
+    """
+    Keep only the selected columns of a table.
+
+    Args:
+        table: The table dict
+        rows_key: Key of its row list
+        selected: Column names present in the table
+
+    Returns:
+        dict: The projected table
+    """
+    rows = table.get(rows_key) or []
+    wanted = set(selected)
+
+    if "cols" in table and not (rows and isinstance(rows[0], dict)):
+        indexes = [
+            i for i, col in enumerate(table["cols"])
+            if col.get("name") in wanted or col.get("display_name") in wanted
+        ]
+        picker = operator.itemgetter(*indexes) if len(indexes) > 1 else None
+        return {
+            **table,
+            "cols": [table["cols"][i] for i in indexes],
+            rows_key: [list(picker(row)) if picker else [row[indexes[0]]] for row in rows],
+        }
+
+    projected = {**table, rows_key: [{column: row.get(column) for column in selected} for row in rows]}
+    if "columns" in table:
+        projected["columns"] = [column for column in table["columns"] if column in wanted]
+    if "columns_metadata" in table:
+        projected["columns_metadata"] = [m for m in table["columns_metadata"] if m.get("name") in wanted]
+    return projected
+
+
+def apply_query(result, columns=None, filters=None, order_by=None, limit=None):
+    """
+    Apply column projection, filters, ordering and a row limit to every table of a get_data result.
+
+    Args:
+        result: A get_data result
+        columns: Columns to keep
+        filters: Filter specs, see compile_filter
+        order_by: Order expression, see parse_order_by
+        limit: Max rows per table
+
+    Returns:
+        dict: The new result
+    """
+    if not (columns or filters or order_by or limit is not None):
+        return result
+
+    compiled = [compile_filter(spec) for spec in (filters or [])]
+    order = parse_order_by(order_by)
+    return map_tables(result, lambda table, key: query_table(table, key, columns, compiled, order, limit))
+
+
+def get_pushdown_columns(url, columns, filters, order_by):
+    """
+    Get the columns to request upstream, when the source supports projecting them itself.
+
+    Only single Dune queries are pushed down (output_columns); dashboards share full
+    result sets between widgets. Filter and sort columns are requested too, since they
+    are applied locally after the download.
+
+    Args:
+        url: URL of the graph
+        columns: Columns requested by the caller
+        filters: Filter specs
+        order_by: Order expression
+
+    Returns:
+        list: Sorted columns to push down, or None
+    """
+    if not columns or get_url_source(url) != "dune" or "queries" not in url:
+        return None
+
+    needed = set(columns)
+    needed.update(spec.get("column") for spec in (filters or []) if spec.get("column"))
+    needed.update(column for column, _ in parse_order_by(order_by))
+    return sorted(needed)
+
+
+# Aggregations accepted by summarize_data, and the time buckets it can resample to
+AGGREGATES = ("sum", "mean", "min", "max", "count")
+BUCKET_UNITS = {"m": "min", "min": "min", "minute": "min", "h": "h", "hour": "h", "d": "D", "day": "D"}
+TIME_COLUMN_NAMES = ("time", "block_time", "day", "date", "dt", "hour", "week", "month", "timestamp", "block_date")
+
+
+def column_values(rows, getter, name):
+    """
+    Read one column of a row list.
+
+    Args:
+        rows: Row dicts or lists
+        getter: Getter factory from get_table_columns
+        name: Column name
+
+    Returns:
+        list: The values
+    """
+    if rows and isinstance(rows[0], dict):
+        # Stays in C, several times faster than a Python getter per row
+        return list(map(dict.get, rows, itertools.repeat(name)))
+    return list(map(getter(name), rows))
+
+
+def get_column_types(table, rows_key, names):
+    """
+    Classify the columns of a table as "time", "number" or "text".
+
+    Uses Dune's columns_metadata types and Footprint's cols base_type, falling back to the
+    first non-null value of the column.
+
+    Args:
+        table: The table dict
+        rows_key: Key of its row list
+        names: Column names
+
+    Returns:
+        dict: Column name -> "time", "number" or "text"
+    """
+    declared = {}
+    for meta in table.get("columns_metadata") or []:
+        declared[meta.get("name")] = str(meta.get("type", "")).lower()
+    for col in table.get("cols") or []:
+        for name in (col.get("name"), col.get("display_name")):
+            declared[name] = str(col.get("base_type", "")).lower()
+
+    types = {}
+    _, getter = get_table_columns(table, rows_key)
+    rows = table.get(rows_key) or []
+    for name in names:
+        kind = declared.get(name, "")
+        if "date" in kind or "time" in kind:
+            types[name] = "time"
+        elif any(word in kind for word in ("int", "double", "decimal", "float", "real", "numeric", "number")):
+            types[name] = "number"
+        elif kind:
+            types[name] = "text"
+        else:
+            get = getter(name)
+            value = next((v for v in map(get, rows[:100]) if v is not None), None)
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                types[name] = "number"
+            elif isinstance(value, str) and len(value) >= 10 and value[4] == "-" and value[7] == "-" and value[:4].isdigit():
+                types[name] = "time"
+            else:
+                types[name] = "text"
+    return types
+
+
+def find_time_column(names, types):
+    """Pick the time column of a table: the first typed as time, preferring the usual names"""
+    candidates = [name for name in names if types.get(name) == "time"]
+    for name in candidates:
+        if name.lower() in TIME_COLUMN_NAMES:
+            return name
+    return candidates[0] if candidates else None
+
+
+def parse_times(values):
+    """
+    Parse Dune/Footprint timestamps ("2024-01-01 00:00:00.000 UTC", ISO dates...).
+
+    Only distinct values are parsed, charts usually repeat the same days many times.
+
+    Args:
+        values: List of timestamps
+
+    Returns:
+        numpy array: datetime64[ns] in UTC, NaT where missing or invalid
+    """
+    import numpy as np
+    import pandas as pd
+
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+    uniques = pd.Series(uniques, dtype=object)
+    if len(uniques) and uniques.map(type).eq(str).all():
+        uniques = uniques.str.removesuffix(" UTC")
+    try:
+        parsed = pd.to_datetime(uniques, utc=True, format="ISO8601")
+    except (ValueError, TypeError):
+        parsed = pd.to_datetime(uniques, utc=True, format="mixed", errors="coerce")
+    parsed = np.append(parsed.dt.tz_localize(None).to_numpy(dtype="datetime64[ns]"), np.datetime64("NaT", "ns"))
+    # Missing values have code -1, the NaT appended last
+    return parsed[codes]
+
+
+def to_numbers(values):
+    """Convert a column to a float array, NaN where missing or not numeric"""
+    import numpy as np
+    import pandas as pd
+
+    try:
+        return np.array(values, dtype=float)
+    except (TypeError, ValueError):
+        return pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").to_numpy(dtype=float)
+
+
+def bucket_times(times, bucket):
+    """
+    Floor datetimes to a time bucket.
+
+    Args:
+        times: datetime64 array
+        bucket: "minute", "hour", "day", "week", "month", or a multiple like "15m", "6h", "7d"
+
+    Returns:
+        numpy array: The bucket start of every value
+    """
+    import numpy as np
+    import pandas as pd
+
+    bucket = bucket.strip().lower()
+    if bucket in ("week", "w", "1w"):
+        # Weeks start on Monday, the epoch was a Thursday
+        days = times.astype("datetime64[D]")
+        return (days - (days.astype(np.int64) + 3) % 7).astype("datetime64[ns]")
+    if bucket in ("month", "mo", "1mo"):
+        return times.astype("datetime64[M]").astype("datetime64[ns]")
+
+    count = "".join(c for c in bucket if c.isdigit()) or "1"
+    unit = BUCKET_UNITS.get(bucket[len(count):] if bucket[0].isdigit() else bucket)
+    if unit is None:
+        raise ValueError(f"Unsupported bucket: {bucket}")
+    return pd.DatetimeIndex(times).floor(f"{int(count)}{unit}").to_numpy()
 
-            # Extract columns and rows from response
-            columns = [item.get("display_name") for item in data.get("data", {}).get("cols", [])]
-            rows = data.get("data", {}).get("rows", [])
-            
-            # 使用 pandas 将数据转换为键值对数组
-            df = pd.DataFrame(rows, columns=columns)
-            result = json.loads(df.to_json(orient='records'))
 
-            return json.dumps({"data": result})
+def lttb_indices(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling of a series.
 
-    except httpx.HTTPError as e:
-        return f"Error: HTTP error fetching chart data: {str(e)}"
-    except Exception as e:
-        return f"Error: Failed to get chart data: {str(e)}"
-        
+    Args:
+        x: numpy array of x values, sorted ascending
+        y: numpy array of y values
+        threshold: Number of points to keep
 
-    
+    Returns:
+        numpy array: Indices of the kept points
+    """
+    import numpy as np
+
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # Edges of threshold - 2 buckets between the first and last points, which are always kept
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = np.empty(threshold, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], max(edges[i + 1], edges[i] + 1)
+        next_end = max(edges[i + 2] if i + 2 < len(edges) else n, end + 1)
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        areas = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(areas.argmax())
+        selected[i + 1] = a
+    return selected
+
+
+def select_points(times, values, downsample=None, rank=None, top_k=None):
+    """
+    Positions of the rows kept by downsample (LTTB over times/values) and top-k (largest rank).
+
+    Returns:
+        numpy array: Row positions, in time order (downsample) or rank order (top-k)
+    """
+    import numpy as np
+
+    positions = np.arange(len(times) if times is not None else len(rank))
+    if downsample:
+        valid = ~np.isnat(times) & ~np.isnan(values)
+        positions = positions[valid][np.argsort(times[valid], kind="stable")]
+        x = times[positions].astype(np.int64).astype(float)
+        positions = positions[lttb_indices(x, values[positions], downsample)]
+    if top_k:
+        ranked = rank[positions]
+        # NaN ranks last
+        order = np.argsort(np.where(np.isnan(ranked), -np.inf, ranked), kind="stable")[::-1]
+        positions = positions[order[:top_k]]
+    return positions
+
+
+def summarize_table(table, rows_key, time_column=None, bucket=None, group_by=None, aggregates=None,
+                    downsample=None, value_column=None, top_k=None, top_by=None):
+    """
+    Resample, aggregate, downsample and/or keep the top rows of one table.
+
+    Without bucket/group_by the kept rows are returned untouched (downsample, top-k),
+    otherwise one row per group with the aggregates and a row count.
 
-# @mcp.tool()
-def get_footprint_dashboard_data(dashboard_url: str) -> str:
-    """Get raw data from a Footprint Network dashboard and return as JSON string
-    
     Args:
-        dashboard_url: URL of the Footprint Network dashboard (e.g., https://www.footprint.network/@Higi/Sui-Bridge)
+        table: The table dict
+        rows_key: Key of its row list
+        time_column: Time column, detected from the column types when None
+        bucket: Time bucket to resample to, see bucket_times
+        group_by: Columns to group by (together with the time bucket)
+        aggregates: {column: aggregate or [aggregates]}, defaults to the sum of every numeric column
+        downsample: Number of points to keep per series with LTTB
+        value_column: Y column for downsample, defaults to the first numeric column
+        top_k: Keep the k rows with the largest top_by
+        top_by: Column ranking top_k, defaults to the first aggregated (or numeric) column
 
     Returns:
-        JSON string containing all chart data from the dashboard
+        dict: The summarized table, with a "summary" entry describing what was done
     """
-    try:
-        # Parse dashboard URL to extract username and dashboard name
-        ## drop the #type=dashboard
-        dashboard_url = dashboard_url.split("#type")[0]
-        parts = dashboard_url.split("@")[1].split("?")[0].split("/")
-        username = parts[0]
-        dashboard_name = parts[1]
-        
-        # Extract parameters if any
-        parameters = {}
-        if "?" in dashboard_url:
-            params_str = dashboard_url.split("?")[1].split("#")[0]
-            for param in params_str.split("&"):
-                if "=" in param:
-                    key, value = param.split("=")
-                    parameters[key] = value
-        
+    import numpy as np
+    import pandas as pd
+
+    rows = table.get(rows_key) or []
+    known, getter = get_table_columns(table, rows_key)
+    if rows and not isinstance(rows[0], dict) and "cols" in table:
+        names = [col.get("display_name") or col.get("name") for col in table["cols"]]
+    else:
+        names = known
+    types = get_column_types(table, rows_key, names)
+    group_by = [column for column in (group_by or []) if column in types]
+    time_column = time_column if time_column in types else find_time_column(names, types)
+    if (bucket or downsample) and not time_column:
+        return {**table, "summary": {"skipped": "no time column"}}
+
+    def column(name):
+        return column_values(rows, getter, name)
+
+    numeric = [name for name in names if types[name] == "number" and name not in group_by]
+    summary = {"input_rows": len(rows)}
+
+    if not (bucket or group_by):
+        if not (downsample or top_k):
+            return {**table, "summary": {"skipped": "no group_by column"}}
+        y_column = value_column if value_column in types else (numeric[0] if numeric else None)
+        rank_column = top_by if top_by in types else (numeric[0] if numeric else None)
+        if (downsample and not y_column) or (top_k and not rank_column):
+            return {**table, "summary": {"skipped": "no numeric column"}}
+        positions = select_points(
+            parse_times(column(time_column)) if downsample else None,
+            to_numbers(column(y_column)) if downsample else None,
+            downsample,
+            to_numbers(column(rank_column)) if top_k else None,
+            top_k,
+        )
+        if downsample:
+            summary.update(downsample=downsample, value_column=y_column)
+        if top_k:
+            summary.update(top_k=top_k, top_by=rank_column)
+        summary["output_rows"] = len(positions)
+        return {**table, rows_key: [rows[i] for i in positions], "summary": summary}
+
+    keys = list(group_by)
+    frame = {name: np.asarray(column(name), dtype=object) for name in group_by}
+    if bucket:
+        frame[time_column] = bucket_times(parse_times(column(time_column)), bucket)
+        keys.insert(0, time_column)
+    specs = aggregates or {name: "sum" for name in numeric if name != time_column}
+    named = {}
+    for name, functions in specs.items():
+        for function in ([functions] if isinstance(functions, str) else functions):
+            if function not in AGGREGATES:
+                raise ValueError(f"Unsupported aggregate: {function}")
+            if name in types and name not in keys:
+                if name not in frame:
+                    frame[name] = to_numbers(column(name))
+                named[f"{name}_{function}"] = (name, function)
+    named["count"] = (keys[0], "size")
+    frame = pd.DataFrame(frame).groupby(keys, sort=True, dropna=False).agg(**named).reset_index()
+    values = [name for name in named if name != "count"] or ["count"]
+    summary.update(bucket=bucket, group_by=group_by, aggregates=list(named))
+
+    if downsample and bucket or top_k:
+        y_column = value_column if value_column in frame.columns else values[0]
+        rank_column = top_by if top_by in frame.columns else values[0]
+        if downsample and bucket:
+            # One series per group
+            kept = []
+            for positions in (frame.groupby(group_by, sort=False).indices.values() if group_by else [np.arange(len(frame))]):
+                part = select_points(frame[time_column].to_numpy()[positions],
+                                     frame[y_column].to_numpy(dtype=float)[positions], downsample)
+                kept.append(positions[part])
+            frame = frame.iloc[np.concatenate(kept) if kept else []]
+            summary.update(downsample=downsample, value_column=y_column)
+        if top_k:
+            frame = frame.iloc[select_points(None, None, rank=frame[rank_column].to_numpy(dtype=float), top_k=top_k)]
+            summary.update(top_k=top_k, top_by=rank_column)
+
+    if bucket:
+        frame[time_column] = pd.DatetimeIndex(frame[time_column]).strftime("%Y-%m-%d %H:%M:%S")
+    frame = frame.astype(object).where(frame.notna(), None)
+    out_names = list(frame.columns)
+    out_rows = frame.to_numpy().tolist()
+    summary["output_rows"] = len(out_rows)
+
+    summarized = {key: value for key, value in table.items() if key not in (rows_key, "cols", "columns", "columns_metadata")}
+    if "cols" in table and rows_key == "rows":
+        summarized["cols"] = [{"name": name, "display_name": name} for name in out_names]
+        summarized[rows_key] = out_rows
+    else:
+        summarized["columns"] = out_names
+        summarized[rows_key] = to_records(out_names, out_rows)
+    summarized["summary"] = summary
+    return summarized
+
+
+def summarize_result(result, **options):
+    """
+    Summarize every table of a get_data result, see summarize_table.
 
-        
-        # Get dashboard UUID
-        uuid = get_dashboard_uuid(username, dashboard_name)
-        if uuid.startswith("Error:"):
-            return uuid
-        
-        # Get chart data
-        charts_data = get_charts_data(uuid, parameters)
+    Returns:
+        dict: The new result
+    """
+    return map_tables(result, lambda table, key: summarize_table(table, key, **options))
 
-        # Return as JSON string
-        return json.dumps({"charts": charts_data})
-    except Exception as e:
-        return f"Error processing dashboard data: {str(e)}"
 
-def get_dashboard_uuid(username, dashboard_name):
-    """Get dashboard UUID from Footprint Network API"""
-    url = f"{BASE_URL}/dashboard/basic"
-    
-    headers = {
-        "accept": "application/json, text/plain, */*",
-        "client_request_time": str(int(time.time() * 1000)),
-        "content-type": "application/json",
-        "origin": "https://www.footprint.network",
-        "referer": f"https://www.footprint.network/@{username}/{dashboard_name}",
-        "user-agent": "MCP-Footprint-Client"
-    }
-    
-    payload = {
-        "dashboardName": dashboard_name,
-        "userName": username
-    }
-    print(payload)
+class WatermarkStore:
+    """High-water marks of the time column of every chart served in delta mode, LRU bounded"""
 
-    try:
-        with httpx.Client() as client:
-            response = client.post(url, headers=headers, json=payload, timeout=60)
-            response.raise_for_status()
-            data = response.json()
-            print("data", data)
-            return data["data"]["uuid"]
-    except httpx.HTTPError as e:
-        return f"Error: HTTP error fetching dashboard UUID: {str(e)}"
-    except Exception as e:
-        return f"Error: Failed to get dashboard UUID: {str(e)}"
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self.marks = OrderedDict()  # (url key, chart key) -> last time value, as the source formats it
+        self.lock = threading.Lock()
 
-def get_charts_data(dashboard_uuid, parameters=None):
-    """Get chart data from Footprint Network API using dashboard UUID"""
-    headers = {
-        "Content-Type": "application/json"
-    }
-    
-    payload = {
-        "publicUuid": dashboard_uuid,
-        "dashboardId": "",
-        "paramters": parameters or {}
-    }
-    
-    try:
-        with httpx.Client() as client:
-            response = client.post(DATA_API_URL, headers=headers, json=payload, timeout=120)
-            response.raise_for_status()
-            data = response.json()
-            return data.get("results", [])
-    except httpx.HTTPError as e:
-        return f"Error: HTTP error fetching chart data: {str(e)}"
-    except Exception as e:
-        return f"Error: Failed to get chart data: {str(e)}"
+    def get(self, key):
+        with self.lock:
+            return self.marks.get(key)
+
+    def set(self, key, mark):
+        with self.lock:
+            self.marks[key] = mark
+            self.marks.move_to_end(key)
+            while len(self.marks) > self.max_entries:
+                self.marks.popitem(last=False)
+
+
+watermarks = WatermarkStore()
+
+
+def delta_table(table, rows_key, since=None):
+    """
+    Keep the rows of a table at or after a time watermark.
+
+    The row at the watermark itself is kept: the latest bucket of a time series is
+    usually still filling up, so its value changes between refreshes.
+
+    Args:
+        table: The table dict
+        rows_key: Key of its row list
+        since: Watermark, a timestamp string; None keeps every row
+
+    Returns:
+        tuple: (new table with a "delta" entry, high-water mark of the full table or None)
+    """
+    import numpy as np
+
+    rows = table.get(rows_key) or []
+    known, getter = get_table_columns(table, rows_key)
+    if rows and not isinstance(rows[0], dict) and "cols" in table:
+        known = [col.get("display_name") or col.get("name") for col in table["cols"]]
+    time_column = find_time_column(known, get_column_types(table, rows_key, known))
+    if not time_column:
+        return {**table, "delta": {"skipped": "no time column"}}, None
+
+    values = column_values(rows, getter, time_column)
+    times = parse_times(values)
+    valid = ~np.isnat(times)
+    if not valid.any():
+        return {**table, "delta": {"time_column": time_column, "since": since, "watermark": None}}, None
+    latest = values[int(np.where(valid, times, np.datetime64("NaT")).argmax())]
+
+    if since is not None:
+        threshold = parse_times([since])[0]
+        if np.isnat(threshold):
+            raise ValueError(f"Invalid watermark: {since}")
+        rows = [rows[i] for i in np.flatnonzero(valid & (times >= threshold))]
+
+    delta = {"time_column": time_column, "since": since, "watermark": latest, "total_rows": len(values)}
+    return {**table, rows_key: rows, "delta": delta}, latest
+
+
+def map_delta_tables(url, result, parameters, fn):
+    """
+    Apply fn(table, rows_key, key) to every table of a get_data result, key being its watermark key.
+
+    Args:
+        url: URL of the graph
+        result: The get_data result
+        parameters: Dune parameter overrides the result was fetched with, each set has its own marks
+        fn: Function of (table, rows_key, key) returning the new table
+
+    Returns:
+        dict: The new result
+    """
+    url_key = normalize_url(url)
+    if parameters:
+        url_key = f"{url_key}|parameters={parameters_key(parameters)}"
+
+    def for_chart(chart_key):
+        return lambda table, rows_key: fn(table, rows_key, (url_key, chart_key))
+
+    charts = result.get("charts")
+    if not isinstance(charts, list):
+        return map_tables(result, for_chart(None))
+    # Keyed by chart identity, not position: select_chart or a changed dashboard shifts positions
+    return {**result, "charts": [
+        map_tables(chart, for_chart(get_chart_key(chart, position))) if isinstance(chart, dict) else chart
+        for position, chart in enumerate(charts)
+    ]}
+
+
+def delta_result(url, result, since=None, parameters=None):
+    """
+    Apply delta mode to every table of a get_data result.
+
+    Each table is cut at since, or else at the high-water mark stored for it by the
+    previous delta call on the URL. The marks move with store_watermarks once served.
+
+    Args:
+        url: URL of the graph
+        result: The get_data result
+        since: Client-supplied watermark, overrides the stored ones
+        parameters: Dune parameter overrides the result was fetched with
+
+    Returns:
+        dict: The new result, each table's "delta" entry holding the cut and its new "watermark"
+    """
+    def delta(table, rows_key, key):
+        table, _ = delta_table(table, rows_key, since if since is not None else watermarks.get(key))
+        return table
+
+    return map_delta_tables(url, result, parameters, delta)
+
+
+def store_watermarks(url, result, parameters=None):
+    """
+    Move the stored marks to the watermarks of a served delta result.
+
+    A paginated table only moves its mark once its last page is served, so the
+    following pages are still cut at the same watermark.
+
+    Args:
+        url: URL of the graph
+        result: The delta result, after pagination
+        parameters: Dune parameter overrides the result was fetched with
+    """
+    def store(table, rows_key, key):
+        mark = (table.get("delta") or {}).get("watermark")
+        if mark is not None and not (table.get("pagination") or {}).get("has_more"):
+            watermarks.set(key, mark)
+        return table
+
+    map_delta_tables(url, result, parameters, store)
 
 
 @mcp.tool()
-def get_data(url: str) -> str:
+async def get_data(
+        url: str,
+        page: Optional[int] = None,
+        page_size: Optional[int] = None,
+        chart_id: Optional[str] = None,
+        columns: Optional[list[str]] = None,
+        filters: Optional[list[dict]] = None,
+        order_by: Optional[str] = None,
+        limit: Optional[int] = None,
+        format: str = "records",
+        deadline: Optional[float] = None,
+        delta: bool = False,
+        since: Optional[str] = None,
+        parameters: Optional[dict] = None,
+        parameter_sets: Optional[list[dict]] = None,
+) -> str:
     """Get raw data from a graph (eg: dashboard, chart) and return as JSON string
 
        Args:
            url: URL of the graph (e.g., https://www.footprint.network/guest/chart/Total-Pet-Minted-fp-e9135cea-f9cd-4c59-8371-b3078c9b1bbe)
+           page: 1-based page of rows to return for each chart (paginates when page or page_size is set)
+           page_size: Rows per page for each chart (default 1000 when paginating)
+           chart_id: Only return the chart with this Dune visualization_id / Footprint card id
+           columns: Only return these columns (pushed down to Dune for single queries)
+           filters: Row filters, e.g. [{"column": "chain", "op": "=", "value": "ethereum"}],
+               op is one of =, !=, >, >=, <, <=, in, contains
+           order_by: Sort columns, comma separated, "-" prefix for descending (e.g. "-day")
+           limit: Max rows per chart, applied after filters and ordering
+           format: "records" (default, one object per row), "columnar" ({"columns": [...], "rows": [[...]]}),
+               "resource" to store each chart locally and return chart://{source}/{id} resources to read it in slices,
+               or "arrow", "parquet", "msgpack" to write the data to local files and return their paths
+           deadline: Seconds this call may take; dashboards then return the charts fetched in time
+               and list the others under "timed_out" (with a "pending_execution_id" for Dune queries
+               still running after EXECUTION_POLL_TIMEOUT)
+           delta: Only return rows at or after the time watermark of the previous delta call for this URL
+               (the first call returns everything); each chart reports its new "watermark". When paginating,
+               the mark only moves once the last page is served, so every page is cut at the same one
+           since: Only return rows at or after this timestamp (e.g. a previous "watermark"), implies delta
+           parameters: Dune dashboard or query parameter overrides, e.g. {"chain": "ethereum"}; a value may
+               also be {"type": "enum", "value": ...}. Dashboards list their parameters under "parameters"
+           parameter_sets: Sweep: fetch the graph once per parameter set (each merged over parameters),
+               concurrently, and return {"sweep": [{"parameters": ..., "data": ...} or {..., "error": ...}]}
 
        Returns:
            JSON string containing all chart data from the graph
        """
+    error = validate_query_args(page, page_size, limit, format, deadline)
+    if error:
+        return error
+    if (parameters or parameter_sets) and get_url_source(url) != "dune":
+        return "Error: parameters are only supported for Dune dashboards and queries"
+
+    if parameter_sets is not None:
+        if not parameter_sets or len(parameter_sets) > SWEEP_MAX_SETS:
+            return f"Error: parameter_sets must hold 1 to {SWEEP_MAX_SETS} parameter sets"
+        sets = [{**(parameters or {}), **parameter_set} for parameter_set in parameter_sets]
+        # Identical sets are fetched once
+        unique = {parameters_key(parameter_set): parameter_set for parameter_set in sets}
+        with deadline_scope(deadline or DEFAULT_DEADLINE):
+            fetched = await asyncio.gather(
+                *(query_url(url, page, page_size, chart_id, columns, filters, order_by, limit, format, delta, since,
+                            parameter_set)
+                  for parameter_set in unique.values()),
+                return_exceptions=True,
+            )
+        results = dict(zip(unique, fetched))
+        return encode_entries("sweep", [
+            ({"parameters": parameter_set}, results[parameters_key(parameter_set)]) for parameter_set in sets
+        ])
+
+    with deadline_scope(deadline or DEFAULT_DEADLINE):
+        result = await query_url(url, page, page_size, chart_id, columns, filters, order_by, limit, format,
+                                 delta, since, parameters)
+    return encode_result(result)
+
+
+@mcp.tool()
+async def get_data_batch(
+        urls: list[str],
+        page: Optional[int] = None,
+        page_size: Optional[int] = None,
+        columns: Optional[list[str]] = None,
+        filters: Optional[list[dict]] = None,
+        order_by: Optional[str] = None,
+        limit: Optional[int] = None,
+        format: str = "records",
+        deadline: Optional[float] = None,
+        delta: bool = False,
+        since: Optional[str] = None,
+) -> str:
+    """Get raw data from several graphs in one call, fetched concurrently
+
+       Takes the same options as get_data, applied to every URL. Dune queries shared
+       by several dashboards are only fetched once.
+
+       Args:
+           urls: URLs of the graphs
+           page: 1-based page of rows to return for each chart
+           page_size: Rows per page for each chart
+           columns: Only return these columns
+           filters: Row filters, see get_data
+           order_by: Sort columns, comma separated, "-" prefix for descending
+           limit: Max rows per chart
+           format: Output format, see get_data
+           deadline: Seconds the whole batch may take
+           delta: Delta mode, see get_data
+           since: Watermark applied to every URL, see get_data
+
+       Returns:
+           JSON string {"results": [{"url": ..., "data": ...} or {"url": ..., "error": ...}]} in the order of urls
+       """
+    if not urls:
+        return "Error: urls must not be empty"
+    if len(urls) > BATCH_MAX_URLS:
+        return f"Error: at most {BATCH_MAX_URLS} urls per batch"
+    error = validate_query_args(page, page_size, limit, format, deadline)
+    if error:
+        return error
+
+    # Equivalent URLs are fetched once
+    unique = {}
+    for url in urls:
+        unique.setdefault(normalize_url(url), url)
+    with deadline_scope(deadline or DEFAULT_DEADLINE):
+        fetched = await asyncio.gather(
+            *(query_url(url, page, page_size, None, columns, filters, order_by, limit, format, delta, since)
+              for url in unique.values()),
+            return_exceptions=True,
+        )
+    results = dict(zip(unique, fetched))
+    return encode_entries("results", [({"url": url}, results[normalize_url(url)]) for url in urls])
+
+
+def encode_entries(name, entries):
+    """
+    Serialize labelled query_url results as {name: [{**label, "data": ...} or {**label, "error": ...}]}.
+
+    Args:
+        name: Key of the list
+        entries: (label dict, result, error string or exception) pairs
+
+    Returns:
+        str: JSON string
+    """
+    buffer = io.StringIO()
+    buffer.write(f'{{{json.dumps(name)}: [')
+    for i, (label, result) in enumerate(entries):
+        if i:
+            buffer.write(", ")
+        if isinstance(result, Exception):
+            logger.error(f"Fetch of {label} failed: {result}")
+            result = f"Error: {result}"
+        if is_error_result(result):
+            error = result if isinstance(result, str) else result["error"]
+            buffer.write(json.dumps({**label, "error": error}))
+        else:
+            head = json.dumps(label)
+            buffer.write(f'{head[:-1]}, "data": {encode_result(result)}}}')
+    buffer.write("]}")
+    return buffer.getvalue()
+
+
+@mcp.tool()
+async def summarize_data(
+        url: str,
+        chart_id: Optional[str] = None,
+        filters: Optional[list[dict]] = None,
+        time_column: Optional[str] = None,
+        bucket: Optional[str] = None,
+        group_by: Optional[list[str]] = None,
+        aggregates: Optional[dict[str, str | list[str]]] = None,
+        downsample: Optional[int] = None,
+        value_column: Optional[str] = None,
+        top_k: Optional[int] = None,
+        top_by: Optional[str] = None,
+        format: str = "records",
+        deadline: Optional[float] = None,
+) -> str:
+    """Get a reduced version of a graph's data: time-bucketed, aggregated, downsampled and/or top-k
+
+       Applied to every chart (charts missing the columns are left as they are). Each
+       summarized chart has a "summary" entry with the input and output row counts.
+
+       Args:
+           url: URL of the graph
+           chart_id: Only summarize the chart with this Dune visualization_id / Footprint card id
+           filters: Row filters applied first, see get_data
+           time_column: Time column, detected from the column types when omitted
+           bucket: Resample to time buckets: "minute", "hour", "day", "week", "month" or e.g. "15m", "6h", "7d"
+           group_by: Columns to aggregate by (together with the time bucket)
+           aggregates: {column: "sum" | "mean" | "min" | "max" | "count" or a list of them},
+               defaults to the sum of every numeric column; a "count" of rows is always added
+           downsample: Keep this many points per series (LTTB), preserving the shape of the curve;
+               with group_by it needs a bucket
+           value_column: Column downsample preserves, defaults to the first numeric column
+           top_k: Keep the k rows with the largest top_by value
+           top_by: Column ranking top_k, defaults to the first aggregate
+           format: "records" (default) or "columnar"
+           deadline: Seconds this call may take
+
+       Returns:
+           JSON string containing the summarized chart data
+       """
+    if not (bucket or group_by or downsample or top_k):
+        return "Error: nothing to summarize, set bucket, group_by, downsample or top_k"
+    if downsample is not None and downsample < 3:
+        return "Error: downsample must be >= 3"
+    if downsample and group_by and not bucket:
+        return "Error: downsample with group_by needs a bucket"
+    if top_k is not None and top_k < 1:
+        return "Error: top_k must be >= 1"
+    if format not in ("records", "columnar"):
+        return "Error: format must be one of records, columnar"
+    error = validate_query_args(None, None, None, format, deadline)
+    if error:
+        return error
+
+    with deadline_scope(deadline or DEFAULT_DEADLINE):
+        result = await get_result(url)
+    if isinstance(result, str):
+        return result
+
+    if chart_id is not None:
+        result = select_chart(result, chart_id)
+    try:
+        result = apply_query(result, filters=filters)
+        result = summarize_result(
+            result, time_column=time_column, bucket=bucket, group_by=group_by, aggregates=aggregates,
+            downsample=downsample, value_column=value_column, top_k=top_k, top_by=top_by,
+        )
+    except ValueError as e:
+        return f"Error: {e}"
+    return encode_result(render_result(result, format))
+
+
+def validate_query_args(page, page_size, limit, format, deadline):
+    """
+    Check the options shared by get_data and get_data_batch.
+
+    Returns:
+        str: An error message, or None if the options are valid
+    """
+    if page is not None and page < 1:
+        return "Error: page must be >= 1"
+    if page_size is not None and page_size < 1:
+        return "Error: page_size must be >= 1"
+    if limit is not None and limit < 0:
+        return "Error: limit must be >= 0"
+    if format not in OUTPUT_FORMATS:
+        return f"Error: format must be one of {', '.join(OUTPUT_FORMATS)}"
+    if deadline is not None and deadline <= 0:
+        return "Error: deadline must be > 0"
+    return None
+
+
+async def query_url(url, page=None, page_size=None, chart_id=None, columns=None, filters=None, order_by=None,
+                    limit=None, format="records", delta=False, since=None, parameters=None):
+    """
+    Get the data of a graph URL, then select, cut (delta), query, paginate and shape it as get_data does.
+
+    Returns:
+        dict: The result to encode, or an error string
+    """
+    delta = delta or since is not None
+    # Delta mode needs the time column, which a pushed-down projection may drop
+    pushdown = None if delta else get_pushdown_columns(url, columns, filters, order_by)
+    result = await get_result(url, pushdown, parameters)
+    if isinstance(result, str):
+        return result
+
+    if chart_id is not None:
+        result = select_chart(result, chart_id)
+    try:
+        if delta and not is_error_result(result):
+            result = delta_result(url, result, since, parameters)
+        result = apply_query(result, columns, filters, order_by, limit)
+    except ValueError as e:
+        return f"Error: {e}"
+    if page is not None or page_size is not None:
+        result = paginate_result(result, page or 1, page_size or DEFAULT_PAGE_SIZE)
+    if delta and not is_error_result(result):
+        store_watermarks(url, result, parameters)
+    try:
+        with metrics.span("shaping", format=format):
+            if format == "resource":
+                signature = json.dumps([chart_id, columns, filters, order_by, limit, page, page_size, parameters,
+                                        delta], sort_keys=True, default=str)
+                return store_result(url, result, signature)
+            if format in EXPORT_FORMATS:
+                return export_result(result, format)
+            return render_result(result, format)
+    except ImportError as e:
+        return f"Error: format {format} needs an optional dependency that is not installed ({e.name})"
+
+
+async def get_result(url: str, pushdown_columns: Optional[list] = None, parameters: Optional[dict] = None) -> dict | str:
+    """
+    Get the data of a graph URL, served from the result cache when possible.
+
+    Args:
+        url: URL of the graph
+        pushdown_columns: Columns to request upstream (see get_pushdown_columns), None for all
+        parameters: Dune parameter overrides, {key: value}, cached separately per parameter set
+
+    Returns:
+        dict containing all chart data from the graph, or an error string
+    """
+    source = get_url_source(url)
+    if not source:
+        return "Error: This Url Not supported"
+
+    key = normalize_url(url)
+    if parameters:
+        key = f"{key}|parameters={parameters_key(parameters)}"
+    if pushdown_columns:
+        # A full result cached for the URL can serve any projection locally
+        cached = result_cache.get(key)
+        if cached is not None:
+            return cached
+        key = f"{key}|columns={','.join(pushdown_columns)}"
+    cached = result_cache.get(key)
+    if cached is not None:
+        logger.info(f"[Cache] Hit for {key}")
+        return cached
+
+    # The grace lets dashboards hit the deadline on their charts first and return what they have
+    with metrics.span("fetch", source=source):
+        result = await with_deadline(fetch_url_data(url, pushdown_columns, parameters), grace=1.0)
+    if result is None:
+        return "Error: Deadline exceeded before the data could be fetched"
+    # Partial or stale results aren't cached, the next call may get the complete, fresh data
+    if not is_error_result(result) and not is_partial_result(result):
+        result_cache.set(key, result, ttl=CACHE_TTLS[source])
+    return result
+
+
+@mcp.tool()
+def get_cache_stats() -> str:
+    """Get hit/miss counters and memory usage of the get_data result cache and the Dune execution cache
+
+       Returns:
+           JSON string containing the cache statistics
+       """
+    return json.dumps({"results": result_cache.stats(), "executions": execution_cache.stats()})
+
+
+@mcp.tool()
+def invalidate_cache(url: Optional[str] = None) -> str:
+    """Drop cached data and dashboard metadata for a graph URL, or everything if no URL is given
+
+       Args:
+           url: URL of the graph whose cached data and metadata should be refetched
+
+       Returns:
+           JSON string confirming what was invalidated
+       """
+    if not url:
+        result_cache.clear()
+        metadata_cache.invalidate()
+        return json.dumps({"invalidated": "all"})
+
+    # Parameter sets and column pushdowns of the URL are cached under keys extending it
+    entries = result_cache.invalidate_prefix(normalize_url(url))
+    metadata_key = get_metadata_key(url)
+    if metadata_key:
+        metadata_cache.invalidate(metadata_key)
+    return json.dumps({"invalidated": normalize_url(url), "entries": entries, "metadata": metadata_key})
+
+
+def host_limiter_stats():
+    """Limiter state of every upstream host contacted so far"""
+    with _host_limiters_lock:
+        limiters = dict(_host_limiters)
+    return {host: limiter.stats() for host, limiter in sorted(limiters.items())}
+
+
+def collect_metrics():
+    """Metrics snapshot plus the current cache and proxy pool statistics"""
+    snapshot = metrics.snapshot()
+    snapshot["caches"] = {"results": result_cache.stats(), "executions": execution_cache.stats()}
+    snapshot["hosts"] = host_limiter_stats()
+    if proxy_manager:
+        snapshot["proxies"] = proxy_manager.stats()
+    return snapshot
+
+
+def render_prometheus():
+    """All metrics in Prometheus text format, cache and proxy pool statistics as gauges"""
+    lines = [metrics.prometheus().rstrip("\n")]
+    gauges = {f"cache_{field}": [] for field in result_cache.stats()}
+    for cache, stats in (("results", result_cache.stats()), ("executions", execution_cache.stats())):
+        for field, value in stats.items():
+            gauges[f"cache_{field}"].append((format_metric(f"cache_{field}", (("cache", cache),)), value))
+    for host, stats in host_limiter_stats().items():
+        for field in ("concurrency_limit", "in_flight", "waiting", "rate_limit"):
+            if stats[field] is not None:
+                gauges.setdefault(f"host_{field}", []).append((format_metric(f"host_{field}", (("host", host),)),
+                                                               stats[field]))
+    if proxy_manager:
+        pool = proxy_manager.stats()
+        for field in ("candidates", "working", "open_circuits"):
+            gauges[f"proxy_pool_{field}"] = [(f"proxy_pool_{field}", pool[field])]
+    for name, samples in gauges.items():
+        lines.append(f"# TYPE {METRICS_PREFIX}{name} gauge")
+        lines.extend(f"{METRICS_PREFIX}{sample} {value}" for sample, value in samples)
+    return "\n".join(lines) + "\n"
+
+
+@mcp.tool()
+def get_metrics(format: str = "json") -> str:
+    """Get performance metrics: per-stage timings (dashboard_lookup, execution_id, chart_fetch, fetch, shaping,
+       serialization), upstream latency, bytes, retries, errors and hedges per host, adaptive limits per host,
+       requests per proxy kind, metadata cache lookups, and result/execution cache hit ratios
+
+       Args:
+           format: "json" (default), or "prometheus" for the Prometheus text format
+
+       Returns:
+           JSON string, or Prometheus text, containing the metrics
+       """
+    if format == "prometheus":
+        return render_prometheus()
+    if format != "json":
+        return 'Error: format must be "json" or "prometheus"'
+    return json.dumps(collect_metrics())
+
+
+def start_metrics_server(host, port):
+    """Serve render_prometheus() at /metrics from a daemon thread"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f"[Metrics] Serving Prometheus metrics at http://{host}:{port}/metrics")
+    return server
+
+
+@mcp.resource("chart://{source}/{chart_id}", mime_type="application/json")
+def read_chart(source: str, chart_id: str) -> str:
+    """First rows of a chart stored by get_data(format="resource"), with its metadata and total row count"""
+    return json.dumps(chart_store.read(source, chart_id), default=str)
+
+
+@mcp.resource("chart://{source}/{chart_id}/{offset}/{limit}", mime_type="application/json")
+def read_chart_rows(source: str, chart_id: str, offset: str, limit: str) -> str:
+    """Rows offset to offset + limit of a chart stored by get_data(format="resource")"""
+    try:
+        offset, limit = int(offset), int(limit)
+    except ValueError:
+        raise ValueError("offset and limit must be integers")
+    if offset < 0 or limit < 1:
+        raise ValueError("offset must be >= 0 and limit >= 1")
+    return json.dumps(chart_store.read(source, chart_id, offset, limit), default=str)
+
+
+async def fetch_url_data(url: str, columns: Optional[list] = None, parameters: Optional[dict] = None) -> dict | str:
+    """
+    Fetch the data of a graph URL from its upstream, bypassing the cache.
+
+    Args:
+        url: URL of the graph
+        columns: Columns to push down to single Dune queries, None for all
+        parameters: Dune parameter overrides, {key: value}
+
+    Returns:
+        dict containing all chart data from the graph, or an error string
+    """
     if "footprint.network" in url:
         if "/chart" in url:
-            return get_footprint_chart_data(url)
+            return await get_footprint_chart_data(url)
         else:
-            return get_footprint_dashboard_data(url)
+            return await get_footprint_dashboard_data(url)
     if "dune.com" in url:
         if "queries" in url:
-            return get_dune_chart_data(url)
+            return await get_dune_chart_data(url, columns, parameters)
         else:
-            return get_dune_dashboard_data(url)
+            return await get_dune_dashboard_data(url, parameters)
     return "Error: This Url Not supported"
 
+# Watchlist kept warm in the result cache: WATCHLIST (URLs separated by commas or whitespace)
+# and/or WATCHLIST_FILE (one URL per line, "#" starts a comment)
+WATCHLIST = os.getenv("WATCHLIST", "")
+WATCHLIST_FILE = os.getenv("WATCHLIST_FILE")
+# Seconds between two refreshes of a watched URL, randomized by +/- WATCHLIST_JITTER
+WATCHLIST_INTERVAL = float(os.getenv("WATCHLIST_INTERVAL", "300"))
+WATCHLIST_JITTER = 0.2
+# Min seconds between two upstream refreshes, so warming a long watchlist never bursts upstream
+WATCHLIST_SPACING = float(os.getenv("WATCHLIST_SPACING", "2"))
+
+
+def load_watchlist():
+    """
+    Read the watched URLs from WATCHLIST and WATCHLIST_FILE.
+
+    Returns:
+        list: Supported URLs, without duplicates
+    """
+    urls = WATCHLIST.replace(",", " ").split()
+    if WATCHLIST_FILE:
+        try:
+            with open(WATCHLIST_FILE, encoding="utf-8") as f:
+                for line in f:
+                    line = line.split("#", 1)[0].strip()
+                    if line:
+                        urls.append(line)
+        except OSError as e:
+            logger.error(f"[Watchlist] Error reading {WATCHLIST_FILE}: {e}")
+
+    watchlist = []
+    for url in urls:
+        if not get_url_source(url):
+            logger.error(f"[Watchlist] Ignoring unsupported URL {url}")
+        elif url not in watchlist:
+            watchlist.append(url)
+    return watchlist
+
+
+class PrefetchScheduler:
+    """
+    Refreshes a watchlist of URLs in a background thread and keeps their results in the
+    result cache, so get_data on them is served from memory.
+
+    Refreshes run one at a time, at least `spacing` seconds apart, each URL on a
+    jittered interval so they don't synchronize. A failed refresh keeps the previous
+    result cached.
+    """
+
+    def __init__(self, urls, interval=WATCHLIST_INTERVAL, jitter=WATCHLIST_JITTER, spacing=WATCHLIST_SPACING):
+        self.urls = urls
+        self.interval = interval
+        self.jitter = jitter
+        self.spacing = spacing
+        self.status = {
+            url: {
+                "last_refresh": None,
+                "last_duration": None,
+                "last_error": None,
+                "next_refresh": None,
+                "refreshes": 0,
+                "failures": 0,
+            }
+            for url in urls
+        }
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def start_in_background(self):
+        """在后台线程中运行刷新循环"""
+
+        def background_run():
+            logger.info(f"[Watchlist] Warming {len(self.urls)} URLs every ~{self.interval:.0f}s")
+            try:
+                asyncio.run(self.run())
+            except Exception as e:
+                logger.error(f"[Watchlist] Scheduler stopped: {e}")
+
+        self.thread = threading.Thread(target=background_run, daemon=True)
+        self.thread.start()
+
+    def next_delay(self):
+        """Jittered interval until the next refresh of a URL"""
+        return self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    async def run(self):
+        now = time.time()
+        with self.lock:
+            # First pass right away, spaced out
+            for i, url in enumerate(self.urls):
+                self.status[url]["next_refresh"] = now + i * self.spacing
+
+        while True:
+            with self.lock:
+                url = min(self.urls, key=lambda u: self.status[u]["next_refresh"])
+                due = self.status[url]["next_refresh"]
+            await asyncio.sleep(max(0.0, due - time.time()))
+
+            await self.refresh(url)
+            with self.lock:
+                self.status[url]["next_refresh"] = time.time() + self.next_delay()
+            await asyncio.sleep(self.spacing)
+
+    async def refresh(self, url):
+        """
+        Fetch a URL from upstream and cache its result.
+
+        Args:
+            url: The watched URL
+        """
+        started = time.time()
+        try:
+            result = await fetch_url_data(url)
+        except Exception as e:
+            result = f"Error: {e}"
+        duration = time.time() - started
+
+        with self.lock:
+            status = self.status[url]
+            status["last_duration"] = round(duration, 3)
+            # Incomplete or stale results aren't cached, as get_result does
+            if is_error_result(result) or is_partial_result(result):
+                status["failures"] += 1
+                status["last_error"] = result if isinstance(result, str) else result.get("error", "partial result")
+                logger.error(f"[Watchlist] Refresh of {url} failed: {status['last_error']}")
+                return
+            status["refreshes"] += 1
+            status["last_refresh"] = time.time()
+            status["last_error"] = None
+
+        # Outlives the next refresh even if it fails once, whatever the source's regular TTL
+        ttl = max(CACHE_TTLS[get_url_source(url)], 2 * self.interval * (1 + self.jitter))
+        result_cache.set(normalize_url(url), result, ttl=ttl)
+        logger.info(f"[Watchlist] Refreshed {url} in {duration:.2f}s")
+
+    def stats(self):
+        """Last refresh time, staleness and counters of every watched URL"""
+        now = time.time()
+        with self.lock:
+            return {
+                "interval": self.interval,
+                "urls": [
+                    {
+                        "url": url,
+                        "last_refresh": status["last_refresh"],
+                        "staleness": round(now - status["last_refresh"], 1) if status["last_refresh"] else None,
+                        "next_refresh_in": round(max(0.0, status["next_refresh"] - now), 1) if status["next_refresh"] else None,
+                        "last_duration": status["last_duration"],
+                        "refreshes": status["refreshes"],
+                        "failures": status["failures"],
+                        "last_error": status["last_error"],
+                    }
+                    for url, status in self.status.items()
+                ],
+            }
+
+
+@mcp.tool()
+def get_watchlist_status() -> str:
+    """Get the URLs kept warm by the prefetch scheduler, with their last refresh time (unix seconds) and staleness (seconds)
+
+       Returns:
+           JSON string containing the status of every watched URL
+       """
+    if prefetch_scheduler is None:
+        return json.dumps({"interval": WATCHLIST_INTERVAL, "urls": []})
+    return json.dumps(prefetch_scheduler.stats())
+
+
+prefetch_scheduler = None
+
+
+def start_background_services():
+    """
+    Start the proxy pool, the watchlist scheduler and the metrics endpoint, as configured.
+
+    Called by the server entry point, so importing main (tests, benchmarks) starts no threads
+    and opens no sockets.
+    """
+    global prefetch_scheduler
+    if proxy_manager:
+        logger.info("[Proxy Pool] Starting proxy pool in background...")
+        proxy_manager.initialize_in_background()
+
+    watchlist = load_watchlist()
+    if watchlist:
+        prefetch_scheduler = PrefetchScheduler(watchlist)
+        prefetch_scheduler.start_in_background()
+
+    if METRICS_PORT:
+        start_metrics_server(METRICS_HOST, METRICS_PORT)
+
+
 # Run the server
 if __name__ == "__main__":
+    start_background_services()
     mcp.run()
\ No newline at end of file
@@ -0,0 +1,30 @@
+"""
+Shared test setup: one stand-in upstream (benchmarks/stand_in_server.py) for the whole run, with
+main imported pointed at it. main reads its upstream URLs at import, so every test module imports
+main from here; tests change the stand-in's behaviour through config (read on every request).
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+sys.path.insert(0, ROOT)
+
+import stand_in_server  # noqa: E402
+
+config = argparse.Namespace(latency=0.0, jitter=0.0, fail_rate=0.0, fail_modes=[], retry_after=0)
+servers, env = stand_in_server.start_stand_in(config)
+os.environ.update(env)
+# Files written by the run stay out of the server's default directories
+os.environ["CHART_STORE_DIR"] = tempfile.mkdtemp(prefix="graph-mcp-test-charts-")
+os.environ["EXPORT_DIR"] = tempfile.mkdtemp(prefix="graph-mcp-test-exports-")
+
+import structlog  # noqa: E402
+
+structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING))
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+import main  # noqa: E402, F401
@@ -0,0 +1,49 @@
+"""
+get_data(format="resource"): tables stored as chart:// resources, one ID per distinct table.
+
+    python -m unittest discover -s tests
+"""
+import asyncio
+import json
+import unittest
+
+from stand_in import main
+
+
+def store(url, **options):
+    return json.loads(asyncio.run(main.get_data(url, format="resource", **options)))
+
+
+def chart_id(resource):
+    return resource.removeprefix("chart://").split("/", 1)
+
+
+class ChartStoreTest(unittest.TestCase):
+    def test_footprint_chart_query_string_is_part_of_the_id(self):
+        url = "https://www.footprint.network/chart/Bench-fp-r10-201"
+        eth = store(f"{url}?chain=eth")["data"]["resource"]
+        bsc = store(f"{url}?chain=bsc")["data"]["resource"]
+        self.assertNotEqual(eth, bsc)
+        # Storing the other parameter set leaves the first handle readable
+        self.assertEqual(main.chart_store.read(*chart_id(eth))["total_rows"], 10)
+        self.assertEqual(store(f"{url}?chain=eth")["data"]["resource"], eth)
+
+    def test_query_options_are_part_of_the_id(self):
+        url = "https://dune.com/bench/w1-r20-202"
+        full = store(url)["charts"][0]
+        limited = store(url, limit=5)["charts"][0]
+        self.assertNotEqual(full["resource"], limited["resource"])
+        self.assertEqual(main.chart_store.read(*chart_id(full["resource"]))["total_rows"], 20)
+        self.assertEqual(len(main.chart_store.read(*chart_id(limited["resource"]), limit=2)["rows"]), 2)
+
+    def test_delta_cut_is_part_of_the_id(self):
+        url = "https://dune.com/bench/w1-r20-203"
+        first = store(url, delta=True)["charts"][0]
+        second = store(url, delta=True)["charts"][0]
+        self.assertNotEqual(first["resource"], second["resource"])
+        self.assertEqual(first["row_count"], 20)
+        self.assertEqual(second["row_count"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+"""
+Identical (query_id, parameters) work is shared: concurrent fetches join one in-flight fetch, and an
+unchanged completed execution is not downloaded again.
+
+    python -m unittest discover -s tests
+"""
+import asyncio
+import unittest
+
+from stand_in import env, main
+
+DUNE_HOST = env["DUNE_API_URL"].removeprefix("http://")
+
+
+def dune_requests():
+    counters = main.metrics.snapshot()["counters"]
+    return sum(value for key, value in counters.items()
+               if key.startswith("upstream_requests_total{") and f'host="{DUNE_HOST}"' in key)
+
+
+class DedupTest(unittest.TestCase):
+    def test_concurrent_fetches_share_one_flight(self):
+        async def fetch_all():
+            return await asyncio.gather(*(main.fetch_query_result("8000020", []) for _ in range(5)))
+
+        before = dune_requests()
+        results = asyncio.run(fetch_all())
+        # One result set lookup and one download for all five
+        self.assertEqual(dune_requests() - before, 2)
+        self.assertEqual({execution_id for execution_id, _ in results}, {"01BENCH8000020"})
+        self.assertTrue(all(len(data["execution_succeeded"]["data"]) == 20 for _, data in results))
+
+    def test_parameter_sets_are_fetched_separately(self):
+        async def fetch_both():
+            return await asyncio.gather(
+                main.fetch_query_result("8001020", main.build_parameters({"chain": "ethereum"})),
+                main.fetch_query_result("8001020", main.build_parameters({"chain": "bsc"})),
+            )
+
+        before = dune_requests()
+        asyncio.run(fetch_both())
+        self.assertEqual(dune_requests() - before, 4)
+
+    def test_unchanged_execution_is_not_downloaded_again(self):
+        asyncio.run(main.fetch_query_result("9000020", []))
+        before = dune_requests()
+        execution_id, data = asyncio.run(main.fetch_query_result("9000020", []))
+        # Only the result set lookup, the download comes from the execution cache
+        self.assertEqual(dune_requests() - before, 1)
+        self.assertEqual(execution_id, "01BENCH9000020")
+        self.assertEqual(len(data["execution_succeeded"]["data"]), 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+"""
+Delta mode of get_data: each call returns the rows at or after the watermark of the previous one.
+
+    python -m unittest discover -s tests
+"""
+import asyncio
+import json
+import unittest
+
+from stand_in import main
+
+
+def get_data(url, **options):
+    return json.loads(asyncio.run(main.get_data(url, **options)))
+
+
+class DeltaTest(unittest.TestCase):
+    def test_second_call_returns_rows_since_watermark(self):
+        url = "https://dune.com/bench/w1-r20-101"
+        chart = get_data(url, delta=True)["charts"][0]
+        self.assertEqual(len(chart["data"]), 20)
+        self.assertEqual(chart["delta"]["watermark"], chart["data"][0]["day"])
+
+        chart = get_data(url, delta=True)["charts"][0]
+        # The row at the watermark is kept, its bucket may still be filling up
+        self.assertEqual(len(chart["data"]), 1)
+        self.assertEqual(chart["delta"]["since"], chart["delta"]["watermark"])
+
+    def test_paging_through_delta_result(self):
+        url = "https://dune.com/bench/w1-r20-102"
+        days = []
+        for page in range(1, 5):
+            chart = get_data(url, delta=True, page=page, page_size=5)["charts"][0]
+            self.assertEqual(len(chart["data"]), 5, f"page {page}")
+            self.assertIsNone(chart["delta"]["since"])
+            self.assertEqual(chart["pagination"]["total_rows"], 20)
+            days += [row["day"] for row in chart["data"]]
+        self.assertEqual(len(set(days)), 20)
+
+        # The last page served moves the mark
+        chart = get_data(url, delta=True, page=1, page_size=5)["charts"][0]
+        self.assertEqual(chart["delta"]["since"], days[0])
+        self.assertEqual(len(chart["data"]), 1)
+
+    def test_since_overrides_stored_watermark(self):
+        url = "https://dune.com/bench/w1-r20-103"
+        watermark = get_data(url, delta=True)["charts"][0]["delta"]["watermark"]
+        chart = get_data(url, since="2024-05-27")["charts"][0]
+        self.assertEqual(chart["delta"]["watermark"], watermark)
+        self.assertEqual(len(chart["data"]), 5)
+
+    def test_watermarks_follow_chart_id(self):
+        url = "https://dune.com/bench/w3-r20-104"
+        get_data(url, delta=True, chart_id="104001")
+        # The other charts have no mark yet, whatever their position in the result
+        self.assertEqual(len(get_data(url, delta=True, chart_id="104002")["charts"][0]["data"]), 20)
+        self.assertEqual(len(get_data(url, delta=True, chart_id="104001")["charts"][0]["data"]), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
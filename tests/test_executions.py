@@ -0,0 +1,101 @@
+"""
+Pending Dune executions: waited for by the execution tracker, served stale while a new run is
+pending, and reported when they are still running after EXECUTION_POLL_TIMEOUT.
+
+The stand-in only knows completed executions, so the result set lookups are scripted here; the
+downloads still go to the stand-in.
+
+    python -m unittest discover -s tests
+"""
+import asyncio
+import unittest
+from unittest import mock
+
+from stand_in import main
+
+
+class ScriptedResultSets:
+    """get_execution_ids answering from a script of result set IDs per query, the last one repeating"""
+
+    def __init__(self, scripts):
+        self.scripts = scripts
+        self.calls = {}
+
+    async def __call__(self, query_id, parameters, can_refresh=True):
+        query_id = str(query_id)
+        calls = self.calls[query_id] = self.calls.get(query_id, 0) + 1
+        script = self.scripts[query_id]
+        return script[min(calls, len(script)) - 1]
+
+
+def fast_polling(scripts, timeout=5.0):
+    return mock.patch.multiple(main, get_execution_ids=ScriptedResultSets(scripts), EXECUTION_POLL_MIN_INTERVAL=0.01,
+                               EXECUTION_POLL_MAX_INTERVAL=0.05, EXECUTION_POLL_TIMEOUT=timeout)
+
+
+class ExecutionTrackerTest(unittest.TestCase):
+    def test_waits_for_pending_execution(self):
+        scripts = {"11000020": [{"pendingExecutionId": "P1"}] * 3 + [{"completedExecutionId": "P1"}]}
+        with fast_polling(scripts):
+            execution_id, data = asyncio.run(main.fetch_query_result("11000020", []))
+            self.assertEqual(main.get_execution_ids.calls["11000020"], 4)
+        self.assertEqual(execution_id, "P1")
+        self.assertEqual(len(data["execution_succeeded"]["data"]), 20)
+
+    def test_one_poll_per_query_for_every_waiter(self):
+        scripts = {"12000020": [{"pendingExecutionId": "P2"}] * 3 + [{"completedExecutionId": "P2"}]}
+
+        async def wait_all():
+            tracker = main.get_execution_tracker()
+            return await asyncio.gather(*(tracker.wait("P2", "12000020", []) for _ in range(5)))
+
+        with fast_polling(scripts):
+            outcomes = asyncio.run(wait_all())
+            # Three rounds still pending, then the completed one, each a single lookup for all five
+            self.assertEqual(main.get_execution_ids.calls["12000020"], 4)
+        self.assertEqual(outcomes, [("completed", "P2")] * 5)
+
+    def test_stale_result_served_while_new_run_is_pending(self):
+        scripts = {"13000020": [
+            {"completedExecutionId": "C3", "pendingExecutionId": "P3"},
+            {"completedExecutionId": "C3", "pendingExecutionId": "P3"},
+            {"completedExecutionId": "P3"},
+        ]}
+
+        async def fetch_then_settle():
+            fetched = await main.fetch_query_result("13000020", [])
+            tracker = main.get_execution_tracker()
+            while tracker.pending or tracker.prefetching:
+                await asyncio.sleep(0.01)
+            return fetched
+
+        with fast_polling(scripts):
+            execution_id, data = asyncio.run(fetch_then_settle())
+        self.assertEqual(execution_id, "C3")
+        self.assertEqual(data["pending_execution_id"], "P3")
+        self.assertTrue(main.is_partial_result({"charts": [data]}))
+        # The new run was downloaded in the background once it completed
+        self.assertIsNotNone(main.execution_cache.get("P3"))
+
+    def test_pending_past_poll_timeout_is_reported(self):
+        scripts = {"14000020": [{"pendingExecutionId": "P4"}]}
+        with fast_polling(scripts, timeout=0.1):
+            result = asyncio.run(main.get_dune_chart_data("https://dune.com/queries/14000020"))
+        self.assertEqual(result["pending_execution_id"], "P4")
+        self.assertIn("still pending", result["error"])
+
+    def test_dashboard_lists_widgets_pending_past_poll_timeout(self):
+        # Dashboard 910 has widgets on queries (910000 + i) * 1_000_000 + 20
+        scripts = {
+            "910000000020": [{"completedExecutionId": "C5"}],
+            "910001000020": [{"pendingExecutionId": "P5"}],
+        }
+        with fast_polling(scripts, timeout=0.1):
+            result = asyncio.run(main.get_dune_dashboard_data("https://dune.com/bench/w2-r20-910"))
+        self.assertEqual([chart["execution_id"] for chart in result["charts"]], ["C5"])
+        self.assertEqual([(chart["query_id"], chart["pending_execution_id"]) for chart in result["timed_out"]],
+                         [(910001000020, "P5")])
+
+
+if __name__ == "__main__":
+    unittest.main()
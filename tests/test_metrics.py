@@ -0,0 +1,29 @@
+"""
+Upstream metrics: every per-host series is labelled with the same host (netloc, port included).
+
+    python -m unittest discover -s tests
+"""
+import asyncio
+import re
+import unittest
+
+from stand_in import env, main
+
+
+def hosts(counters, name):
+    return {re.search(r'host="([^"]*)"', key).group(1) for key in counters if key.startswith(f"{name}{{")}
+
+
+class UpstreamMetricsTest(unittest.TestCase):
+    def test_bytes_and_requests_share_host_labels(self):
+        asyncio.run(main.get_data("https://dune.com/bench/w1-r10-301"))
+        asyncio.run(main.get_data("https://www.footprint.network/chart/Bench-fp-r10-301"))
+        counters = main.metrics.snapshot()["counters"]
+
+        byte_hosts = hosts(counters, "upstream_bytes_total")
+        self.assertIn(env["DUNE_API_URL"].removeprefix("http://"), byte_hosts)
+        self.assertLessEqual(byte_hosts, hosts(counters, "upstream_requests_total"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+"""
+Paginated get_data: every chart is sliced to the requested page, with a "pagination" entry.
+
+    python -m unittest discover -s tests
+"""
+import asyncio
+import json
+import unittest
+
+from stand_in import main
+
+
+def get_data(url, **options):
+    return json.loads(asyncio.run(main.get_data(url, **options)))
+
+
+class PaginationTest(unittest.TestCase):
+    def test_pages_cover_every_row_once(self):
+        url = "https://dune.com/bench/w2-r20-601"
+        days = []
+        for page in (1, 2, 3):
+            result = get_data(url, page=page, page_size=8)
+            self.assertEqual(len(result["charts"]), 2)
+            chart = result["charts"][0]
+            self.assertEqual(chart["pagination"], {"page": page, "page_size": 8, "total_rows": 20,
+                                                   "has_more": page < 3})
+            days += [row["day"] for row in chart["data"]]
+        self.assertEqual(len(days), 20)
+        self.assertEqual(len(set(days)), 20)
+
+    def test_page_past_the_end_is_empty(self):
+        chart = get_data("https://dune.com/bench/w1-r20-602", page=4, page_size=8)["charts"][0]
+        self.assertEqual(chart["data"], [])
+        self.assertFalse(chart["pagination"]["has_more"])
+
+    def test_default_page_size(self):
+        chart = get_data("https://dune.com/bench/w1-r20-603", page=1)["charts"][0]
+        self.assertEqual(chart["pagination"]["page_size"], main.DEFAULT_PAGE_SIZE)
+        self.assertEqual(len(chart["data"]), 20)
+
+    def test_invalid_page(self):
+        self.assertEqual(asyncio.run(main.get_data("https://dune.com/bench/w1-r20-604", page=0)),
+                         "Error: page must be >= 1")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+"""
+Dune parameter overrides: results cached per parameter set, parameter sweeps, and invalidation of
+every cached variant of a URL.
+
+    python -m unittest discover -s tests
+"""
+import asyncio
+import json
+import shutil
+import tempfile
+import unittest
+
+from stand_in import main
+
+
+def get_data(url, **options):
+    return json.loads(asyncio.run(main.get_data(url, **options)))
+
+
+class InvalidatePrefixTest(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = main.ResultCache(1024 * 1024, cache_dir=self.cache_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_drops_key_and_its_variants(self):
+        base = "https://dune.com/queries/1"
+        keys = [base, f"{base}|parameters={{}}", f"{base}|columns=day", f"{base}0", "https://dune.com/queries/2"]
+        for key in keys:
+            self.cache.set(key, {"key": key})
+
+        self.assertEqual(self.cache.invalidate_prefix(base), 3)
+        self.assertEqual([key for key in keys if self.cache.get(key)], keys[3:])
+
+    def test_drops_variants_only_on_disk(self):
+        base = "https://dune.com/queries/1"
+        self.cache.set(f"{base}|parameters={{}}", {"on": "disk"})
+        self.cache.set(f"{base}1", {"on": "disk"})
+        # Another process' entries: on disk, not in this cache's memory
+        self.cache.entries.clear()
+        self.cache.total_bytes = 0
+
+        self.assertEqual(self.cache.invalidate_prefix(base), 1)
+        self.assertIsNone(self.cache.get(f"{base}|parameters={{}}"))
+        self.assertEqual(self.cache.get(f"{base}1"), {"on": "disk"})
+
+
+class ParametersTest(unittest.TestCase):
+    def test_results_cached_per_parameter_set(self):
+        url = "https://dune.com/queries/16000010"
+        get_data(url)
+        get_data(url, parameters={"chain": "bsc"})
+        key = main.normalize_url(url)
+        self.assertIsNotNone(main.result_cache.get(key))
+        self.assertIsNotNone(main.result_cache.get(f'{key}|parameters={{"chain":"bsc"}}'))
+
+    def test_invalidate_cache_drops_every_parameter_set(self):
+        url = "https://dune.com/queries/17000010"
+        other = "https://dune.com/queries/18000010"
+        for parameters in (None, {"chain": "bsc"}, {"chain": "eth"}):
+            get_data(url, parameters=parameters)
+        get_data(other)
+
+        invalidated = json.loads(main.invalidate_cache(url))
+        self.assertEqual(invalidated["entries"], 3)
+        key = main.normalize_url(url)
+        self.assertIsNone(main.result_cache.get(key))
+        self.assertIsNone(main.result_cache.get(f'{key}|parameters={{"chain":"bsc"}}'))
+        self.assertIsNotNone(main.result_cache.get(main.normalize_url(other)))
+
+    def test_sweep(self):
+        result = get_data("https://dune.com/queries/19000010",
+                          parameter_sets=[{"chain": "bsc"}, {"chain": "eth"}, {"chain": "bsc"}])
+        self.assertEqual([entry["parameters"] for entry in result["sweep"]],
+                         [{"chain": "bsc"}, {"chain": "eth"}, {"chain": "bsc"}])
+        self.assertTrue(all(len(entry["data"]["execution_succeeded"]["data"]) == 10 for entry in result["sweep"]))
+
+    def test_unknown_dashboard_parameter(self):
+        result = get_data("https://dune.com/bench/w1-r10-901", parameters={"nope": 1})
+        self.assertEqual(result["error"], "Unknown dashboard parameters: nope (available: none)")
+
+    def test_parameters_need_dune(self):
+        output = asyncio.run(main.get_data("https://www.footprint.network/chart/Bench-fp-r10-901",
+                                           parameters={"chain": "bsc"}))
+        self.assertEqual(output, "Error: parameters are only supported for Dune dashboards and queries")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+"""
+get_data's server-side column projection, filters, ordering and row limits, applied to every chart.
+
+    python -m unittest discover -s tests
+"""
+import asyncio
+import json
+import unittest
+
+from stand_in import main
+
+
+def get_data(url, **options):
+    return json.loads(asyncio.run(main.get_data(url, **options)))
+
+
+class QueryTest(unittest.TestCase):
+    def test_dashboard_projection_filter_order_limit(self):
+        result = get_data("https://dune.com/bench/w2-r20-501", columns=["day", "trades"],
+                          filters=[{"column": "trades", "op": ">", "value": 20000}], order_by="-trades", limit=3)
+        self.assertEqual(len(result["charts"]), 2)
+        for chart in result["charts"]:
+            self.assertEqual(chart["columns"], ["day", "trades"])
+            self.assertEqual([set(row) for row in chart["data"]], [{"day", "trades"}] * 3)
+            trades = [row["trades"] for row in chart["data"]]
+            self.assertEqual(trades, sorted(trades, reverse=True))
+            self.assertGreater(min(trades), 20000)
+
+    def test_single_query_filter(self):
+        result = get_data("https://dune.com/queries/1000020", columns=["day", "trades"],
+                          filters=[{"column": "trades", "op": ">=", "value": 60000}])
+        rows = result["execution_succeeded"]["data"]
+        self.assertTrue(rows)
+        self.assertTrue(all(row["trades"] >= 60000 for row in rows))
+        self.assertEqual(result["execution_succeeded"]["columns"], ["day", "trades"])
+
+    def test_in_and_contains_filters(self):
+        result = get_data("https://www.footprint.network/chart/Bench-fp-r10-502", filters=[
+            {"column": "Chain", "op": "in", "value": ["ethereum"]},
+            {"column": "On Date", "op": "contains", "value": "2024-05-3"},
+        ])
+        self.assertEqual([row["On Date"] for row in result["data"]], ["2024-05-31", "2024-05-30"])
+
+    def test_columnar_format(self):
+        result = get_data("https://www.footprint.network/chart/Bench-fp-r10-503", format="columnar",
+                          order_by="Volume", limit=2)
+        self.assertEqual(result["columns"], ["On Date", "Chain", "Volume", "Tx Count"])
+        self.assertEqual(len(result["rows"]), 2)
+        self.assertLessEqual(result["rows"][0][2], result["rows"][1][2])
+
+    def test_unsupported_operator_is_an_error(self):
+        output = asyncio.run(main.get_data("https://dune.com/bench/w1-r20-504",
+                                           filters=[{"column": "trades", "op": "~", "value": 1}]))
+        self.assertEqual(output, "Error: Unsupported filter operator: ~")
+
+
+if __name__ == "__main__":
+    unittest.main()
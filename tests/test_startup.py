@@ -0,0 +1,51 @@
+"""
+Importing main starts nothing: the watchlist, proxy pool and metrics endpoint start with the server.
+
+    python -m unittest discover -s tests
+"""
+import os
+import socket
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+CHECK = """
+import threading, urllib.request
+import main
+print("CHECK", threading.active_count())
+main.start_background_services()
+print("CHECK", main.prefetch_scheduler is not None)
+print("CHECK", urllib.request.urlopen(f"http://127.0.0.1:{main.METRICS_PORT}/metrics", timeout=5).status)
+"""
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class StartupTest(unittest.TestCase):
+    def test_import_starts_no_background_services(self):
+        env = {
+            **os.environ,
+            # Upstream unreachable: the watchlist's first refresh fails, which doesn't matter here
+            "DUNE_API_URL": "http://127.0.0.1:9",
+            "WATCHLIST": "https://dune.com/bench/w1-r10-401",
+            "WATCHLIST_SPACING": "3600",
+            "METRICS_PORT": str(free_port()),
+        }
+        process = subprocess.run([sys.executable, "-c", CHECK], cwd=ROOT, env=env, capture_output=True, text=True,
+                                 timeout=60)
+        self.assertEqual(process.returncode, 0, process.stderr[-2000:])
+        # The server logs to stdout as well
+        threads, scheduler, status = [line.split()[1] for line in process.stdout.splitlines() if line.startswith("CHECK ")]
+        self.assertEqual(threads, "1")
+        self.assertEqual(scheduler, "True")
+        self.assertEqual(status, "200")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+"""
+summarize_data: time buckets, group-by aggregates, LTTB downsampling and top-k over fetched charts.
+
+    python -m unittest discover -s tests
+"""
+import asyncio
+import json
+import unittest
+
+from stand_in import main
+
+CHART = "https://www.footprint.network/chart/Bench-fp-r30-801"
+
+
+def summarize(url, **options):
+    return asyncio.run(main.summarize_data(url, **options))
+
+
+def two_chain_table():
+    rows = [{"day": f"2024-05-{day:02d}", "chain": chain, "volume": day * (2 if chain == "bsc" else 1)}
+            for day in range(1, 29) for chain in ("ethereum", "bsc")]
+    return {"columns": ["day", "chain", "volume"], "data": rows}
+
+
+class SummarizeTest(unittest.TestCase):
+    def test_weekly_buckets(self):
+        result = json.loads(summarize(CHART, bucket="week"))
+        rows = result["data"]
+        self.assertEqual(sum(row["count"] for row in rows), 30)
+        self.assertEqual(result["summary"]["output_rows"], len(rows))
+        self.assertTrue(all(row["On Date"].endswith("00:00:00") for row in rows))
+
+    def test_group_by_sums(self):
+        result = json.loads(summarize(CHART, group_by=["Chain"]))
+        self.assertEqual([row["Chain"] for row in result["data"]], ["ethereum"])
+        self.assertEqual(result["data"][0]["count"], 30)
+
+    def test_downsample_keeps_endpoints(self):
+        result = json.loads(summarize(CHART, downsample=5))
+        days = [row["On Date"] for row in result["data"]]
+        self.assertEqual(len(days), 5)
+        self.assertEqual((days[0], days[-1]), ("2024-05-02", "2024-05-31"))
+
+    def test_top_k(self):
+        result = json.loads(summarize(CHART, top_k=3, top_by="Volume"))
+        volumes = [row["Volume"] for row in result["data"]]
+        self.assertEqual(len(volumes), 3)
+        self.assertEqual(volumes, sorted(volumes, reverse=True))
+
+    def test_downsample_per_group_series(self):
+        table = main.summarize_table(two_chain_table(), "data", bucket="day", group_by=["chain"], downsample=4)
+        chains = [row["chain"] for row in table["data"]]
+        self.assertEqual(sorted(chains), ["bsc"] * 4 + ["ethereum"] * 4)
+
+    def test_chart_without_group_by_column_is_skipped(self):
+        table = main.summarize_table(two_chain_table(), "data", group_by=["missing"])
+        self.assertEqual(table["summary"], {"skipped": "no group_by column"})
+        self.assertEqual(len(table["data"]), 56)
+
+    def test_downsample_with_group_by_needs_bucket(self):
+        self.assertEqual(summarize(CHART, group_by=["Chain"], downsample=5),
+                         "Error: downsample with group_by needs a bucket")
+
+    def test_invalid_options(self):
+        self.assertTrue(summarize(CHART).startswith("Error: nothing to summarize"))
+        self.assertEqual(summarize(CHART, downsample=2), "Error: downsample must be >= 3")
+
+
+if __name__ == "__main__":
+    unittest.main()
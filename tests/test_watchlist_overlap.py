@@ -0,0 +1,46 @@
+"""
+get_data on a watched URL while the watchlist is refreshing it: the watchlist runs its own event
+loop in a thread, so the fetches it has in flight must not be joined from the server's loop.
+
+Runs against the stand-in upstream (benchmarks/stand_in_server.py):
+
+    python -m unittest discover -s tests
+"""
+import asyncio
+import json
+import time
+import unittest
+
+from stand_in import config, main
+
+
+class WatchlistOverlapTest(unittest.TestCase):
+    def setUp(self):
+        # Slow enough upstream for the refresh to still be in flight when get_data asks
+        config.latency = 0.3
+
+    def tearDown(self):
+        config.latency = 0.0
+
+    def test_get_data_during_watchlist_refresh(self):
+        url = "https://dune.com/bench/w3-r50-1"
+        scheduler = main.PrefetchScheduler([url], interval=3600, spacing=0)
+        scheduler.start_in_background()
+        # Let the first refresh get its dashboard lookup in flight, then ask for the same URL
+        time.sleep(0.1)
+
+        result = json.loads(asyncio.run(main.get_data(url)))
+
+        self.assertNotIn("error", result)
+        self.assertEqual(len(result["charts"]), 3)
+        self.assertEqual(len(result["charts"][0]["data"]), 50)
+
+        deadline = time.time() + 10
+        while scheduler.stats()["urls"][0]["refreshes"] == 0 and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(scheduler.stats()["urls"][0]["failures"], 0)
+        self.assertEqual(scheduler.stats()["urls"][0]["refreshes"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()